@@ -1,3 +1,8 @@
+import time
+
+STARTED = time.perf_counter()  # taken before the imports below so they are timed too
+
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
@@ -5,42 +10,81 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi_limiter.depends import RateLimiter
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from entity import *
+from modules.hashing import hash_pool
+from modules.lifecycle import RequestContext, StartupTimer, TrackInFlight, in_flight
 from modules.logger import get_logger, configure_uvicorn_filter
+from modules.metrics import CONTENT_TYPE, RouteMetrics, install_mongo_listeners, render_metrics
+from modules.timing import ServerTiming, install_timing_hooks
 from routers import *
 
 # os.system("clear")
 load_dotenv()
 
 logger = get_logger("APP")
+# entity.* modules log through the same pipeline (slow queries, index drift, ...)
+get_logger("entity")
 
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t")
+if METRICS_ENABLED:
+    # Before any client exists: entity handles connect on first use
+    install_mongo_listeners()
+# Server-Timing breakdown: MongoDB wrapper calls and password hashing per request
+install_timing_hooks()
+startup_timer = StartupTimer(STARTED)
+startup_timer.phase("imports")
 
-# # Define the FastAPI app with lifespan for startup and shutdown events
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     """Startup and shutdown events for FastAPI app."""
-#     try:
-#         logger.info(f"Starting lifespan mode")
-#     except Exception as e:
-#         logger.error(f"Error in lifespan mode: {e}")
-#     yield
-#     user_db.close()
-#     vehicle_db.close()
-#     # Do not call transaction_db.close() since it's a function, not an instance
-#
 
+# Define the FastAPI app with lifespan for startup and shutdown events
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown events for FastAPI app."""
+    logger.info(f"Starting lifespan mode")
+    startup_timer.phase("server_setup")
+    if os.getenv("STARTUP_WARMUP", "True").lower() in ("true", "1", "t"):
+        try:
+            # Connects both clients in parallel and opens their pools to minPoolSize
+            connections = await warm_up()
+            logger.info(f"Connection pools warmed: {connections}")
+        except Exception as e:
+            logger.error(f"Error warming connection pools: {e}")
+        startup_timer.phase("warm_up")
+    if os.getenv("MONGO_INDEX_BOOTSTRAP", "True").lower() in ("true", "1", "t"):
+        try:
+            # Idempotent: only missing indexes are created; drift is logged
+            await bootstrap_indexes()
+        except Exception as e:
+            logger.error(f"Error bootstrapping indexes: {e}")
+        startup_timer.phase("index_bootstrap")
+    app.state.startup = startup_timer.report()
+    logger.info(f"Worker ready in {app.state.startup['total_ms']} ms: {app.state.startup}")
+
+    yield
+
+    # Let running requests finish before their database clients go away
+    await in_flight.drain(float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "10")))
+    try:
+        await close_all()
+    except Exception as e:
+        logger.error(f"Error closing database clients: {e}")
+    await asyncio.to_thread(hash_pool.shutdown)
 
 
 app = FastAPI(
     title="Fuel Check API",
     description="API for fuel check authentication and management. Includes JWT authentication and agent query endpoints.",
     version="1.0.0",
-    # lifespan=lifespan,
+    lifespan=lifespan,
     debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"),
 )
+app.add_middleware(ServerTiming)
+if METRICS_ENABLED:
+    app.add_middleware(RouteMetrics)
+app.add_middleware(RequestContext)
+app.add_middleware(TrackInFlight, tracker=in_flight)
 # app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 # app.add_middleware(
 #     TrustedHostMiddleware,
@@ -62,8 +106,8 @@ app = FastAPI(
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication Operations"])
 app.include_router(user_router, prefix="/user", tags=["User Operations"])
-# app.include_router(vehicle_router, prefix="/vehicle", tags=["Vehicle Operations"])
-# app.include_router(transaction_router, prefix="/transaction", tags=["Transaction Operations"])
+app.include_router(vehicle_router, prefix="/vehicle", tags=["Vehicle Operations"])
+app.include_router(transaction_router, prefix="/transaction", tags=["Transaction Operations"])
 
 
 # Middleware to rewrite HTTP redirects to HTTPS
@@ -89,3 +133,11 @@ app.include_router(user_router, prefix="/user", tags=["User Operations"])
 async def ping():
     """Health check endpoint."""
     return JSONResponse({"ping": "pong"}, status.HTTP_200_OK)
+
+
+# Prometheus scrape endpoint
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Request, MongoDB, pool, hashing and cache metrics in Prometheus text format."""
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,80 @@
+"""
+Client registry benchmark.
+
+Compares handle creation latency and open socket count between private clients
+(one MongoClient per MongoDB handle, the old behaviour) and the shared client
+registry.
+
+Usage:
+    python -m benchmarks.bench_client_registry --handles 100
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from entity.mongo_core import MongoDB, close_all_clients
+
+load_dotenv()
+
+
+def count_sockets() -> int:
+    """
+    Count the sockets currently open by this process (Linux only).
+    """
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def run(handles: int, shared_client: bool, settle: float) -> dict:
+    """
+    Create `handles` collection handles and report latency and socket usage.
+    """
+    db_name = os.getenv("MONGO_DB_NAME", "fuel-check-bench")
+    baseline = count_sockets()
+    timings = []
+    dbs = []
+    for i in range(handles):
+        start = time.perf_counter()
+        dbs.append(MongoDB(db_name=db_name, collection_name=f"bench_{i}", shared_client=shared_client))
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Give the pools time to open their minPoolSize connections
+    time.sleep(settle)
+    sockets = count_sockets() - baseline
+
+    for db in dbs:
+        db.close()
+    close_all_clients()
+
+    return {
+        "mode": "shared" if shared_client else "private",
+        "handles": handles,
+        "sockets": sockets,
+        "create_ms_p50": round(statistics.median(timings), 3),
+        "create_ms_max": round(max(timings), 3),
+        "create_ms_total": round(sum(timings), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handles", type=int, default=100, help="Number of handles to create")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait for pools to fill")
+    args = parser.parse_args()
+
+    for shared in (False, True):
+        result = run(args.handles, shared, args.settle)
+        print(
+            f"{result['mode']:>8}: {result['handles']} handles, {result['sockets']} sockets, "
+            f"p50 {result['create_ms_p50']} ms, max {result['create_ms_max']} ms, "
+            f"total {result['create_ms_total']} ms"
+        )
@@ -0,0 +1,124 @@
+"""
+Logging overhead per request.
+
+Replays a request-shaped burst of log calls (--debug-calls DEBUG records and
+--info-calls INFO records, each carrying a user-sized document) through the
+handler modules.logger builds, writing to os.devnull, under several setups:
+
+    sync_debug_fstring   StreamHandler in the caller, level DEBUG, f-strings (old setup)
+    sync_info_fstring    level INFO: DEBUG is dropped but its f-string is still built
+    sync_info_lazy       level INFO with %-style arguments
+    queue_debug_lazy     QueueHandler + QueueListener, level DEBUG
+    queue_info_lazy      QueueHandler + QueueListener, level INFO (the default setup)
+
+"caller" is the time spent in the request thread per request; "drained" also
+waits for the listener to write every queued record, i.e. total CPU cost.
+
+Usage:
+    python -m benchmarks.bench_logging --requests 20000 --out logging.json
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from modules.logger import _stream_handler
+
+DOC = {
+    "id": "65f1c0ffee65f1c0ffee65f1",
+    "full_name": "Load Test User",
+    "email": "load-test@example.com",
+    "is_active": True,
+    "jwt_token_string": "abcde",
+    "created_at": 1718000000.0,
+}
+
+
+def make_logger(name: str, level: int, queued: bool, devnull) -> Tuple[logging.Logger, Callable[[], None]]:
+    """
+    A fresh logger writing to devnull; returns it and a function that stops it
+    (for queued setups, after every record has been written).
+    """
+    handler = _stream_handler()
+    handler.setStream(devnull)
+    logger = logging.getLogger(f"bench_logging.{name}")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(level)
+    if not queued:
+        logger.addHandler(handler)
+        return logger, lambda: None
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return logger, listener.stop
+
+
+def request_fstring(logger: logging.Logger, debug_calls: int, info_calls: int) -> None:
+    for i in range(debug_calls):
+        logger.debug(f"Filter step {i} returned document {DOC}")
+    for i in range(info_calls):
+        logger.info(f"Request finished for {DOC['email']} with {len(DOC)} fields")
+
+
+def request_lazy(logger: logging.Logger, debug_calls: int, info_calls: int) -> None:
+    for i in range(debug_calls):
+        logger.debug("Filter step %s returned document %s", i, DOC)
+    for i in range(info_calls):
+        logger.info("Request finished for %s with %s fields", DOC["email"], len(DOC))
+
+
+CASES = [
+    ("sync_debug_fstring", logging.DEBUG, False, request_fstring),
+    ("sync_info_fstring", logging.INFO, False, request_fstring),
+    ("sync_info_lazy", logging.INFO, False, request_lazy),
+    ("queue_debug_lazy", logging.DEBUG, True, request_lazy),
+    ("queue_info_lazy", logging.INFO, True, request_lazy),
+]
+
+
+def run_case(name: str, level: int, queued: bool, request: Callable, args) -> Dict[str, float]:
+    callers: List[float] = []
+    drained: List[float] = []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(args.repeat):
+            logger, stop = make_logger(name, level, queued, devnull)
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                request(logger, args.debug_calls, args.info_calls)
+            caller = time.perf_counter() - start
+            stop()
+            total = time.perf_counter() - start
+            callers.append(caller * 1e6 / args.requests)
+            drained.append(total * 1e6 / args.requests)
+    return {"caller_us": statistics.median(callers), "drained_us": statistics.median(drained)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--debug-calls", type=int, default=5, help="DEBUG records per request")
+    parser.add_argument("--info-calls", type=int, default=1, help="INFO records per request")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    print(f"{'case':>20}  {'caller us/req':>14}  {'drained us/req':>15}")
+    for name, level, queued, request in CASES:
+        results[name] = run_case(name, level, queued, request, args)
+        print(f"{name:>20}  {results[name]['caller_us']:>14.2f}  {results[name]['drained_us']:>15.2f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({
+                "meta": {"requests": args.requests, "debug_calls": args.debug_calls,
+                         "info_calls": args.info_calls, "repeat": args.repeat, "timestamp": time.time()},
+                "results": results,
+            }, fh, indent=2)
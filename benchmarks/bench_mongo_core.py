@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks for entity.mongo_core.MongoDB.
+
+Runs each case `--repeat` times against a local mongod (LOCAL_MONGO_CONNECTION_STRING)
+or, with --backend mongomock, an in-process stand-in (pip install mongomock; its
+numbers only compare Python-side overhead, never server work). Results are
+written as JSON so runs on different commits can be compared; --compare exits
+with status 1 when any case's median regresses by more than --threshold.
+
+Cases:
+    insert_single, insert_many, bulk_write    `--ops` documents per run
+    filter, filter_projection                 ~1% of the dataset per call
+    paginate_page_{1,10,100}                  page_size 20, offset pagination
+    get_or_create_existing, get_or_create_new
+    update_or_create
+    aggregate, group_by                       over the whole dataset
+
+Usage:
+    python -m benchmarks.bench_mongo_core --size 100000 --out results.json
+    python -m benchmarks.bench_mongo_core --size 100000 --compare results.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymongo
+from dotenv import load_dotenv
+from pymongo import InsertOne
+
+from entity.mongo_core import MongoDB
+
+load_dotenv()
+
+SCRATCH_DB = "fuel-check-bench"
+PAGE_SIZE = 20
+
+
+def make_doc(i: int, rng: random.Random) -> Dict[str, Any]:
+    """
+    A transaction-like document; `bucket` has 100 distinct values.
+    """
+    return {
+        "seq": i,
+        "bucket": i % 100,
+        "vehicle_id": f"vehicle-{i % 500}",
+        "amount": rng.randint(100, 5000),
+        "fuel_quantity": rng.randint(1, 60),
+        "location": rng.choice(("Pump A", "Pump B", "Pump C")),
+        "tank_fully_filled": bool(i % 2),
+        "created_at": float(i),
+    }
+
+
+def open_db(backend: str, collection_name: str) -> MongoDB:
+    if backend == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("--backend mongomock needs the mongomock package (pip install mongomock)")
+        return MongoDB(db_name=SCRATCH_DB, collection_name=collection_name, client=mongomock.MongoClient())
+    return MongoDB(db_name=SCRATCH_DB, collection_name=collection_name)
+
+
+def seed(db: MongoDB, size: int, rng: random.Random) -> None:
+    db.drop_collection(confirm=True)
+    for start in range(0, size, 10_000):
+        db.insert_many([make_doc(i, rng) for i in range(start, min(start + 10_000, size))])
+    db.ensure_indexes([{"keys": "bucket"}, {"keys": "created_at"}])
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    Time `func` `repeat` times (after one warm-up run); `setup` runs untimed before each.
+    """
+    samples = []
+    for run in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        if run:
+            samples.append(elapsed)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "runs": len(samples),
+    }
+
+
+def run_cases(backend: str, size: int, ops: int, repeat: int, only: Optional[List[str]]) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(42)
+    data = open_db(backend, "bench_mongo_core")
+    writes = open_db(backend, "bench_mongo_core_writes")
+    seed(data, size, rng)
+
+    batch = [make_doc(i, rng) for i in range(ops)]
+    fresh = lambda: [dict(doc) for doc in batch]  # insert adds _id; never reuse documents
+    reset_writes = lambda: writes.drop_collection(confirm=True)
+    counter = iter(range(size, 10 ** 12))
+    existing = make_doc(size // 2, rng)
+
+    cases: List[Tuple[str, Callable[[], Any], Optional[Callable[[], Any]]]] = [
+        ("insert_single", lambda: [writes.insert(doc) for doc in fresh()], reset_writes),
+        ("insert_many", lambda: writes.insert_many(fresh()), reset_writes),
+        ("bulk_write", lambda: writes.bulk_write([InsertOne(doc) for doc in fresh()]), reset_writes),
+        ("filter", lambda: data.filter({"bucket": rng.randrange(100)}), None),
+        ("filter_projection",
+         lambda: data.filter({"bucket": rng.randrange(100)}, projection={"_id": 0, "amount": 1, "created_at": 1}), None),
+    ]
+    for page in (1, 10, 100):
+        if (page - 1) * PAGE_SIZE < size:
+            cases.append((f"paginate_page_{page}", lambda page=page: data.paginate(
+                page=page, page_size=PAGE_SIZE, sort=[("created_at", -1)]), None))
+    cases += [
+        ("get_or_create_existing", lambda: data.get_or_create({"seq": existing["seq"]}, existing), None),
+        ("get_or_create_new", lambda: writes.get_or_create({"seq": next(counter)}, {"amount": 1}), None),
+        ("update_or_create", lambda: writes.update_or_create({"seq": rng.randrange(ops)}, {"amount": 2}), None),
+        ("aggregate", lambda: data.aggregate([
+            {"$match": {"tank_fully_filled": True}},
+            {"$group": {"_id": "$vehicle_id", "spent": {"$sum": "$amount"}, "litres": {"$sum": "$fuel_quantity"}}},
+        ]), None),
+        ("group_by", lambda: data.group_by("location"), None),
+    ]
+
+    results = {}
+    for name, func, setup in cases:
+        if only and name not in only:
+            continue
+        results[name] = measure(func, repeat, setup)
+        print(f"{name:>24}: median {results[name]['median_ms']:9.3f} ms   p95 {results[name]['p95_ms']:9.3f} ms")
+
+    data.close()
+    writes.close()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline_path: str, threshold: float) -> List[str]:
+    """
+    Print new/old median ratios; return the cases that regressed beyond `threshold`.
+    """
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)["results"]
+    regressed = []
+    print(f"\n{'case':>24}  {'baseline':>10}  {'current':>10}  ratio")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["median_ms"], current["median_ms"]
+        ratio = new / old if old else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:>24}  {old:10.3f}  {new:10.3f}  {ratio:5.2f}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod")
+    parser.add_argument("--size", type=int, default=10_000, help="Documents in the read dataset")
+    parser.add_argument("--ops", type=int, default=1_000, help="Documents per write-case run")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="Run only these cases")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed median slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = run_cases(args.backend, args.size, args.ops, args.repeat, args.only)
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "size": args.size,
+            "ops": args.ops,
+            "repeat": args.repeat,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pymongo": pymongo.version,
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} case(s) regressed more than {args.threshold:.0%}: {regressed}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,91 @@
+"""
+Pagination benchmark.
+
+Seeds a scratch collection, then compares latency of page 1 and a deep page
+(default 10,000) for offset pagination (paginate) and keyset pagination
+(paginate_keyset).
+
+Usage:
+    python -m benchmarks.bench_pagination --page-size 20 --deep-page 10000
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from pymongo import DESCENDING
+
+from entity.mongo_core import MongoDB, encode_page_cursor
+
+load_dotenv()
+
+
+def seed(db: MongoDB, total: int) -> None:
+    """
+    Fill the collection with `total` documents carrying a created_at sort key.
+    """
+    db.drop_collection(confirm=True)
+    batch = []
+    for i in range(total):
+        batch.append({"seq": i, "created_at": float(i), "amount": i % 1000})
+        if len(batch) == 10_000:
+            db.insert_many(batch)
+            batch = []
+    if batch:
+        db.insert_many(batch)
+    db.ensure_indexes([db.keyset_index_spec("created_at", DESCENDING)])
+
+
+def time_call(func, repeat: int) -> float:
+    """
+    Median wall time of `func` in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def cursor_for_page(db: MongoDB, page: int, page_size: int) -> str:
+    """
+    Build the keyset cursor a client would hold when requesting `page` (setup, not timed).
+    """
+    doc = db.collection.find({}, {"created_at": 1}).sort(
+        [("created_at", DESCENDING), ("_id", DESCENDING)]
+    ).skip((page - 1) * page_size - 1).limit(1).next()
+    return encode_page_cursor(doc["created_at"], doc["_id"], "created_at", DESCENDING)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--deep-page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the existing scratch collection")
+    args = parser.parse_args()
+
+    db = MongoDB(db_name=os.getenv("MONGO_DB_NAME", "fuel-check-bench"), collection_name="bench_pagination")
+    if not args.no_seed:
+        seed(db, args.page_size * (args.deep_page + 1))
+
+    sort = [("created_at", DESCENDING), ("_id", DESCENDING)]
+    deep_cursor = cursor_for_page(db, args.deep_page, args.page_size)
+
+    results = {
+        "offset_page_1": time_call(
+            lambda: db.paginate(page=1, page_size=args.page_size, sort=sort), args.repeat),
+        f"offset_page_{args.deep_page}": time_call(
+            lambda: db.paginate(page=args.deep_page, page_size=args.page_size, sort=sort), args.repeat),
+        "keyset_page_1": time_call(
+            lambda: db.paginate_keyset(page_size=args.page_size, sort_key="created_at"), args.repeat),
+        f"keyset_page_{args.deep_page}": time_call(
+            lambda: db.paginate_keyset(page_size=args.page_size, sort_key="created_at", cursor=deep_cursor),
+            args.repeat),
+    }
+    for name, ms in results.items():
+        print(f"{name:>24}: {ms:8.3f} ms")
+
+    db.close()
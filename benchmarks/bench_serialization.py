@@ -0,0 +1,77 @@
+"""
+Read-path serialisation micro-benchmark.
+
+Compares turning one user document, as received from the server, into JSON
+response bytes:
+
+    dict:  decode BSON -> _replace_id_key -> ReadUser(**doc).model_dump() -> JSONResponse
+    raw:   RawBSONDocument -> render_json(fields=ReadUser fields)
+
+No database is needed.
+
+Usage:
+    python -m benchmarks.bench_serialization --iterations 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from fastapi.responses import JSONResponse
+
+from entity.mongo_core import MongoDB, render_json
+from models import user_model
+
+FIELDS = tuple(user_model.ReadUser.model_fields)
+
+USER = bson.encode({
+    "_id": ObjectId(),
+    "full_name": "Jane Doe",
+    "email": "jane@example.com",
+    "password": "$pbkdf2-sha256$29000$abcdefghijklmnop$qrstuvwxyz0123456789ABCDEFGHIJ",
+    "is_active": True,
+    "jwt_token_string": "a1b2c",
+    "created_at": 1735689600.0,
+    "updated_at": 1735689600.0,
+})
+
+
+def dict_path(data: bytes) -> bytes:
+    doc = MongoDB._replace_id_key(None, bson.decode(data))
+    return JSONResponse(user_model.ReadUser(**doc).model_dump()).body
+
+
+def raw_path(data: bytes) -> bytes:
+    return render_json(RawBSONDocument(data), FIELDS)
+
+
+def measure(func, iterations: int) -> dict:
+    """
+    Per-call time (µs) and peak bytes allocated during one call of `func`.
+    """
+    func(USER)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(USER)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func(USER)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"us_per_call": elapsed / iterations * 1e6, "peak_bytes": peak - current}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for name, func in (("dict", dict_path), ("raw", raw_path)):
+        result = measure(func, args.iterations)
+        print(f"{name:>5}: {result['us_per_call']:7.2f} µs/call, {result['peak_bytes']:8d} B peak/call")
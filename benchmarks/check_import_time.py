@@ -0,0 +1,125 @@
+"""
+Import-time budget check.
+
+Imports a module (default `app`) in fresh interpreters under
+`python -X importtime` and fails if the median cumulative import time
+exceeds --budget-ms, or if any --forbid module gets imported along the way
+(heavy or interactive-only packages that should load lazily). Prints the
+slowest imports so a regression can be traced to its package. Importing must
+not touch the network: database handles in `entity` connect on first use.
+
+Exits with status 1 on a budget or forbidden-import failure and 2 if the
+import itself fails.
+
+Usage:
+    python -m benchmarks.check_import_time --budget-ms 1500
+    python -m benchmarks.check_import_time --module entity --budget-ms 600 --json imports.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_FORBID = "rich,IPython"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (module, self_us, cumulative_us, depth),
+            in the order the imports finished.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import `module` in a fresh interpreter and return its import-time rows.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        print(result.stderr[-4000:], file=sys.stderr)
+        sys.exit(f"import {module} failed with exit status {result.returncode}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(rows: List[Tuple[str, int, int, int]], module: str, top: int) -> Dict[str, Any]:
+    total_us = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), None)
+    if total_us is None:
+        total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    top_level = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)
+    by_self = sorted(rows, key=lambda r: r[1], reverse=True)
+    return {
+        "total_ms": total_us / 1000,
+        "modules": len(rows),
+        "slowest_cumulative": [{"module": n, "cumulative_ms": c / 1000} for n, _, c, _ in top_level[:top]],
+        "slowest_self": [{"module": n, "self_ms": s / 1000} for n, s, _, _ in by_self[:top]],
+        "imported": sorted({name for name, _, _, _ in rows}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Maximum median cumulative import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to run")
+    parser.add_argument("--forbid", default=DEFAULT_FORBID,
+                        help="Comma-separated top-level packages that must not be imported")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # One untimed run so bytecode compilation is not counted
+    measure(args.module)
+    runs = [summarize(measure(args.module), args.module, args.top) for _ in range(args.repeat)]
+    median_ms = statistics.median(run["total_ms"] for run in runs)
+    slowest = max(runs, key=lambda run: run["total_ms"])
+
+    forbid = {name.strip() for name in args.forbid.split(",") if name.strip()}
+    forbidden = sorted({name for name in slowest["imported"] if name.split(".")[0] in forbid})
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.repeat} run(s), "
+          f"{slowest['modules']} modules (budget {args.budget_ms:.0f} ms)")
+    print(f"\n{'cumulative ms':>14}  top-level import")
+    for row in slowest["slowest_cumulative"]:
+        print(f"{row['cumulative_ms']:>14.1f}  {row['module']}")
+    print(f"\n{'self ms':>14}  module")
+    for row in slowest["slowest_self"]:
+        print(f"{row['self_ms']:>14.1f}  {row['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({
+                "module": args.module,
+                "budget_ms": args.budget_ms,
+                "median_ms": median_ms,
+                "runs_ms": [run["total_ms"] for run in runs],
+                "forbidden": forbidden,
+                "slowest_cumulative": slowest["slowest_cumulative"],
+                "slowest_self": slowest["slowest_self"],
+            }, fh, indent=2)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if forbidden:
+        failures.append(f"forbidden modules imported: {forbidden}")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,332 @@
+"""
+End-to-end HTTP load test for the FastAPI app.
+
+Drives the auth and user routes with a weighted request mix from `--concurrency`
+virtual users, either in-process through httpx's ASGI transport (default, runs
+the app lifespan too) or against a running server with --url. Reports per-route
+throughput, error rate and p50/p95/p99 latency, and writes them as JSON and/or
+CSV. The operation sequence is driven by --seed, so two runs with the same
+arguments issue the same requests.
+
+Each virtual user owns its own accounts (registered during setup, deleted at
+the end unless --keep), so regenerate-token never invalidates a token another
+worker is using.
+
+Routes and mix names:
+    ping        GET    /ping
+    register    POST   /auth/register
+    login       POST   /auth/login
+    regenerate  POST   /auth/regenerate-token
+    me          GET    /user/me
+    patch_me    PATCH  /user/me
+    delete_me   DELETE /user/me   (accounts registered by the run only)
+
+Usage:
+    python -m benchmarks.load_test --concurrency 32 --requests 5000 --out load.json
+    python -m benchmarks.load_test --url http://localhost:8000 --duration 60 \\
+        --mix ping=1,login=2,me=10,patch_me=2,regenerate=1,register=1,delete_me=1 --csv load.csv
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("benchmarks.load_test needs httpx (pip install httpx)")
+
+DEFAULT_MIX = "ping=1,login=2,me=10,patch_me=2,regenerate=1,register=1,delete_me=1"
+PASSWORD = "load-test-password"
+
+
+class Account:
+    __slots__ = ("email", "token")
+
+    def __init__(self, email: str, token: Optional[str] = None) -> None:
+        self.email = email
+        self.token = token
+
+
+class Recorder:
+    """
+    Latencies and status codes per route.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, route: str, ms: float, status: Any, ok: bool) -> None:
+        self.latencies.setdefault(route, []).append(ms)
+        codes = self.statuses.setdefault(route, {})
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        routes = {}
+        everything: List[float] = []
+        for route, samples in sorted(self.latencies.items()):
+            everything.extend(samples)
+            routes[route] = self._stats(samples, self.errors.get(route, 0), elapsed)
+            routes[route]["statuses"] = self.statuses[route]
+        routes["ALL"] = self._stats(everything, sum(self.errors.values()), elapsed)
+        return routes
+
+    @staticmethod
+    def _stats(samples: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(samples)
+
+        def pct(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            "requests": len(ordered),
+            "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+            "error_rate": errors / len(ordered) if ordered else 0.0,
+            "mean_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": ordered[-1] if ordered else 0.0,
+        }
+
+
+class VirtualUser:
+    """
+    One worker: a private set of accounts and a seeded operation sequence.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, run_id: str, index: int,
+                 accounts: int, mix: List[Tuple[str, float]], seed: int) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.run_id = run_id
+        self.index = index
+        self.rng = random.Random(seed + index)
+        self.mix_names = [name for name, _ in mix]
+        self.mix_weights = [weight for _, weight in mix]
+        self.account_count = accounts
+        self.accounts: List[Account] = []
+        self.disposable: List[Account] = []
+        self._serial = 0
+
+    async def request(self, route: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except Exception as e:
+            self.recorder.add(route, (time.perf_counter() - start) * 1000, type(e).__name__, False)
+            return None
+        self.recorder.add(route, (time.perf_counter() - start) * 1000, response.status_code, response.is_success)
+        return response
+
+    def new_email(self) -> str:
+        self._serial += 1
+        return f"load-{self.run_id}-{self.index}-{self._serial}@example.com"
+
+    async def register(self) -> Optional[Account]:
+        account = Account(self.new_email())
+        response = await self.request("register", "POST", "/auth/register", json={
+            "full_name": f"Load Test {self.index}", "email": account.email, "password": PASSWORD,
+        })
+        return account if response is not None and response.is_success else None
+
+    async def login(self, account: Account) -> None:
+        response = await self.request("login", "POST", "/auth/login", json={"email": account.email, "password": PASSWORD})
+        if response is not None and response.is_success:
+            account.token = response.json()["token"]
+
+    async def setup(self) -> None:
+        for _ in range(self.account_count):
+            account = await self.register()
+            if account is not None:
+                await self.login(account)
+                self.accounts.append(account)
+        if not self.accounts:
+            raise RuntimeError(f"virtual user {self.index} could not register any account")
+
+    async def step(self) -> None:
+        op = self.rng.choices(self.mix_names, self.mix_weights)[0]
+        account = self.rng.choice(self.accounts)
+        auth = {"Authorization": f"Bearer {account.token}"}
+
+        if op == "ping":
+            await self.request(op, "GET", "/ping")
+        elif op == "register":
+            created = await self.register()
+            if created is not None:
+                self.disposable.append(created)
+        elif op == "login":
+            await self.login(account)
+        elif op == "regenerate":
+            response = await self.request(op, "POST", "/auth/regenerate-token", headers={"x-token": account.token})
+            if response is not None and response.is_success:
+                account.token = response.json()["token"]
+        elif op == "me":
+            await self.request(op, "GET", "/user/me", headers=auth)
+        elif op == "patch_me":
+            await self.request(op, "PATCH", "/user/me", headers=auth, json={"updated_at": time.time()})
+        elif op == "delete_me":
+            if not self.disposable:
+                created = await self.register()
+                if created is None:
+                    return
+                self.disposable.append(created)
+            victim = self.disposable.pop()
+            if victim.token is None:
+                await self.login(victim)
+            await self.request(op, "DELETE", "/user/me", headers={"Authorization": f"Bearer {victim.token}"})
+        else:
+            raise ValueError(f"Unknown operation {op!r}")
+
+    async def teardown(self) -> None:
+        for account in self.accounts + self.disposable:
+            if account.token is None:
+                await self.login(account)
+            await self.request("delete_me", "DELETE", "/user/me",
+                               headers={"Authorization": f"Bearer {account.token}"})
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return [(name, weight) for name, weight in mix if weight > 0]
+
+
+@contextlib.asynccontextmanager
+async def open_client(url: Optional[str], concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+            yield client
+        return
+
+    from app import app
+
+    # ASGITransport does not run the lifespan; do it here so startup work happens once
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=30.0) as client:
+            yield client
+
+
+async def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    if args.reproducible_ids:
+        run_id = f"{random.Random(args.seed).getrandbits(32):08x}"
+    else:
+        run_id = uuid.uuid4().hex[:8]
+    setup, recorder, teardown = Recorder(), Recorder(), Recorder()
+
+    async with open_client(args.url, args.concurrency) as client:
+        users = [
+            VirtualUser(client, setup, run_id, i, args.accounts, mix, args.seed)
+            for i in range(args.concurrency)
+        ]
+        await asyncio.gather(*(user.setup() for user in users))
+        for user in users:
+            user.recorder = recorder
+
+        deadline = time.perf_counter() + args.duration if args.duration else None
+        budget = [args.requests]
+
+        async def worker(user: VirtualUser) -> None:
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif budget[0] <= 0:
+                    return
+                else:
+                    budget[0] -= 1
+                await user.step()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+        if not args.keep:
+            for user in users:
+                user.recorder = teardown
+            await asyncio.gather(*(user.teardown() for user in users))
+
+    return {
+        "meta": {
+            "target": args.url or "asgi:app",
+            "concurrency": args.concurrency,
+            "accounts_per_user": args.accounts,
+            "requests": args.requests if not args.duration else None,
+            "duration_s": args.duration,
+            "elapsed_s": elapsed,
+            "mix": dict(mix),
+            "seed": args.seed,
+            "run_id": run_id,
+            "commit": git_commit(),
+            "timestamp": time.time(),
+        },
+        "routes": recorder.summary(elapsed),
+        "setup_errors": sum(setup.errors.values()),
+        "teardown_errors": sum(teardown.errors.values()),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_csv(path: str, routes: Dict[str, Dict[str, Any]]) -> None:
+    columns = ["route", "requests", "throughput_rps", "error_rate", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(columns)
+        for route, stats in routes.items():
+            writer.writerow([route] + [stats[c] for c in columns[1:]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server; default drives app.py in-process")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--accounts", type=int, default=1, help="Accounts owned by each virtual user")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of --requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated route=weight pairs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reproducible-ids", action="store_true",
+                        help="Derive account e-mails from --seed too (needs a clean database between runs)")
+    parser.add_argument("--keep", action="store_true", help="Do not delete the accounts created by the run")
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--csv", help="Write per-route results as CSV to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    print(f"{'route':>12} {'req':>7} {'rps':>9} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for route, stats in report["routes"].items():
+        print(f"{route:>12} {stats['requests']:>7} {stats['throughput_rps']:>9.1f} {stats['error_rate'] * 100:>6.2f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.csv:
+        write_csv(args.csv, report["routes"])
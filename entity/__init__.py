@@ -1,29 +1,129 @@
+import asyncio
+import logging
 import os
 from functools import lru_cache,cached_property
 
 from dotenv import load_dotenv
 
-from entity.mongo_core import MongoDB
+from entity.async_mongo_core import AsyncMongoDB, close_all_async_clients
+from entity.doc_cache import DocumentCache
+from entity.index_manifest import apply_index_manifest, apply_index_manifest_async
+from entity.lazy_handle import LazyHandle
+from entity.mongo_core import MongoDB, close_all_clients
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Read-through cache for users/vehicles; disabled unless a TTL is configured
+doc_cache = DocumentCache(
+    ttl=float(os.getenv("DOC_CACHE_TTL_SECONDS", "0")),
+    max_bytes=int(os.getenv("DOC_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+)
+
+# Index manifests, applied by bootstrap_indexes() at startup.
+# users: looked up by email on login/register (and by _id, which is always indexed)
+USER_INDEXES = [{"keys": "email", "unique": True}]
+# vehicles: listed per owner in creation order, looked up by registration number
+VEHICLE_INDEXES = [
+    {"keys": [("owner_id", 1), ("created_at", 1)]},
+    {"keys": "registration_number"},
+]
+# one transactions collection per vehicle, read in creation order
+TRANSACTION_INDEXES = [{"keys": "created_at"}]
+
 class UserDB:
     @cached_property
     def db(self):
-        return MongoDB(db_name=os.getenv("MONGO_DB_NAME"),collection_name="users")
+        return AsyncMongoDB(db_name=os.getenv("MONGO_DB_NAME"),collection_name="users", cache=doc_cache)
 
 class VehicleDB:
     @cached_property
     def db(self):
-        return MongoDB(db_name=os.getenv("MONGO_DB_NAME"),collection_name="vehicles")
+        return MongoDB(db_name=os.getenv("MONGO_DB_NAME"),collection_name="vehicles", cache=doc_cache)
 
+# Handles share one pooled client (see mongo_core.ClientRegistry), so evicted
+# entries hold no sockets of their own; the cache only saves the lookup.
 @lru_cache(maxsize=100)
 def transaction_db(collection_name: str) -> MongoDB:
     return MongoDB(db_name=os.getenv("MONGO_DB_TRANSACTIONS_DB_NAME"), collection_name=collection_name)
 
-user_db = UserDB().db
-vehicle_db = VehicleDB().db
+# Handles cached before a fork belong to the parent's client
+os.register_at_fork(after_in_child=transaction_db.cache_clear)
+
+# Transaction collections whose manifest was applied by this process
+_indexed_transactions = set()
+
+
+async def ensure_transaction_indexes(collection_name: str) -> None:
+    """
+    Apply TRANSACTION_INDEXES to a per-vehicle collection once per process.
+    Collections are created on first use, after bootstrap_indexes() ran, so
+    request handlers call this before relying on the indexes. Runs in a worker
+    thread; failures are logged and retried on the next call, never raised.
+    """
+    if collection_name in _indexed_transactions:
+        return
+    try:
+        db = await asyncio.to_thread(transaction_db, collection_name)
+        await asyncio.to_thread(apply_index_manifest, db, TRANSACTION_INDEXES)
+        _indexed_transactions.add(collection_name)
+    except Exception as e:
+        logger.error(f"Error applying transaction indexes to {collection_name}: {e}")
+
+# Connect on first use in each process, not at import time
+user_db = LazyHandle(lambda: UserDB().db)
+vehicle_db = LazyHandle(lambda: VehicleDB().db)
+
+
+async def bootstrap_indexes() -> dict:
+    """
+    Apply every index manifest (idempotent) and return the drift report per
+    namespace. Existing per-vehicle transaction collections are checked too.
+    """
+    report = {}
+    result = await apply_index_manifest_async(user_db, USER_INDEXES)
+    report[result["namespace"]] = result
+    result = await asyncio.to_thread(apply_index_manifest, vehicle_db, VEHICLE_INDEXES)
+    report[result["namespace"]] = result
+
+    transactions = MongoDB(db_name=os.getenv("MONGO_DB_TRANSACTIONS_DB_NAME"), collection_name="_")
+    try:
+        names = await asyncio.to_thread(transactions.get_all_collections)
+        for name in names:
+            transactions.switch_collection(name)
+            result = await asyncio.to_thread(apply_index_manifest, transactions, TRANSACTION_INDEXES)
+            report[result["namespace"]] = result
+            _indexed_transactions.add(name)
+    finally:
+        transactions.close()
+    return report
+
 
+async def warm_up() -> dict:
+    """
+    Connect the user and vehicle clients in parallel and pre-open their pools
+    to minPoolSize, so the first requests do not pay for connection setup.
 
+    Returns:
+        dict: Connections opened per namespace.
+    """
+    users, vehicles = await asyncio.gather(
+        user_db.warm_pool(),
+        asyncio.to_thread(vehicle_db.warm_pool),
+    )
+    return {user_db.collection.full_name: users, vehicle_db.collection.full_name: vehicles}
 
 
+async def close_all() -> None:
+    """
+    Flush buffered writes and close every client: the async users client and
+    the shared sync client behind vehicle_db and all transaction_db() handles.
+    """
+    if user_db.loaded:
+        await user_db.close()
+    await close_all_async_clients()
+    if vehicle_db.loaded:
+        vehicle_db.close()
+    transaction_db.cache_clear()
+    await asyncio.to_thread(close_all_clients)
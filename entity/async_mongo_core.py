@@ -0,0 +1,1096 @@
+"""
+Async MongoDB Utility Module
+
+asyncio counterpart of entity.mongo_core.MongoDB built on pymongo's native async
+API (AsyncMongoClient). Method names, arguments and return shapes mirror the
+synchronous wrapper so call sites only need an `await`.
+
+Requirements:
+    pymongo>=4.9.0
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import AsyncMongoClient, DESCENDING
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import DuplicateKeyError
+
+from entity.doc_cache import DocumentCache, invalidates_cache
+from entity.index_advisor import index_advisor
+from entity.instrumentation import instrumented
+from entity.mongo_core import (
+    ClientRegistry,
+    DEFAULT_RETRY_POLICY,
+    MongoDB,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONNECTION_STRING,
+    DEFAULT_MAX_POOL_SIZE,
+    DEFAULT_MIN_POOL_SIZE,
+    DEFAULT_TIMEOUT_MS,
+    RAW_CODEC_OPTIONS,
+    _get_path,
+    encode_page_cursor,
+    keyset_projection,
+    keyset_query,
+)
+
+logger = logging.getLogger(__name__)
+
+_async_client_registry = ClientRegistry(AsyncMongoClient)
+
+
+async def close_all_async_clients() -> None:
+    """
+    Close every shared AsyncMongoClient in this process.
+
+    Must be awaited from the event loop the clients were used on, e.g. in the
+    application's lifespan shutdown.
+    """
+    for client in _async_client_registry.drain():
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing shared async client: {e}")
+
+
+class AsyncMongoDB:
+    """
+    asyncio MongoDB utility class with the same surface as MongoDB.
+
+    Every call is a coroutine that yields to the event loop while waiting on the
+    server, so one slow query no longer blocks unrelated requests. Retries share
+    DEFAULT_RETRY_POLICY with the synchronous wrapper and back off with asyncio.sleep.
+
+    Example:
+        >>> async with AsyncMongoDB("mydb", "mycollection") as db:
+        ...     await db.insert({"name": "John", "age": 30})
+    """
+
+    hashit = staticmethod(MongoDB.hashit)
+    verify_hash = staticmethod(MongoDB.verify_hash)
+    gen_string = staticmethod(MongoDB.gen_string)
+    gen_uuid = staticmethod(MongoDB.gen_uuid)
+    _normalize_object_id = staticmethod(MongoDB._normalize_object_id)
+    _replace_id_key = MongoDB._replace_id_key
+    _shape_document = MongoDB._shape_document
+    _cache_key = MongoDB._cache_key
+    _invalidate_cache = MongoDB._invalidate_cache
+    keyset_index_spec = staticmethod(MongoDB.keyset_index_spec)
+    get_operation_stats = MongoDB.get_operation_stats
+
+    def __init__(
+            self,
+            db_name: str,
+            collection_name: str,
+            connection_str: str = DEFAULT_CONNECTION_STRING,
+            max_pool_size: int = DEFAULT_MAX_POOL_SIZE,
+            min_pool_size: int = DEFAULT_MIN_POOL_SIZE,
+            timeout_ms: int = DEFAULT_TIMEOUT_MS,
+            cache: Optional[DocumentCache] = None,
+            **kwargs
+    ) -> None:
+        """
+        Initialize the async handle on a shared AsyncMongoClient.
+
+        No I/O happens here: the client connects in the background on first use.
+        Call health_check() to verify connectivity explicitly.
+
+        Args:
+            db_name (str): Name of the database.
+            collection_name (str): Name of the collection.
+            connection_str (str): MongoDB connection string.
+            max_pool_size (int): Maximum connection pool size for performance.
+            min_pool_size (int): Minimum connection pool size.
+            timeout_ms (int): Connection timeout in milliseconds.
+            cache (Optional[DocumentCache]): Read-through cache for get() and
+                get_by_id(); writes through this handle invalidate it.
+            **kwargs: Additional AsyncMongoClient parameters.
+        """
+        self.client: AsyncMongoClient
+        self.client, _ = _async_client_registry.acquire(
+            connection_str,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            serverSelectionTimeoutMS=timeout_ms,
+            connectTimeoutMS=timeout_ms,
+            socketTimeoutMS=timeout_ms,
+            retryWrites=True,
+            retryReads=True,
+            **kwargs
+        )
+        self.db: AsyncDatabase = self.client[db_name]
+        self.collection: AsyncCollection = self.db[collection_name]
+        self.cache = cache
+        self._closed = False
+
+    async def __aenter__(self) -> 'AsyncMongoDB':
+        """
+        Async context manager entry.
+
+        Returns:
+            AsyncMongoDB: Self instance.
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """
+        Async context manager exit with automatic connection cleanup.
+        """
+        await self.close()
+
+    async def health_check(self) -> bool:
+        """
+        Check if the MongoDB connection is healthy.
+
+        Returns:
+            bool: True if connection is healthy, False otherwise.
+        """
+        try:
+            await self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+            return False
+
+    async def warm_pool(self, connections: Optional[int] = None) -> int:
+        """
+        Open pool connections ahead of traffic by running concurrent pings.
+
+        Args:
+            connections (Optional[int]): Connections to open; defaults to the
+                client's minPoolSize.
+
+        Returns:
+            int: Number of pings that succeeded.
+        """
+        connections = connections or self.client.options.pool_options.min_pool_size
+        if connections <= 0:
+            return 0
+        # Overlapping pings each check out their own connection
+        results = await asyncio.gather(*(self.health_check() for _ in range(connections)))
+        return sum(results)
+
+    def _raw_collection(self) -> AsyncCollection:
+        """
+        The collection configured to return RawBSONDocument.
+        """
+        raw = getattr(self, "_raw_coll", None)
+        if raw is None or raw.full_name != self.collection.full_name:
+            raw = self._raw_coll = self.collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+        return raw
+
+    # ========== CRUD ==========
+
+    @instrumented(filter_arg=None)
+    @DEFAULT_RETRY_POLICY.retry(idempotent=False)
+    @invalidates_cache
+    async def insert(
+            self,
+            data: Dict[str, Any],
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> str:
+        """
+        Insert a single document.
+
+        Args:
+            data (Dict[str, Any]): Document to insert.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional insert_one parameters.
+
+        Returns:
+            str: Inserted document ID as string.
+        """
+        try:
+            result = await self.collection.insert_one(data, session=session, **kwargs)
+            logger.debug("Inserted document with ID: %s", result.inserted_id)
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"Error inserting document: {e}")
+            raise
+
+    @instrumented(filter_arg=None)
+    @DEFAULT_RETRY_POLICY.retry(idempotent=False)
+    @invalidates_cache
+    async def insert_many(
+            self,
+            data: List[Dict[str, Any]],
+            ordered: bool = False,
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> List[str]:
+        """
+        Insert multiple documents.
+
+        Args:
+            data (List[Dict[str, Any]]): List of documents to insert.
+            ordered (bool): If True, stop on first error. If False, continue on errors.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional insert_many parameters.
+
+        Returns:
+            List[str]: List of inserted document IDs as strings.
+        """
+        try:
+            if not data:
+                logger.warning("insert_many called with empty data list")
+                return []
+
+            result = await self.collection.insert_many(data, ordered=ordered, session=session, **kwargs)
+            logger.info("Inserted %s documents", len(result.inserted_ids))
+            return [str(_id) for _id in result.inserted_ids]
+        except Exception as e:
+            logger.error(f"Error inserting multiple documents: {e}")
+            raise
+
+    @instrumented(filter_arg=None)
+    @invalidates_cache
+    async def bulk_write(
+            self,
+            operations: List[Any],
+            ordered: bool = False,
+            session: Optional[AsyncClientSession] = None
+    ) -> Dict[str, int]:
+        """
+        Perform bulk write operations for better performance.
+
+        Args:
+            operations (List[Any]): List of pymongo operations
+                (InsertOne, UpdateOne, DeleteOne, etc.)
+            ordered (bool): Whether to execute operations in order.
+            session (Optional[AsyncClientSession]): Transaction session.
+
+        Returns:
+            Dict[str, int]: Result statistics (inserted, matched, modified, deleted, upserted counts).
+        """
+        try:
+            result = await self.collection.bulk_write(operations, ordered=ordered, session=session)
+            stats = {
+                "inserted": result.inserted_count,
+                "matched": result.matched_count,
+                "modified": result.modified_count,
+                "deleted": result.deleted_count,
+                "upserted": result.upserted_count
+            }
+            logger.info("Bulk write completed: %s", stats)
+            return stats
+        except Exception as e:
+            logger.error(f"Error in bulk write: {e}")
+            raise
+
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    async def filter(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            show_id: bool = False,
+            projection: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0,
+            skip: int = 0,
+            session: Optional[AsyncClientSession] = None,
+            raw: bool = False,
+            **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter documents with projection, sorting, and pagination support.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            show_id (bool): Whether to include '_id' in results.
+            projection (Optional[Dict[str, Any]]): Fields to include/exclude.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum number of documents to return (0 = no limit).
+            skip (int): Number of documents to skip.
+            session (Optional[AsyncClientSession]): Transaction session.
+            raw (bool): Return undecoded RawBSONDocuments for render_json().
+            **kwargs: Additional find parameters.
+
+        Returns:
+            List[Dict[str, Any]]: List of matching documents.
+        """
+        try:
+            result = [
+                item async for item in self.iter_filter(
+                    filter=filter,
+                    show_id=show_id,
+                    projection=projection,
+                    sort=sort,
+                    limit=limit,
+                    skip=skip,
+                    session=session,
+                    raw=raw,
+                    **kwargs
+                )
+            ]
+            logger.debug("Filter returned %s documents", len(result))
+            return result
+        except Exception as e:
+            logger.error(f"Error filtering documents: {e}")
+            raise
+
+    async def iter_filter(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            show_id: bool = False,
+            projection: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0,
+            skip: int = 0,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            session: Optional[AsyncClientSession] = None,
+            raw: bool = False,
+            **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream documents matching a filter, one server batch at a time.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            show_id (bool): Whether to include '_id' (as 'id') in results.
+            projection (Optional[Dict[str, Any]]): Fields to include/exclude.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum number of documents to return (0 = no limit).
+            skip (int): Number of documents to skip.
+            batch_size (int): Documents fetched per server round trip.
+            session (Optional[AsyncClientSession]): Transaction session.
+            raw (bool): Yield undecoded RawBSONDocuments for render_json().
+            **kwargs: Additional find parameters.
+
+        Yields:
+            Dict[str, Any]: Matching documents.
+        """
+        if projection is None:
+            projection = None if show_id else {"_id": 0}
+
+        collection = self._raw_collection() if raw else self.collection
+        cursor = collection.find(filter or {}, projection, session=session, batch_size=batch_size, **kwargs)
+
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip > 0:
+            cursor = cursor.skip(skip)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        try:
+            async for item in cursor:
+                yield item if raw else self._shape_document(item, show_id)
+        except Exception as e:
+            logger.error(f"Error iterating documents: {e}")
+            raise
+        finally:
+            await cursor.close()
+
+    async def paginate(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            page: int = 1,
+            page_size: int = 10,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            total: Optional[str] = "exact",
+            **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Paginate query results for large datasets (offset based).
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            page (int): Page number (1-indexed).
+            page_size (int): Number of documents per page.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            total (Optional[str]): "exact", "estimated" or None (see MongoDB.paginate).
+            **kwargs: Additional parameters for filter method.
+
+        Returns:
+            Dict[str, Any]: Pagination result with metadata
+                (data, page, page_size, total, total_pages).
+        """
+        try:
+            total_count = await self._page_total(filter, total)
+            total_pages = None if total_count is None else (total_count + page_size - 1) // page_size
+            skip = (page - 1) * page_size
+
+            data = await self.filter(
+                filter=filter,
+                sort=sort,
+                limit=page_size,
+                skip=skip,
+                show_id=True,
+                **kwargs
+            )
+
+            return {
+                "data": data,
+                "page": page,
+                "page_size": page_size,
+                "total": total_count,
+                "total_pages": total_pages
+            }
+        except Exception as e:
+            logger.error(f"Error in pagination: {e}")
+            raise
+
+    async def paginate_keyset(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            page_size: int = 10,
+            sort_key: str = "_id",
+            direction: int = DESCENDING,
+            cursor: Optional[str] = None,
+            projection: Optional[Dict[str, Any]] = None,
+            total: Optional[str] = None,
+            session: Optional[AsyncClientSession] = None
+    ) -> Dict[str, Any]:
+        """
+        Paginate with a cursor token that seeks on (sort_key, _id).
+
+        See MongoDB.paginate_keyset for the cursor and indexing contract.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            page_size (int): Number of documents per page.
+            sort_key (str): Field to order by.
+            direction (int): ASCENDING (1) or DESCENDING (-1).
+            cursor (Optional[str]): next_cursor from the previous page; None for the first page.
+            projection (Optional[Dict[str, Any]]): Fields to include or exclude (sort_key is always included).
+            total (Optional[str]): None (default, no count), "exact" or "estimated".
+            session (Optional[AsyncClientSession]): Transaction session.
+
+        Returns:
+            Dict[str, Any]: Page with metadata (data, page_size, next_cursor, total).
+        """
+        try:
+            query, sort = keyset_query(filter, sort_key, direction, cursor)
+            projection, keep_id = keyset_projection(projection, sort_key)
+
+            docs = await self.collection.find(query, projection, session=session).sort(sort).to_list(page_size + 1)
+
+            next_cursor = None
+            if len(docs) > page_size:
+                docs = docs[:page_size]
+                last = docs[-1]
+                next_cursor = encode_page_cursor(_get_path(last, sort_key), last["_id"], sort_key, direction)
+
+            return {
+                "data": [self._shape_document(doc, keep_id) for doc in docs],
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+                "total": await self._page_total(filter, total)
+            }
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in keyset pagination: {e}")
+            raise
+
+    async def _page_total(self, filter: Optional[Dict[str, Any]], total: Optional[str]) -> Optional[int]:
+        """
+        Resolve the total for a pagination response.
+        """
+        if total is None:
+            return None
+        if total == "estimated":
+            return await self.collection.estimated_document_count()
+        if total == "exact":
+            return await self.count(filter)
+        raise ValueError(f"Invalid total mode: {total}")
+
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    async def get(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            show_id: bool = True,
+            projection: Optional[Dict[str, Any]] = None,
+            session: Optional[AsyncClientSession] = None,
+            raw: bool = False,
+            use_cache: bool = True,
+            **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a single document matching the filter.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            show_id (bool): Whether to include '_id' in result.
+            projection (Optional[Dict[str, Any]]): Fields to include/exclude.
+            session (Optional[AsyncClientSession]): Transaction session.
+            raw (bool): Return the undecoded RawBSONDocument (or None) for render_json().
+            use_cache (bool): Read through the handle's cache, if any. Calls with a
+                session, raw=True or extra find_one arguments always bypass it.
+            **kwargs: Additional find_one parameters.
+
+        Returns:
+            Optional[Dict[str, Any]]: The first matching document, or {} if not found.
+        """
+        try:
+            if projection is None:
+                projection = None if show_id else {"_id": 0}
+
+            if raw:
+                return await self._raw_collection().find_one(filter or {}, projection, session=session, **kwargs)
+
+            cache_key = None
+            if not kwargs:
+                cache_key = self._cache_key(use_cache, session, "get", filter, projection, show_id)
+                if cache_key is not None:
+                    doc = self.cache.get(self.collection.full_name, cache_key)
+                    if doc is not None:
+                        return doc
+                    generation = self.cache.generation(self.collection.full_name)
+
+            doc = await self.collection.find_one(filter or {}, projection, session=session, **kwargs)
+
+            if doc and show_id and "_id" in doc:
+                doc = self._replace_id_key(doc)
+            elif doc and not show_id:
+                doc.pop("_id", None)
+
+            if cache_key is not None:
+                self.cache.set(self.collection.full_name, cache_key, doc, if_generation=generation)
+            return doc if doc else {}
+        except Exception as e:
+            logger.error(f"Error in get: {e}")
+            raise
+
+    @instrumented(filter_arg="_id")
+    async def get_by_id(
+            self,
+            _id: Union[str, ObjectId],
+            show_id: bool = True,
+            session: Optional[AsyncClientSession] = None,
+            use_cache: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a document by its ObjectId.
+
+        Args:
+            _id (Union[str, ObjectId]): Document ID.
+            show_id (bool): Whether to include '_id' in result.
+            session (Optional[AsyncClientSession]): Transaction session.
+            use_cache (bool): Read through the handle's cache, if any.
+
+        Returns:
+            Optional[Dict[str, Any]]: The document, or None if not found.
+
+        Raises:
+            ValueError: If _id is invalid.
+        """
+        try:
+            if isinstance(_id, str):
+                _id = ObjectId(_id)
+
+            cache_key = self._cache_key(use_cache, session, "get_by_id", _id, show_id)
+            if cache_key is not None:
+                doc = self.cache.get(self.collection.full_name, cache_key)
+                if doc is not None:
+                    return doc
+                generation = self.cache.generation(self.collection.full_name)
+
+            doc = await self.collection.find_one({"_id": _id}, session=session)
+
+            if doc and show_id:
+                doc = self._replace_id_key(doc)
+            elif doc and not show_id:
+                doc.pop("_id", None)
+
+            if cache_key is not None:
+                self.cache.set(self.collection.full_name, cache_key, doc, if_generation=generation)
+            return doc
+        except InvalidId as e:
+            logger.error(f"Invalid ObjectId: {_id}")
+            raise ValueError(f"Invalid ObjectId: {_id}") from e
+        except Exception as e:
+            logger.error(f"Error in get_by_id: {e}")
+            raise
+
+    @instrumented(docs=None)
+    @DEFAULT_RETRY_POLICY.retry()
+    async def count(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> int:
+        """
+        Count documents matching a filter.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional count_documents parameters.
+
+        Returns:
+            int: Number of matching documents.
+        """
+        try:
+            return await self.collection.count_documents(filter or {}, session=session, **kwargs)
+        except Exception as e:
+            logger.error(f"Error counting documents: {e}")
+            raise
+
+    async def exists(
+            self,
+            filter: Dict[str, Any],
+            session: Optional[AsyncClientSession] = None
+    ) -> bool:
+        """
+        Check if any document matches the filter.
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            session (Optional[AsyncClientSession]): Transaction session.
+
+        Returns:
+            bool: True if at least one document exists, False otherwise.
+        """
+        try:
+            return await self.collection.find_one(filter, {"_id": 1}, session=session) is not None
+        except Exception as e:
+            logger.error(f"Error checking existence: {e}")
+            raise
+
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    @invalidates_cache
+    async def update(
+            self,
+            filter: Dict[str, Any],
+            update_data: Dict[str, Any],
+            upsert: bool = False,
+            array_filters: Optional[List[Dict]] = None,
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> int:
+        """
+        Update multiple documents matching a filter with safety checks.
+
+        Args:
+            filter (Dict[str, Any]): Query filter (must not be empty).
+            update_data (Dict[str, Any]): Data to update.
+            upsert (bool): Create document if it doesn't exist.
+            array_filters (Optional[List[Dict]]): Filters for array updates.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional update_many parameters.
+
+        Returns:
+            int: Number of documents modified.
+
+        Raises:
+            ValueError: If filter is empty (prevents accidental mass updates).
+        """
+        if not filter:
+            raise ValueError("Empty filter not allowed in update. Use update_all() for mass updates.")
+
+        try:
+            filter = self._normalize_object_id(filter)
+            result = await self.collection.update_many(
+                filter,
+                {"$set": update_data},
+                upsert=upsert,
+                array_filters=array_filters,
+                session=session,
+                **kwargs
+            )
+            logger.info("Updated %s documents", result.modified_count)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating documents: {e}")
+            raise
+
+    @instrumented()
+    @invalidates_cache
+    async def update_one(
+            self,
+            filter: Dict[str, Any],
+            update_data: Dict[str, Any],
+            upsert: bool = False,
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> bool:
+        """
+        Update a single document matching the filter.
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            update_data (Dict[str, Any]): Data to update.
+            upsert (bool): Create document if it doesn't exist.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional update_one parameters.
+
+        Returns:
+            bool: True if a document was modified, False otherwise.
+        """
+        try:
+            filter = self._normalize_object_id(filter)
+            result = await self.collection.update_one(
+                filter,
+                {"$set": update_data},
+                upsert=upsert,
+                session=session,
+                **kwargs
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"Error in update_one: {e}")
+            raise
+
+    async def update_or_create(
+            self,
+            filter: Dict[str, Any],
+            data: Dict[str, Any],
+            session: Optional[AsyncClientSession] = None
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Update a document matching the filter, or create it if it doesn't exist (upsert).
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            data (Dict[str, Any]): Data to update or insert.
+            session (Optional[AsyncClientSession]): Transaction session.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], bool]: (The document, True if created, False if updated)
+        """
+        result = None
+        try:
+            try:
+                result = await self.collection.update_one(filter, {"$set": data}, upsert=True, session=session)
+            finally:
+                # Only a write that changed something makes cached reads stale
+                if result is None or result.upserted_id is not None or result.modified_count:
+                    self._invalidate_cache()
+
+            if result.upserted_id is not None:
+                doc = await self.collection.find_one({"_id": result.upserted_id}, session=session)
+                logger.debug("Created document with ID: %s", result.upserted_id)
+                return self._replace_id_key(doc), True
+
+            doc = await self.collection.find_one(filter, session=session)
+            logger.debug("Updated existing document")
+            return self._replace_id_key(doc), False
+        except Exception as e:
+            logger.error(f"Error in update_or_create: {e}")
+            raise
+
+    async def get_or_create(
+            self,
+            filter: Dict[str, Any],
+            data: Optional[Dict[str, Any]] = None,
+            session: Optional[AsyncClientSession] = None
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Fetch a document matching the filter, or create it if it doesn't exist.
+
+        If a unique index on the filter fields makes a concurrent create fail
+        with DuplicateKeyError, the document that won is returned as fetched.
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            data (Optional[Dict[str, Any]]): Additional data to insert if not found.
+            session (Optional[AsyncClientSession]): Transaction session.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], bool]: (The document, True if created, False if fetched)
+        """
+        try:
+            doc = await self.collection.find_one(filter, session=session)
+
+            if doc:
+                logger.debug("Document found")
+                return self._replace_id_key(doc), False
+
+            new_doc = {**filter}
+            if data:
+                new_doc.update(data)
+
+            try:
+                inserted_id = (await self.collection.insert_one(new_doc, session=session)).inserted_id
+            except DuplicateKeyError:
+                # A concurrent caller created it between find_one and insert_one
+                doc = await self.collection.find_one(filter, session=session)
+                if not doc:
+                    raise
+                logger.debug("Document created concurrently")
+                return self._replace_id_key(doc), False
+            finally:
+                # Only the create path writes; a plain fetch leaves the cache alone
+                self._invalidate_cache()
+            new_doc["_id"] = str(inserted_id)
+            logger.debug("Created document with ID: %s", inserted_id)
+            return self._replace_id_key(new_doc), True
+        except Exception as e:
+            logger.error(f"Error in get_or_create: {e}")
+            raise
+
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    @invalidates_cache
+    async def delete(
+            self,
+            filter: Dict[str, Any],
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> int:
+        """
+        Delete multiple documents matching a filter with safety checks.
+
+        Args:
+            filter (Dict[str, Any]): Query filter (must not be empty).
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional delete_many parameters.
+
+        Returns:
+            int: Number of documents deleted.
+
+        Raises:
+            ValueError: If filter is empty (prevents accidental mass deletion).
+        """
+        if not filter:
+            raise ValueError("Empty filter not allowed in delete. Use drop_collection() to delete all.")
+
+        try:
+            filter = self._normalize_object_id(filter)
+            result = await self.collection.delete_many(filter, session=session, **kwargs)
+            logger.info("Deleted %s documents", result.deleted_count)
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting documents: {e}")
+            raise
+
+    @instrumented()
+    @invalidates_cache
+    async def delete_one(
+            self,
+            filter: Dict[str, Any],
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> bool:
+        """
+        Delete a single document matching the filter.
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional delete_one parameters.
+
+        Returns:
+            bool: True if a document was deleted, False otherwise.
+        """
+        try:
+            filter = self._normalize_object_id(filter)
+            result = await self.collection.delete_one(filter, session=session, **kwargs)
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"Error in delete_one: {e}")
+            raise
+
+    # ========== INDEX MANAGEMENT ==========
+
+    async def create_index(
+            self,
+            keys: Union[str, List[Tuple[str, int]]],
+            unique: bool = False,
+            sparse: bool = False,
+            name: Optional[str] = None,
+            **kwargs
+    ) -> str:
+        """
+        Create an index on the collection.
+
+        Args:
+            keys: Field name or [(field, direction), ...] list.
+            unique (bool): Ensure uniqueness constraint.
+            sparse (bool): Only index documents with the indexed field.
+            name (Optional[str]): Index name.
+            **kwargs: Additional create_index parameters.
+
+        Returns:
+            str: Name of the created index.
+        """
+        try:
+            if isinstance(keys, str):
+                keys = [(keys, 1)]
+            if name:
+                kwargs["name"] = name
+
+            index_name = await self.collection.create_index(keys, unique=unique, sparse=sparse, **kwargs)
+            logger.info(f"Created index: {index_name}")
+            return index_name
+        except Exception as e:
+            logger.error(f"Error creating index: {e}")
+            raise
+
+    async def list_indexes(self) -> List[Dict[str, Any]]:
+        """
+        List all indexes on the collection.
+
+        Returns:
+            List[Dict[str, Any]]: List of index information dictionaries.
+        """
+        try:
+            cursor = await self.collection.list_indexes()
+            return await cursor.to_list()
+        except Exception as e:
+            logger.error(f"Error listing indexes: {e}")
+            raise
+
+    async def ensure_indexes(self, indexes: List[Dict[str, Any]]) -> List[str]:
+        """
+        Ensure multiple indexes exist (idempotent operation).
+
+        Args:
+            indexes (List[Dict[str, Any]]): List of index specifications.
+                Each dict should have 'keys' and optional params.
+
+        Returns:
+            List[str]: Names of created/existing indexes.
+        """
+        created_indexes = []
+        for idx_spec in indexes:
+            options = dict(idx_spec)
+            keys = options.pop("keys")
+            try:
+                name = await self.create_index(keys, **options)
+                created_indexes.append(name)
+            except Exception as e:
+                logger.warning(f"Could not create index on {keys}: {e}")
+
+        return created_indexes
+
+    async def index_report(self) -> Dict[str, Any]:
+        """
+        Compare the query shapes observed on this collection with its indexes.
+        See entity.index_advisor.IndexAdvisor.
+
+        Returns:
+            Dict[str, Any]: {namespace, missing, partial, unused, dropped_shapes}.
+        """
+        return await index_advisor.recommend_async(self)
+
+    # ========== TRANSACTION SUPPORT ==========
+
+    @asynccontextmanager
+    async def start_session(self, **kwargs) -> AsyncGenerator[AsyncClientSession, None]:
+        """
+        Async context manager for MongoDB sessions (required for transactions).
+
+        Args:
+            **kwargs: Additional start_session parameters.
+
+        Yields:
+            AsyncClientSession: MongoDB session object.
+        """
+        session = self.client.start_session(**kwargs)
+        try:
+            yield session
+        finally:
+            await session.end_session()
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs) -> AsyncGenerator[AsyncClientSession, None]:
+        """
+        Async context manager for atomic transactions across multiple operations.
+
+        Args:
+            **kwargs: Additional transaction options.
+
+        Yields:
+            AsyncClientSession: MongoDB session with active transaction.
+
+        Example:
+            >>> async with db.transaction() as session:
+            ...     await db.insert({"name": "John"}, session=session)
+            ...     await db.update({"name": "Jane"}, {"age": 30}, session=session)
+        """
+        try:
+            async with self.start_session() as session:
+                async with await session.start_transaction(**kwargs):
+                    try:
+                        yield session
+                    except Exception as e:
+                        logger.error(f"Transaction aborted due to error: {e}")
+                        raise
+        finally:
+            self._invalidate_cache()
+
+    # ========== AGGREGATION METHODS ==========
+
+    @instrumented(filter_arg="pipeline")
+    async def aggregate(
+            self,
+            pipeline: List[Dict[str, Any]],
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform aggregation pipeline query.
+
+        Args:
+            pipeline (List[Dict[str, Any]]): Aggregation pipeline stages.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional aggregate parameters.
+
+        Returns:
+            List[Dict[str, Any]]: Aggregation results.
+        """
+        try:
+            results = [doc async for doc in self.iter_aggregate(pipeline, session=session, **kwargs)]
+            logger.debug("Aggregation returned %s results", len(results))
+            return results
+        except Exception as e:
+            logger.error(f"Error in aggregation: {e}")
+            raise
+
+    async def iter_aggregate(
+            self,
+            pipeline: List[Dict[str, Any]],
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            session: Optional[AsyncClientSession] = None,
+            **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream aggregation results, one server batch at a time.
+
+        Args:
+            pipeline (List[Dict[str, Any]]): Aggregation pipeline stages.
+            batch_size (int): Documents fetched per server round trip.
+            session (Optional[AsyncClientSession]): Transaction session.
+            **kwargs: Additional aggregate parameters.
+
+        Yields:
+            Dict[str, Any]: Aggregation results.
+        """
+        cursor = await self.collection.aggregate(pipeline, session=session, batchSize=batch_size, **kwargs)
+        try:
+            async for doc in cursor:
+                yield doc
+        except Exception as e:
+            logger.error(f"Error iterating aggregation: {e}")
+            raise
+        finally:
+            await cursor.close()
+
+    # ========== CLEANUP ==========
+
+    async def close(self) -> None:
+        """
+        Release this handle; the shared client is closed with its last handle.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            client = _async_client_registry.release(self.client)
+            if client is not None:
+                await client.close()
+                logger.info("MongoDB connection closed")
+        except Exception as e:
+            logger.error(f"Error closing connection: {e}")
@@ -0,0 +1,310 @@
+"""
+Streaming export of a collection to NDJSON or CSV, optionally gzip-compressed.
+
+Documents are pulled from a server-side cursor one batch at a time, rendered
+from raw BSON and packed into output chunks of about `chunk_bytes`, so memory
+stays constant however many documents match. The same byte stream can be
+written to a file or consumed as an async iterator, e.g. by FastAPI's
+StreamingResponse. In the async case each chunk is produced only when the
+previous one has been sent, so a slow client slows the cursor down instead of
+letting output pile up in memory.
+
+Example:
+    >>> exporter = BulkExporter(transaction_db(vehicle_id), fmt="csv", gzip=True)
+    >>> exporter.to_file("history.csv.gz", sort=[("created_at", 1)])
+    >>> StreamingResponse(exporter.stream(), media_type=exporter.media_type,
+    ...                   headers=exporter.download_headers("history"))
+"""
+import asyncio
+import csv
+import inspect
+import io
+import json
+import logging
+import zlib
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from entity.mongo_core import DEFAULT_BATCH_SIZE, _json_default, render_json
+
+if TYPE_CHECKING:
+    from entity.async_mongo_core import AsyncMongoDB
+    from entity.mongo_core import MongoDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+class _Encoder:
+    """
+    Turns documents into output byte chunks for one export.
+    """
+
+    def __init__(self, fmt: str, fields: Optional[Sequence[str]], gzip: bool, chunk_bytes: int) -> None:
+        self.fmt = fmt
+        self.fields = list(fields) if fields is not None else None
+        self.chunk_bytes = chunk_bytes
+        self._buffer = bytearray()
+        self._compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+        self._text = io.StringIO()
+        self._csv = csv.writer(self._text, lineterminator="\n")
+        self._header_written = False
+
+    def add(self, doc: Any) -> Optional[bytes]:
+        """
+        Encode one document; returns a chunk once enough output is buffered.
+        """
+        if self.fmt == "ndjson":
+            self._buffer += render_json(doc, self.fields)
+            self._buffer += b"\n"
+        else:
+            self._add_csv_row(doc)
+        if len(self._buffer) >= self.chunk_bytes:
+            return self._take()
+        return None
+
+    def finish(self) -> bytes:
+        """
+        Return whatever is still buffered (plus the gzip trailer).
+        """
+        if self.fmt == "csv" and not self._header_written and self.fields:
+            self._write_csv(self.fields)
+        chunk = self._take()
+        if self._compressor is not None:
+            chunk += self._compressor.flush()
+        return chunk
+
+    def _add_csv_row(self, doc: Any) -> None:
+        if self.fields is None:
+            self.fields = ["id" if key == "_id" else key for key in doc.keys()]
+        if not self._header_written:
+            self._write_csv(self.fields)
+            self._header_written = True
+        self._write_csv([self._csv_value(doc, field) for field in self.fields])
+
+    def _write_csv(self, row: Iterable[Any]) -> None:
+        self._csv.writerow(row)
+        self._buffer += self._text.getvalue().encode("utf-8")
+        self._text.seek(0)
+        self._text.truncate()
+
+    @staticmethod
+    def _csv_value(doc: Any, field: str) -> Any:
+        source = "_id" if field == "id" and "id" not in doc else field
+        if source not in doc:
+            return ""
+        value = doc[source]
+        if value is None:
+            return ""
+        if isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, (list, tuple)) or hasattr(value, "keys"):
+            return json.dumps(value, separators=(",", ":"), default=_json_default)
+        return _json_default(value)
+
+    def _take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        if self._compressor is not None:
+            return self._compressor.compress(data)
+        return data
+
+
+class BulkExporter:
+    """
+    Export the documents matching a filter as NDJSON or CSV bytes.
+
+    Works with both MongoDB (sync) and AsyncMongoDB handles. Async handles are
+    streamed natively; sync cursors are advanced in a worker thread so the
+    event loop is never blocked.
+    """
+
+    def __init__(
+            self,
+            db: Union["MongoDB", "AsyncMongoDB"],
+            fmt: str = "ndjson",
+            fields: Optional[Sequence[str]] = None,
+            gzip: bool = False,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            chunk_bytes: int = DEFAULT_CHUNK_BYTES
+    ) -> None:
+        """
+        Args:
+            db (Union[MongoDB, AsyncMongoDB]): Collection handle to export from.
+            fmt (str): "ndjson" or "csv".
+            fields (Optional[Sequence[str]]): Output fields in order ('id' is the
+                document _id). None exports every field; for CSV the columns are
+                then taken from the first document.
+            gzip (bool): gzip-compress the output.
+            batch_size (int): Documents fetched per cursor round trip.
+            chunk_bytes (int): Approximate size of each output chunk before compression.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+        self.db = db
+        self.fmt = fmt
+        self.fields = fields
+        self.gzip = gzip
+        self.batch_size = batch_size
+        self.chunk_bytes = chunk_bytes
+
+    @property
+    def media_type(self) -> str:
+        """
+        Content type of the produced stream.
+        """
+        return "application/gzip" if self.gzip else EXPORT_FORMATS[self.fmt][0]
+
+    def filename(self, stem: str) -> str:
+        """
+        File name with the matching extension, e.g. "history.csv.gz".
+        """
+        name = f"{stem}.{EXPORT_FORMATS[self.fmt][1]}"
+        return f"{name}.gz" if self.gzip else name
+
+    def download_headers(self, stem: str) -> Dict[str, str]:
+        """
+        Content-Disposition header for serving the export as a download.
+        """
+        return {"Content-Disposition": f'attachment; filename="{self.filename(stem)}"'}
+
+    # ========== SYNC ==========
+
+    def iter_chunks(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0
+    ) -> Iterator[bytes]:
+        """
+        Lazily produce the export as byte chunks (sync handles only).
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum documents to export (0 = no limit).
+
+        Yields:
+            bytes: Output chunks.
+        """
+        encoder = self._encoder()
+        docs = self.db.iter_filter(
+            filter=filter, show_id=True, sort=sort, limit=limit, batch_size=self.batch_size, raw=True
+        )
+        try:
+            for doc in docs:
+                chunk = encoder.add(doc)
+                if chunk:
+                    yield chunk
+        finally:
+            docs.close()
+        tail = encoder.finish()
+        if tail:
+            yield tail
+
+    def to_file(
+            self,
+            path: str,
+            filter: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0
+    ) -> int:
+        """
+        Write the export to a file (sync handles only).
+
+        Args:
+            path (str): Destination file.
+            filter (Optional[Dict[str, Any]]): Query filter.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum documents to export (0 = no limit).
+
+        Returns:
+            int: Bytes written.
+        """
+        written = 0
+        try:
+            with open(path, "wb") as fh:
+                for chunk in self.iter_chunks(filter=filter, sort=sort, limit=limit):
+                    fh.write(chunk)
+                    written += len(chunk)
+            logger.info(f"Exported {self.db.collection.full_name} to {path} ({written} bytes)")
+            return written
+        except Exception as e:
+            logger.error(f"Error exporting {self.db.collection.full_name} to {path}: {e}")
+            raise
+
+    # ========== ASYNC ==========
+
+    async def stream(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0
+    ) -> AsyncIterator[bytes]:
+        """
+        Produce the export as an async iterator of byte chunks, suitable for
+        StreamingResponse. The next chunk is only built once the consumer asks
+        for it.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum documents to export (0 = no limit).
+
+        Yields:
+            bytes: Output chunks.
+        """
+        if inspect.isasyncgenfunction(self.db.iter_filter):
+            async for chunk in self._stream_async(filter, sort, limit):
+                yield chunk
+            return
+
+        chunks = self.iter_chunks(filter=filter, sort=sort, limit=limit)
+        done = object()
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                # Shielded, so a disconnect cancels the wait but not the worker's next()
+                pending = asyncio.ensure_future(asyncio.to_thread(next, chunks, done))
+                chunk = await asyncio.shield(pending)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            if pending is not None and not pending.done():
+                # The generator is still running in the worker thread; closing
+                # it before next() returns raises "generator already executing"
+                await asyncio.wait([pending])
+                if not pending.cancelled():
+                    pending.exception()
+            # Closes the cursor if the client disconnected mid-export
+            await asyncio.to_thread(chunks.close)
+
+    async def _stream_async(
+            self,
+            filter: Optional[Dict[str, Any]],
+            sort: Optional[List[Tuple[str, int]]],
+            limit: int
+    ) -> AsyncIterator[bytes]:
+        encoder = self._encoder()
+        docs = self.db.iter_filter(
+            filter=filter, show_id=True, sort=sort, limit=limit, batch_size=self.batch_size, raw=True
+        )
+        try:
+            async for doc in docs:
+                chunk = encoder.add(doc)
+                if chunk:
+                    yield chunk
+        finally:
+            await docs.aclose()
+        tail = encoder.finish()
+        if tail:
+            yield tail
+
+    def _encoder(self) -> _Encoder:
+        return _Encoder(self.fmt, self.fields, self.gzip, self.chunk_bytes)
@@ -0,0 +1,390 @@
+"""
+Chunked, resumable bulk import from NDJSON or CSV files (optionally gzipped).
+
+Rows are read lazily and grouped into chunks of `chunk_size`. Each chunk is
+validated against an optional pydantic model and written with an unordered
+insert_many by a pool of worker threads. At most `max_chunks` chunks are held
+in memory at once, so memory stays flat no matter how large the file is.
+
+Rows that fail to parse, fail validation or are rejected by the server are
+appended to a reject file (NDJSON: row number, error, original record). After
+every chunk the number of rows fully processed, counted contiguously from the
+start of the file, is written to a checkpoint file. A re-run with the same
+checkpoint skips those rows. Chunks that finished after the checkpoint may be
+written again on resume, so give documents a deterministic _id (a record's _id
+is kept through model validation) or a unique index when exactly-once
+matters; the re-written rows are then rejected as duplicate keys.
+
+Usage:
+    python -m entity.bulk_import history.ndjson.gz --db fuel-check-transactions \\
+        --collection <vehicle_id> --model models.transaction_model:CreateTransaction \\
+        --checkpoint history.ckpt.json --rejects history.rejects.ndjson
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from pymongo.errors import BulkWriteError
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+    from entity.mongo_core import MongoDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+# (row number, parsed record or None, parse error or None)
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(path: str) -> str:
+    """
+    Infer the file format from its extension.
+
+    Args:
+        path (str): File path, e.g. "data.ndjson.gz" or "data.csv".
+
+    Returns:
+        str: "ndjson" or "csv".
+
+    Raises:
+        ValueError: If the extension is not recognised.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    raise ValueError(f"Cannot infer format of {path}; pass fmt='ndjson' or fmt='csv'")
+
+
+def open_text(path: str, mode: str = "rt"):
+    """
+    Open a text file, transparently handling gzip by extension.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def iter_rows(path: str, fmt: str) -> Iterator[Row]:
+    """
+    Lazily yield (row number, record, parse error) from an NDJSON or CSV file.
+
+    Row numbers start at 1 and count data rows (the CSV header is not a row).
+    Empty CSV cells are omitted so model defaults apply.
+    """
+    with open_text(path) as fh:
+        if fmt == "csv":
+            for row_no, record in enumerate(csv.DictReader(fh), start=1):
+                yield row_no, {k: v for k, v in record.items() if v not in ("", None)}, None
+            return
+
+        row_no = 0
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            row_no += 1
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("record is not a JSON object")
+                yield row_no, record, None
+            except ValueError as e:
+                yield row_no, {"_raw": line}, f"parse error: {e}"
+
+
+class BulkImporter:
+    """
+    Stream a file into a collection in bounded, validated, parallel chunks.
+
+    Example:
+        >>> importer = BulkImporter(db, model=transaction_model.CreateTransaction,
+        ...                         checkpoint_path="tx.ckpt.json", reject_path="tx.rejects.ndjson")
+        >>> importer.run("transactions.ndjson.gz")
+        {'rows': 1000000, 'inserted': 999874, 'rejected': 126, ...}
+    """
+
+    def __init__(
+            self,
+            db: "MongoDB",
+            model: Optional[Type["BaseModel"]] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            workers: int = DEFAULT_WORKERS,
+            max_chunks: Optional[int] = None,
+            checkpoint_path: Optional[str] = None,
+            reject_path: Optional[str] = None,
+            progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
+        """
+        Args:
+            db (MongoDB): Target collection handle.
+            model (Optional[Type[BaseModel]]): pydantic model each record must satisfy.
+                The validated model_dump(), plus the record's _id if it has one, is
+                inserted. None inserts records as-is.
+            chunk_size (int): Rows per insert_many.
+            workers (int): Parallel insert_many workers.
+            max_chunks (Optional[int]): Chunks held in memory at once (default 2 * workers).
+            checkpoint_path (Optional[str]): JSON file recording progress for resume.
+            reject_path (Optional[str]): NDJSON file receiving rejected rows.
+            progress (Optional[Callable[[Dict[str, Any]], None]]): Called with the
+                running totals after each chunk (defaults to an INFO log line).
+        """
+        self.db = db
+        self.model = model
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_chunks = max_chunks or 2 * workers
+        self.checkpoint_path = checkpoint_path
+        self.reject_path = reject_path
+        self.progress = progress or self._log_progress
+
+        self._lock = threading.Lock()
+        self._reject_fh = None
+        self._totals: Dict[str, Any] = {}
+
+    # ========== PUBLIC ==========
+
+    def run(self, path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import a file.
+
+        Args:
+            path (str): NDJSON/CSV file, optionally ending in .gz.
+            fmt (Optional[str]): "ndjson" or "csv"; inferred from the extension if None.
+
+        Returns:
+            Dict[str, Any]: Totals (rows, inserted, rejected, chunks, resumed_from, elapsed).
+
+        Raises:
+            Exception: The first unrecoverable insert error; the checkpoint then
+                reflects every row processed before it.
+        """
+        fmt = fmt or detect_format(path)
+        resume_from = self._load_checkpoint(path)
+        self._totals = {
+            "rows": resume_from, "inserted": 0, "rejected": 0, "chunks": 0,
+            "resumed_from": resume_from, "elapsed": 0.0,
+        }
+        started = time.monotonic()
+
+        # Contiguous-completion bookkeeping for the checkpoint
+        chunk_ends: Dict[int, int] = {}
+        completed: Set[int] = set()
+        next_to_commit = 0
+
+        if self.reject_path:
+            self._reject_fh = open(self.reject_path, "a", encoding="utf-8")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-import") as pool:
+                in_flight: Dict[Future, int] = {}
+                error: Optional[BaseException] = None
+
+                for index, chunk in enumerate(self._iter_chunks(path, fmt, resume_from)):
+                    chunk_ends[index] = chunk[-1][0]
+                    in_flight[pool.submit(self._process_chunk, chunk)] = index
+                    if len(in_flight) >= self.max_chunks:
+                        error = self._collect(in_flight, completed, FIRST_COMPLETED) or error
+                        next_to_commit = self._advance(path, next_to_commit, completed, chunk_ends, started)
+                    if error is not None:
+                        break
+
+                while in_flight:
+                    error = self._collect(in_flight, completed, FIRST_COMPLETED) or error
+                    next_to_commit = self._advance(path, next_to_commit, completed, chunk_ends, started)
+
+                if error is not None:
+                    raise error
+        finally:
+            if self._reject_fh is not None:
+                self._reject_fh.close()
+                self._reject_fh = None
+
+        self._totals["elapsed"] = time.monotonic() - started
+        logger.info(f"Import of {path} finished: {self._totals}")
+        return dict(self._totals)
+
+    # ========== INTERNALS ==========
+
+    def _iter_chunks(self, path: str, fmt: str, skip_rows: int) -> Iterator[List[Row]]:
+        chunk: List[Row] = []
+        for row in iter_rows(path, fmt):
+            if row[0] <= skip_rows:
+                continue
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _process_chunk(self, chunk: List[Row]) -> Tuple[int, int]:
+        """
+        Validate and insert one chunk.
+
+        Returns:
+            Tuple[int, int]: (inserted, rejected)
+        """
+        docs: List[Dict[str, Any]] = []
+        doc_rows: List[Row] = []
+        rejected = 0
+
+        for row_no, record, parse_error in chunk:
+            if parse_error is not None:
+                self._reject(row_no, record, parse_error)
+                rejected += 1
+                continue
+            try:
+                docs.append(self._validate(record))
+                doc_rows.append((row_no, record, None))
+            except Exception as e:
+                self._reject(row_no, record, f"validation error: {e}")
+                rejected += 1
+
+        inserted = 0
+        if docs:
+            try:
+                inserted = len(self.db.insert_many(docs, ordered=False))
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                inserted = e.details.get("nInserted", len(docs) - len(write_errors))
+                for err in write_errors:
+                    row_no, record, _ = doc_rows[err["index"]]
+                    self._reject(row_no, record, f"write error {err.get('code')}: {err.get('errmsg')}")
+                    rejected += 1
+
+        return inserted, rejected
+
+    def _validate(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if self.model is None:
+            return dict(record)
+        doc = self.model.model_validate(record).model_dump()
+        if doc.get("id") is None:
+            doc.pop("id", None)
+        # Models don't declare _id; without it a resumed run would insert copies
+        if "_id" in record:
+            doc = {"_id": record["_id"], **doc}
+        return doc
+
+    def _reject(self, row_no: int, record: Optional[Dict[str, Any]], error: str) -> None:
+        if self._reject_fh is None:
+            return
+        line = json.dumps({"row": row_no, "error": error, "record": record}, default=str)
+        with self._lock:
+            self._reject_fh.write(line + "\n")
+
+    def _collect(self, in_flight: Dict[Future, int], completed: Set[int], return_when: str) -> Optional[BaseException]:
+        """
+        Wait for chunk futures, fold their results into the totals.
+
+        Returns:
+            Optional[BaseException]: The first failure among the finished chunks.
+        """
+        done, _ = wait(in_flight, return_when=return_when)
+        error = None
+        for future in done:
+            index = in_flight.pop(future)
+            try:
+                inserted, rejected = future.result()
+            except Exception as e:
+                logger.error(f"Chunk {index} failed: {e}")
+                error = error or e
+                continue
+            completed.add(index)
+            self._totals["inserted"] += inserted
+            self._totals["rejected"] += rejected
+            self._totals["chunks"] += 1
+        return error
+
+    def _advance(self, path: str, next_to_commit: int, completed: Set[int],
+                 chunk_ends: Dict[int, int], started: float) -> int:
+        """
+        Move the checkpoint past every contiguously completed chunk.
+        """
+        advanced = False
+        while next_to_commit in completed:
+            completed.discard(next_to_commit)
+            self._totals["rows"] = chunk_ends.pop(next_to_commit)
+            next_to_commit += 1
+            advanced = True
+        if advanced:
+            self._totals["elapsed"] = time.monotonic() - started
+            self._save_checkpoint(path)
+            self.progress(dict(self._totals))
+        return next_to_commit
+
+    def _load_checkpoint(self, path: str) -> int:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding="utf-8") as fh:
+            state = json.load(fh)
+        if state.get("path") != os.path.abspath(path):
+            logger.warning(f"Checkpoint {self.checkpoint_path} belongs to {state.get('path')}, ignoring it")
+            return 0
+        logger.info(f"Resuming import of {path} after row {state['rows']}")
+        return int(state["rows"])
+
+    def _save_checkpoint(self, path: str) -> None:
+        if not self.checkpoint_path:
+            return
+        state = {"path": os.path.abspath(path), **self._totals}
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, self.checkpoint_path)
+
+    @staticmethod
+    def _log_progress(totals: Dict[str, Any]) -> None:
+        rate = (totals["rows"] - totals["resumed_from"]) / totals["elapsed"] if totals["elapsed"] else 0.0
+        logger.info(
+            f"Imported through row {totals['rows']}: {totals['inserted']} inserted, "
+            f"{totals['rejected']} rejected ({rate:.0f} rows/s)"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    from dotenv import load_dotenv
+
+    from entity.mongo_core import MongoDB
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Bulk import NDJSON/CSV into MongoDB")
+    parser.add_argument("path")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--model", help="pydantic model as module:Class, e.g. models.transaction_model:CreateTransaction")
+    parser.add_argument("--format", choices=("ndjson", "csv"))
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--rejects")
+    args = parser.parse_args()
+
+    model = None
+    if args.model:
+        module_name, _, class_name = args.model.partition(":")
+        model = getattr(importlib.import_module(module_name), class_name)
+
+    with MongoDB(db_name=args.db, collection_name=args.collection) as target:
+        BulkImporter(
+            target,
+            model=model,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            reject_path=args.rejects,
+        ).run(args.path, args.format)
@@ -0,0 +1,258 @@
+"""
+Read-through document cache for the MongoDB wrappers.
+
+Small, rarely changing documents (users, vehicles) are read far more often than
+they are written. DocumentCache keeps recent get()/get_by_id() results in
+process memory, encoded as BSON so every hit returns a fresh copy and the
+memory bound is exact.
+
+Entries expire after a per-collection TTL, the least recently used entries are
+evicted once `max_bytes` is exceeded, and every write through a handle drops
+the cached entries of its collection. Each invalidation also bumps the
+collection's generation: a read takes generation() before querying MongoDB and
+passes it to set(), so a document read before a concurrent write finished is
+not put back into the cache afterwards.
+"""
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Set, Tuple
+
+import bson
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 30.0
+DEFAULT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+
+class DocumentCache:
+    """
+    Thread-safe LRU + TTL cache of documents, bounded by encoded size.
+
+    Example:
+        >>> cache = DocumentCache(ttl=30, ttls={"users": 10}, max_bytes=4 * 1024 * 1024)
+        >>> users = MongoDB("app", "users", cache=cache)
+        >>> users.get_by_id(user_id)                   # miss, reads MongoDB
+        >>> users.get_by_id(user_id)                   # hit
+        >>> users.get_by_id(user_id, use_cache=False)  # bypass
+        >>> cache.stats()
+    """
+
+    def __init__(
+            self,
+            ttl: float = DEFAULT_CACHE_TTL,
+            max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+            ttls: Optional[Dict[str, float]] = None
+    ) -> None:
+        """
+        Args:
+            ttl (float): Default time-to-live in seconds. 0 disables caching.
+            max_bytes (int): Upper bound on the total encoded size of cached documents.
+            ttls (Optional[Dict[str, float]]): Per-collection TTL overrides, keyed by
+                collection name. 0 disables caching for that collection.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, bytes]]" = OrderedDict()
+        self._by_namespace: Dict[str, Set[Tuple[str, bytes]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self._bytes = 0
+        self._stats = dict.fromkeys(("hits", "misses", "evictions", "expirations", "invalidations", "stale_sets"), 0)
+
+    def ttl_for(self, namespace: str) -> float:
+        """
+        TTL for a collection namespace ("db.collection").
+
+        Args:
+            namespace (str): Full collection name.
+
+        Returns:
+            float: TTL in seconds (0 means not cached).
+        """
+        return self.ttls.get(namespace.split(".", 1)[-1], self.ttl)
+
+    @staticmethod
+    def make_key(method: str, *parts: Any) -> Optional[bytes]:
+        """
+        Build a cache key from a method name and its query arguments.
+
+        Returns:
+            Optional[bytes]: The key, or None if the arguments are not BSON-encodable
+                (such calls are not cached).
+        """
+        try:
+            return bson.encode({"m": method, "a": list(parts)})
+        except Exception:
+            return None
+
+    def get(self, namespace: str, key: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached document.
+
+        Args:
+            namespace (str): Full collection name.
+            key (bytes): Key from make_key().
+
+        Returns:
+            Optional[Dict[str, Any]]: A fresh copy of the document, or None on a miss.
+        """
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                self._remove(full_key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(full_key)
+            self._stats["hits"] += 1
+        return bson.decode(data)
+
+    def generation(self, namespace: str) -> int:
+        """
+        Counter bumped by every invalidation of a collection (and by clear()).
+
+        Args:
+            namespace (str): Full collection name.
+
+        Returns:
+            int: Value to pass to set(if_generation=...).
+        """
+        with self._lock:
+            return self._generations.get(namespace, 0) + self._clears
+
+    def set(
+            self,
+            namespace: str,
+            key: bytes,
+            doc: Optional[Dict[str, Any]],
+            if_generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a document. Empty results are not cached.
+
+        Args:
+            namespace (str): Full collection name.
+            key (bytes): Key from make_key().
+            doc (Optional[Dict[str, Any]]): Document to cache.
+            if_generation (Optional[int]): Only store if the collection was not
+                invalidated since this generation() value was read.
+        """
+        ttl = self.ttl_for(namespace)
+        if not doc or ttl <= 0:
+            return
+        try:
+            data = bson.encode(doc)
+        except Exception as e:
+            logger.debug("Not caching unencodable document: %s", e)
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        full_key = (namespace, key)
+        with self._lock:
+            if if_generation is not None and if_generation != self._generations.get(namespace, 0) + self._clears:
+                self._stats["stale_sets"] += 1
+                return
+            if full_key in self._entries:
+                self._remove(full_key)
+            self._entries[full_key] = (time.monotonic() + ttl, data)
+            self._by_namespace.setdefault(namespace, set()).add(full_key)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, namespace: str) -> None:
+        """
+        Drop every cached entry of a collection.
+
+        Args:
+            namespace (str): Full collection name.
+        """
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            keys = self._by_namespace.pop(namespace, None)
+            if not keys:
+                return
+            for full_key in keys:
+                entry = self._entries.pop(full_key, None)
+                if entry is not None:
+                    self._bytes -= len(entry[1])
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._by_namespace.clear()
+            self._clears += 1
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and current size.
+
+        Returns:
+            Dict[str, Any]: hits, misses, evictions, expirations, invalidations,
+                stale_sets (reads not cached because a write raced them),
+                entries, bytes and hit_rate.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _remove(self, full_key: Tuple[str, bytes]) -> None:
+        """
+        Remove one entry; caller holds the lock.
+        """
+        _, data = self._entries.pop(full_key)
+        self._bytes -= len(data)
+        keys = self._by_namespace.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+
+
+def invalidates_cache(func):
+    """
+    Decorator for write methods: drop the handle's cached documents afterwards.
+
+    Works on both regular and coroutine methods. The cache is invalidated even
+    if the write fails, since a failed write may have partially applied.
+    """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                self._invalidate_cache()
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._invalidate_cache()
+
+    return wrapper
@@ -0,0 +1,442 @@
+"""
+Index advisor driven by the query shapes the application actually runs.
+
+The advisor subscribes to the per-operation events of entity.instrumentation
+and keeps, per collection, one entry per normalised query shape: which fields
+are matched by equality, which by range, and the sort. Comparing those shapes
+with list_indexes() yields:
+
+    missing   shapes that no index serves at all (collection scans)
+    partial   shapes served only by an index on a leading field
+    unused    indexes with no recorded accesses ($indexStats) that no observed
+              shape would use
+
+Recommended keys follow the equality, sort, range ordering. Impact is
+estimated from the time the shape has cost so far (calls * mean latency) and,
+when a slow call of that shape was explained, from its docsExamined.
+
+Example:
+    >>> report = vehicle_db.index_report()
+    >>> report["missing"][0]
+    {'keys': [('owner_id', 1), ('created_at', 1)], 'calls': 812, 'total_ms': 6120.4, ...}
+    >>> index_advisor.apply(vehicle_db, report)                 # dry run: specs only
+    >>> index_advisor.apply(vehicle_db, report, dry_run=False)  # ensure_indexes()
+"""
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from entity.instrumentation import OperationEvent, OperationStats, operation_stats, query_shape, shape_key
+
+if TYPE_CHECKING:
+    from entity.async_mongo_core import AsyncMongoDB
+    from entity.mongo_core import MongoDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SHAPES = 500
+
+# Operators an index can serve as a point match (ESR "equality")
+_EQUALITY_OPERATORS = {"$eq", "$in"}
+# Operators an index can serve as a bounded scan (ESR "range")
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$elemMatch", "$all"}
+
+IndexKeys = List[Tuple[str, int]]
+
+
+def classify_filter(filter_shape: Any) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """
+    Split a filter shape into equality and range fields.
+
+    Args:
+        filter_shape (Any): Output of query_shape() for a filter.
+
+    Returns:
+        Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]: (equality fields, range
+            fields), sorted; None if the filter cannot be advised on ($or, $text,
+            $where, $expr).
+    """
+    if not isinstance(filter_shape, Mapping):
+        return (), ()
+    equality, ranges = set(), set()
+    for field, value in filter_shape.items():
+        if field == "$and":
+            for clause in value:
+                parts = classify_filter(clause)
+                if parts is None:
+                    return None
+                equality.update(parts[0])
+                ranges.update(parts[1])
+        elif field.startswith("$"):
+            return None
+        elif isinstance(value, Mapping) and any(op.startswith("$") for op in value):
+            operators = set(value) - {"$options"}
+            if operators <= _EQUALITY_OPERATORS:
+                equality.add(field)
+            elif operators <= _EQUALITY_OPERATORS | _RANGE_OPERATORS:
+                ranges.add(field)
+            else:
+                return None
+        else:
+            equality.add(field)
+    return tuple(sorted(equality)), tuple(sorted(ranges - equality))
+
+
+def normalize_sort(sort: Any) -> Tuple[Tuple[str, int], ...]:
+    """
+    Normalise a sort argument ([(field, dir)], {field: dir} or "field") to a tuple.
+    """
+    if not sort:
+        return ()
+    if isinstance(sort, str):
+        return ((sort, 1),)
+    if isinstance(sort, Mapping):
+        sort = sort.items()
+    return tuple((str(field), int(direction)) for field, direction in sort)
+
+
+def recommended_keys(equality: Sequence[str], sort: Sequence[Tuple[str, int]], ranges: Sequence[str]) -> IndexKeys:
+    """
+    Index keys for a shape in equality, sort, range order.
+    """
+    keys: IndexKeys = [(field, 1) for field in equality]
+    seen = set(equality)
+    for field, direction in sort:
+        if field not in seen:
+            keys.append((field, direction))
+            seen.add(field)
+    for field in ranges:
+        if field not in seen:
+            keys.append((field, 1))
+            seen.add(field)
+    return keys
+
+
+def index_coverage(index_keys: IndexKeys, wanted: IndexKeys, equality_count: int) -> str:
+    """
+    How well an existing index serves a recommended key list.
+
+    Args:
+        index_keys (IndexKeys): Existing index key pattern.
+        wanted (IndexKeys): Recommended keys for the shape.
+        equality_count (int): Leading entries of `wanted` that are equality
+            fields (their order does not matter).
+
+    Returns:
+        str: "full" if the index starts with the wanted keys (sort directions
+            all equal or all inverted), "partial" if it starts with a field the
+            shape filters or sorts on first, otherwise "none".
+    """
+    if not wanted:
+        return "full"
+    if len(index_keys) >= len(wanted):
+        head = index_keys[:len(wanted)]
+        same_equality = {f for f, _ in head[:equality_count]} == {f for f, _ in wanted[:equality_count]}
+        tail, wanted_tail = head[equality_count:], wanted[equality_count:]
+        if same_equality and [f for f, _ in tail] == [f for f, _ in wanted_tail]:
+            directions = [(d == w) for (_, d), (_, w) in zip(tail, wanted_tail)]
+            if all(directions) or not any(directions):
+                return "full"
+    leading = {f for f, _ in wanted[:max(equality_count, 1)]}
+    if index_keys and index_keys[0][0] in leading:
+        return "partial"
+    return "none"
+
+
+class _Shape:
+    __slots__ = ("equality", "ranges", "sort", "example", "methods", "calls", "total_ms", "max_ms", "docs")
+
+    def __init__(self, equality, ranges, sort, example) -> None:
+        self.equality = equality
+        self.ranges = ranges
+        self.sort = sort
+        self.example = example
+        self.methods = set()
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.docs = 0
+
+
+class IndexAdvisor:
+    """
+    Record query shapes per collection and compare them with existing indexes.
+    """
+
+    def __init__(self, stats: OperationStats = operation_stats, max_shapes: int = DEFAULT_MAX_SHAPES) -> None:
+        """
+        Args:
+            stats (OperationStats): Instrumentation to subscribe to (and whose
+                slow-query explains are used for impact estimates).
+            max_shapes (int): Distinct shapes kept per collection; further shapes
+                are counted in `dropped` only.
+        """
+        self.stats = stats
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes: Dict[str, Dict[Tuple, _Shape]] = {}
+        self._dropped: Dict[str, int] = {}
+
+    # ========== RECORDING ==========
+
+    def attach(self) -> None:
+        """
+        Start recording shapes from instrumented operations.
+        """
+        self.stats.add_observer(self.observe)
+
+    def detach(self) -> None:
+        """
+        Stop recording.
+        """
+        self.stats.remove_observer(self.observe)
+
+    def observe(self, event: OperationEvent) -> None:
+        """
+        Observer callback: fold one operation into its shape's counters.
+        """
+        if not isinstance(event.filter, Mapping) or event.error is not None:
+            return
+        filter_shape = query_shape(event.filter)
+        parts = classify_filter(filter_shape)
+        if parts is None:
+            return
+        sort = normalize_sort(event.sort)
+        key = (parts[0], parts[1], sort)
+        with self._lock:
+            shapes = self._shapes.setdefault(event.namespace, {})
+            shape = shapes.get(key)
+            if shape is None:
+                if len(shapes) >= self.max_shapes:
+                    self._dropped[event.namespace] = self._dropped.get(event.namespace, 0) + 1
+                    return
+                shape = shapes[key] = _Shape(parts[0], parts[1], sort, filter_shape)
+            shape.methods.add(event.method)
+            shape.calls += 1
+            shape.total_ms += event.duration_ms
+            shape.docs += event.docs or 0
+            if event.duration_ms > shape.max_ms:
+                shape.max_ms = event.duration_ms
+
+    def shapes(self, namespace: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Recorded shapes per namespace, most expensive first.
+        """
+        with self._lock:
+            namespaces = [namespace] if namespace else list(self._shapes)
+            return {
+                ns: sorted(
+                    (self._shape_info(shape) for shape in self._shapes.get(ns, {}).values()),
+                    key=lambda info: info["total_ms"],
+                    reverse=True,
+                )
+                for ns in namespaces
+            }
+
+    def reset(self) -> None:
+        """
+        Forget all recorded shapes.
+        """
+        with self._lock:
+            self._shapes.clear()
+            self._dropped.clear()
+
+    # ========== ADVICE ==========
+
+    def recommend(self, db: "MongoDB") -> Dict[str, Any]:
+        """
+        Compare recorded shapes with the collection's indexes.
+
+        Args:
+            db (MongoDB): Collection handle.
+
+        Returns:
+            Dict[str, Any]: {namespace, missing, partial, unused, dropped_shapes}.
+        """
+        indexes = db.list_indexes()
+        try:
+            usage = list(db.collection.aggregate([{"$indexStats": {}}]))
+        except Exception as e:
+            logger.debug("$indexStats unavailable for %s: %s", db.collection.full_name, e)
+            usage = None
+        return self.advise(db.collection.full_name, indexes, usage)
+
+    async def recommend_async(self, db: "AsyncMongoDB") -> Dict[str, Any]:
+        """
+        recommend() for AsyncMongoDB handles.
+        """
+        indexes = await db.list_indexes()
+        try:
+            cursor = await db.collection.aggregate([{"$indexStats": {}}])
+            usage = await cursor.to_list()
+        except Exception as e:
+            logger.debug("$indexStats unavailable for %s: %s", db.collection.full_name, e)
+            usage = None
+        return self.advise(db.collection.full_name, indexes, usage)
+
+    def advise(
+            self,
+            namespace: str,
+            indexes: List[Mapping[str, Any]],
+            usage: Optional[List[Mapping[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the report from index definitions and (optionally) $indexStats output.
+
+        Args:
+            namespace (str): "db.collection".
+            indexes (List[Mapping[str, Any]]): list_indexes() output.
+            usage (Optional[List[Mapping[str, Any]]]): $indexStats output, if available.
+
+        Returns:
+            Dict[str, Any]: {namespace, missing, partial, unused, dropped_shapes}.
+        """
+        existing = {index["name"]: [(f, int(d)) for f, d in index["key"].items()] for index in indexes}
+        explained = self._explained_shapes(namespace)
+        used_by: Dict[str, int] = {name: 0 for name in existing}
+        missing, partial = [], []
+
+        with self._lock:
+            shapes = list(self._shapes.get(namespace, {}).values())
+            dropped = self._dropped.get(namespace, 0)
+
+        for shape in shapes:
+            wanted = recommended_keys(shape.equality, shape.sort, shape.ranges)
+            coverage = {
+                name: index_coverage(keys, wanted, len(shape.equality)) for name, keys in existing.items()
+            }
+            full = [name for name, c in coverage.items() if c == "full"]
+            part = [name for name, c in coverage.items() if c == "partial"]
+            for name in full or part:
+                used_by[name] += shape.calls
+            if full or not wanted:
+                continue
+
+            entry = self._shape_info(shape)
+            entry["keys"] = wanted
+            entry["served_by"] = part
+            entry["explain"] = explained.get(shape_key(shape.example))
+            (partial if part else missing).append(entry)
+
+        unused = []
+        ops = {u["name"]: u.get("accesses", {}) for u in usage} if usage is not None else {}
+        for name, keys in existing.items():
+            if name == "_id_" or used_by[name]:
+                continue
+            accesses = ops.get(name, {})
+            if usage is not None and accesses.get("ops", 0):
+                continue
+            unused.append({
+                "name": name,
+                "keys": keys,
+                "ops": accesses.get("ops") if usage is not None else None,
+                "since": accesses.get("since"),
+            })
+
+        by_impact = lambda entry: entry["total_ms"]
+        return {
+            "namespace": namespace,
+            "missing": sorted(missing, key=by_impact, reverse=True),
+            "partial": sorted(partial, key=by_impact, reverse=True),
+            "unused": unused,
+            "dropped_shapes": dropped,
+        }
+
+    # ========== APPLY ==========
+
+    @staticmethod
+    def index_specs(report: Mapping[str, Any], include_partial: bool = True, min_calls: int = 1) -> List[Dict[str, Any]]:
+        """
+        ensure_indexes() specs for a report's recommendations.
+
+        Args:
+            report (Mapping[str, Any]): Output of recommend()/advise().
+            include_partial (bool): Also recommend indexes for partially served shapes.
+            min_calls (int): Ignore shapes seen fewer times than this.
+
+        Returns:
+            List[Dict[str, Any]]: [{"keys": [(field, direction), ...]}, ...], deduplicated.
+        """
+        entries = list(report["missing"]) + (list(report["partial"]) if include_partial else [])
+        specs, seen = [], set()
+        for entry in entries:
+            keys = tuple(tuple(k) for k in entry["keys"])
+            if entry["calls"] < min_calls or keys in seen:
+                continue
+            seen.add(keys)
+            specs.append({"keys": [tuple(k) for k in keys]})
+        return specs
+
+    def apply(
+            self,
+            db: "MongoDB",
+            report: Optional[Mapping[str, Any]] = None,
+            dry_run: bool = True,
+            **options
+    ) -> List[Union[Dict[str, Any], str]]:
+        """
+        Dry-run-then-apply: return the specs that would be created, or create them.
+
+        Args:
+            db (MongoDB): Collection handle.
+            report (Optional[Mapping[str, Any]]): A report from recommend(); built if None.
+            dry_run (bool): Only return the specs.
+            **options: index_specs() options (include_partial, min_calls).
+
+        Returns:
+            List[Union[Dict[str, Any], str]]: Specs when dry_run, else created index names.
+        """
+        specs = self.index_specs(report if report is not None else self.recommend(db), **options)
+        if dry_run:
+            logger.info(f"Index advisor dry run for {db.collection.full_name}: {specs}")
+            return specs
+        return db.ensure_indexes(specs)
+
+    async def apply_async(
+            self,
+            db: "AsyncMongoDB",
+            report: Optional[Mapping[str, Any]] = None,
+            dry_run: bool = True,
+            **options
+    ) -> List[Union[Dict[str, Any], str]]:
+        """
+        apply() for AsyncMongoDB handles.
+        """
+        specs = self.index_specs(report if report is not None else await self.recommend_async(db), **options)
+        if dry_run:
+            logger.info(f"Index advisor dry run for {db.collection.full_name}: {specs}")
+            return specs
+        return await db.ensure_indexes(specs)
+
+    # ========== INTERNALS ==========
+
+    @staticmethod
+    def _shape_info(shape: _Shape) -> Dict[str, Any]:
+        return {
+            "equality": list(shape.equality),
+            "range": list(shape.ranges),
+            "sort": [list(s) for s in shape.sort],
+            "filter_shape": shape.example,
+            "methods": sorted(shape.methods),
+            "calls": shape.calls,
+            "total_ms": round(shape.total_ms, 3),
+            "mean_ms": round(shape.total_ms / shape.calls, 3) if shape.calls else 0.0,
+            "max_ms": round(shape.max_ms, 3),
+            "mean_docs": round(shape.docs / shape.calls, 1) if shape.calls else 0.0,
+        }
+
+    def _explained_shapes(self, namespace: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Latest explain summary per filter shape from the slow-query log.
+        """
+        explained = {}
+        for entry in self.stats.slow_queries(namespace):
+            if entry.get("explain") and entry.get("filter_shape") is not None:
+                explained[shape_key(entry["filter_shape"])] = entry["explain"]
+        return explained
+
+
+index_advisor = IndexAdvisor()
+if os.getenv("MONGO_INDEX_ADVISOR", "true").lower() in ("true", "1", "t"):
+    index_advisor.attach()
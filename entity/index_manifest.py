@@ -0,0 +1,120 @@
+"""
+Declarative index manifests: declare the indexes a collection needs, create the
+missing ones idempotently and report drift against what the server has.
+
+A manifest is a list of ensure_indexes() specs:
+
+    USER_INDEXES = [{"keys": "email", "unique": True}]
+
+Drift is reported in three groups:
+
+    missing     declared but absent (created by apply_index_manifest)
+    mismatched  same keys but different options, e.g. unique declared but the
+                existing index is not; never changed automatically
+    extra       present on the server but not declared (the _id index excepted)
+"""
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Tuple
+
+from pymongo import ASCENDING
+
+if TYPE_CHECKING:
+    from entity.async_mongo_core import AsyncMongoDB
+    from entity.mongo_core import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Index options that change behaviour and so count as drift when they differ
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _key_pattern(keys: Any) -> Tuple[Tuple[str, Any], ...]:
+    if isinstance(keys, str):
+        return ((keys, ASCENDING),)
+    if isinstance(keys, Mapping):
+        keys = keys.items()
+    return tuple((field, int(d) if isinstance(d, (int, float)) else d) for field, d in keys)
+
+
+def _options(spec: Mapping[str, Any]) -> Dict[str, Any]:
+    return {name: spec[name] for name in COMPARED_OPTIONS if spec.get(name) not in (None, False)}
+
+
+def index_drift(declared: List[Mapping[str, Any]], existing: List[Mapping[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare a manifest with list_indexes() output.
+
+    Args:
+        declared (List[Mapping[str, Any]]): Manifest specs ("keys" plus options).
+        existing (List[Mapping[str, Any]]): list_indexes() output.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: {"missing": [spec, ...], "mismatched":
+            [{"keys", "declared", "actual", "name"}, ...], "extra": [{"name", "keys"}, ...]}.
+    """
+    actual = {_key_pattern(index["key"]): index for index in existing}
+    wanted = set()
+    missing, mismatched = [], []
+
+    for spec in declared:
+        pattern = _key_pattern(spec["keys"])
+        wanted.add(pattern)
+        index = actual.get(pattern)
+        if index is None:
+            missing.append(dict(spec))
+        elif _options(spec) != _options(index):
+            mismatched.append({
+                "keys": list(pattern),
+                "name": index["name"],
+                "declared": _options(spec),
+                "actual": _options(index),
+            })
+
+    extra = [
+        {"name": index["name"], "keys": list(pattern)}
+        for pattern, index in actual.items()
+        if pattern not in wanted and index["name"] != "_id_"
+    ]
+    return {"missing": missing, "mismatched": mismatched, "extra": extra}
+
+
+def _log_drift(namespace: str, drift: Mapping[str, List[Dict[str, Any]]], created: List[str]) -> None:
+    if created:
+        logger.info(f"Created indexes on {namespace}: {created}")
+    for entry in drift["mismatched"]:
+        logger.warning(
+            f"Index drift on {namespace}: {entry['name']} has options {entry['actual']}, "
+            f"manifest declares {entry['declared']}"
+        )
+    if drift["extra"]:
+        logger.warning(f"Index drift on {namespace}: undeclared indexes {[e['name'] for e in drift['extra']]}")
+
+
+def apply_index_manifest(db: "MongoDB", manifest: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Create the missing indexes of a manifest and report drift. Idempotent: when
+    nothing is missing this costs a single listIndexes round trip.
+
+    Args:
+        db (MongoDB): Collection handle.
+        manifest (List[Mapping[str, Any]]): Declared index specs.
+
+    Returns:
+        Dict[str, Any]: {"namespace", "created", "missing", "mismatched", "extra"};
+            "missing" lists what was missing before this call, "created" what
+            could be created.
+    """
+    drift = index_drift(manifest, db.list_indexes())
+    created = db.ensure_indexes(drift["missing"]) if drift["missing"] else []
+    _log_drift(db.collection.full_name, drift, created)
+    return {"namespace": db.collection.full_name, "created": created, **drift}
+
+
+async def apply_index_manifest_async(db: "AsyncMongoDB", manifest: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    apply_index_manifest() for AsyncMongoDB handles.
+    """
+    drift = index_drift(manifest, await db.list_indexes())
+    created = await db.ensure_indexes(drift["missing"]) if drift["missing"] else []
+    _log_drift(db.collection.full_name, drift, created)
+    return {"namespace": db.collection.full_name, "created": created, **drift}
@@ -0,0 +1,502 @@
+"""
+Per-operation latency instrumentation for the MongoDB wrappers.
+
+Every instrumented wrapper method records its wall-clock latency in a
+fixed-bucket histogram keyed by (collection namespace, method), together with
+call, error and document counts. Recording costs two perf_counter() calls and
+one short lock, so it can stay on in production.
+
+Calls slower than `slow_ms` are logged at WARNING with the shape of their
+filter (values replaced by "?") and kept in a bounded slow-query log. Above
+`explain_ms`, the filter is explained in the background, at most once per
+shape every `explain_interval` seconds, and the plan summary is attached to the
+slow-query entry.
+
+Observers registered with add_observer() receive an OperationEvent for every
+call, e.g. to feed an index advisor or per-request timing.
+
+Example:
+    >>> from entity.instrumentation import operation_stats
+    >>> operation_stats.snapshot()["fuel-check.users"]["get_by_id"]
+    {'calls': 1520, 'errors': 0, 'docs': 1518, 'mean_ms': 0.9, 'p50_ms': 1.0, 'p95_ms': 2.5, ...}
+    >>> operation_stats.slow_queries()
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0)
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_EXPLAIN_MS = 500.0
+DEFAULT_EXPLAIN_INTERVAL = 300.0
+DEFAULT_SLOW_LOG_SIZE = 200
+
+_LIST_OPERATORS = ("$and", "$or", "$nor")
+
+
+class OperationEvent(NamedTuple):
+    """
+    One instrumented call, as passed to observers.
+    """
+    namespace: str
+    method: str
+    duration_ms: float
+    docs: Optional[int]
+    error: Optional[BaseException]
+    filter: Optional[Any]
+    sort: Optional[Any]
+
+
+def query_shape(query: Any) -> Any:
+    """
+    Replace the values of a filter (or pipeline) with "?", keeping field names
+    and operators, so queries that differ only by value compare equal.
+
+    Args:
+        query (Any): Filter dict, aggregation pipeline or plain value.
+
+    Returns:
+        Any: The shape, e.g. {"created_at": {"$gte": "?"}, "vehicle_id": "?"}.
+    """
+    if isinstance(query, Mapping):
+        shape = {}
+        for key, value in query.items():
+            if key in _LIST_OPERATORS and isinstance(value, (list, tuple)):
+                shape[key] = [query_shape(item) for item in value]
+            elif isinstance(value, Mapping):
+                shape[key] = query_shape(value)
+            else:
+                shape[key] = "?"
+        return shape
+    if isinstance(query, (list, tuple)):
+        # Aggregation pipeline: keep each stage's shape
+        return [query_shape(stage) for stage in query]
+    return "?"
+
+
+def shape_key(shape: Any) -> str:
+    """
+    Stable string form of a query shape (keys sorted).
+    """
+    return json.dumps(shape, sort_keys=True, default=str)
+
+
+def summarize_explain(explain: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Condense explain() output to the winning plan and its execution counters.
+
+    Args:
+        explain (Mapping[str, Any]): Result of cursor.explain().
+
+    Returns:
+        Dict[str, Any]: plan (stages from root to leaf, e.g. "FETCH <- IXSCAN(email_1)"),
+            collscan, docs_examined, keys_examined, n_returned, execution_ms.
+    """
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # slot-based engine nests the classic plan
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or next(iter(plan.get("inputStages") or []), None)
+
+    stats = explain.get("executionStats", {})
+    return {
+        "plan": " <- ".join(stages),
+        "collscan": any(stage.startswith("COLLSCAN") for stage in stages),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "n_returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+def count_docs(result: Any) -> Optional[int]:
+    """
+    Documents returned or modified, inferred from a wrapper method's result.
+    """
+    if result is None:
+        return 0
+    if isinstance(result, bool):
+        return int(result)
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, Mapping):
+        if "data" in result and isinstance(result["data"], list):
+            return len(result["data"])
+        if {"inserted", "modified", "deleted"} <= result.keys():
+            return sum(v for v in result.values() if isinstance(v, int))
+        return 1
+    return 1
+
+
+class _OpStats:
+    __slots__ = ("calls", "errors", "docs", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.docs = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+class OperationStats:
+    """
+    Process-wide latency histograms, slow-query log and observers.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = True,
+            slow_ms: float = DEFAULT_SLOW_MS,
+            explain_ms: float = DEFAULT_EXPLAIN_MS,
+            explain_interval: float = DEFAULT_EXPLAIN_INTERVAL,
+            slow_log_size: int = DEFAULT_SLOW_LOG_SIZE
+    ) -> None:
+        """
+        Args:
+            enabled (bool): Record anything at all.
+            slow_ms (float): Calls at least this slow go to the slow-query log (0 disables).
+            explain_ms (float): Slow calls at least this slow are explained (0 disables).
+            explain_interval (float): Minimum seconds between explains of one query shape.
+            slow_log_size (int): Slow-query entries kept.
+        """
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain_ms = explain_ms
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._ops: Dict[Tuple[str, str], _OpStats] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._explained: Dict[Tuple[str, str], float] = {}
+        self._observers: List[Callable[[OperationEvent], None]] = []
+        self._explain_executor: Optional[ThreadPoolExecutor] = None
+        self._explain_tasks: set = set()
+
+    # ========== RECORDING ==========
+
+    def record(self, event: OperationEvent) -> Optional[Dict[str, Any]]:
+        """
+        Record one call.
+
+        Returns:
+            Optional[Dict[str, Any]]: The slow-query entry, if the call was slow.
+        """
+        index = bisect_left(LATENCY_BUCKETS_MS, event.duration_ms)
+        key = (event.namespace, event.method)
+        with self._lock:
+            stats = self._ops.get(key)
+            if stats is None:
+                stats = self._ops[key] = _OpStats()
+            stats.calls += 1
+            stats.total_ms += event.duration_ms
+            stats.buckets[index] += 1
+            if event.duration_ms > stats.max_ms:
+                stats.max_ms = event.duration_ms
+            if event.error is not None:
+                stats.errors += 1
+            elif event.docs:
+                stats.docs += event.docs
+
+        for observer in self._observers:
+            try:
+                observer(event)
+            except Exception as e:
+                logger.debug("Operation observer %r failed: %s", observer, e)
+
+        if self.slow_ms and event.duration_ms >= self.slow_ms:
+            return self._record_slow(event)
+        return None
+
+    def _record_slow(self, event: OperationEvent) -> Dict[str, Any]:
+        entry = {
+            "time": time.time(),
+            "namespace": event.namespace,
+            "method": event.method,
+            "duration_ms": round(event.duration_ms, 3),
+            "docs": event.docs,
+            "filter_shape": query_shape(event.filter) if event.filter is not None else None,
+            "sort": event.sort,
+            "error": repr(event.error) if event.error is not None else None,
+            "explain": None,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        logger.warning(
+            "Slow query %s.%s took %.1f ms (docs=%s, filter=%s, sort=%s)",
+            event.namespace, event.method, event.duration_ms, event.docs, shape_key(entry["filter_shape"]), event.sort,
+            extra={"collection": event.namespace, "duration_ms": entry["duration_ms"]},
+        )
+        return entry
+
+    def should_explain(self, event: OperationEvent, entry: Optional[Dict[str, Any]]) -> bool:
+        """
+        Whether a slow call's filter should be explained now (rate-limited per shape).
+        """
+        if entry is None or not self.explain_ms or event.duration_ms < self.explain_ms:
+            return False
+        if not isinstance(event.filter, Mapping):
+            return False
+        key = (event.namespace, shape_key(entry["filter_shape"]))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(key, float("-inf")) < self.explain_interval:
+                return False
+            self._explained[key] = now
+        return True
+
+    def attach_explain(self, entry: Dict[str, Any], explain: Mapping[str, Any]) -> None:
+        """
+        Attach an explain summary to a slow-query entry and log it.
+        """
+        summary = summarize_explain(explain)
+        with self._lock:
+            entry["explain"] = summary
+        logger.warning(
+            "Slow query plan for %s.%s: %s", entry["namespace"], entry["method"], summary,
+            extra={"collection": entry["namespace"], "duration_ms": entry["duration_ms"]},
+        )
+
+    def explain_in_background(self, entry: Dict[str, Any], explain: Callable[[], Any]) -> None:
+        """
+        Run a sync explain callable on a single background thread.
+        """
+        with self._lock:
+            if self._explain_executor is None:
+                self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongo-explain")
+        self._explain_executor.submit(self._run_explain, entry, explain)
+
+    def explain_in_task(self, entry: Dict[str, Any], explain: Callable[[], Any]) -> None:
+        """
+        Run an async explain callable as a task on the running event loop.
+        """
+        async def run():
+            try:
+                self.attach_explain(entry, await explain())
+            except Exception as e:
+                logger.debug("Explain failed for %s.%s: %s", entry["namespace"], entry["method"], e)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    def _run_explain(self, entry: Dict[str, Any], explain: Callable[[], Any]) -> None:
+        try:
+            self.attach_explain(entry, explain())
+        except Exception as e:
+            logger.debug("Explain failed for %s.%s: %s", entry["namespace"], entry["method"], e)
+
+    # ========== OBSERVERS ==========
+
+    def add_observer(self, observer: Callable[[OperationEvent], None]) -> None:
+        """
+        Call `observer(event)` after every instrumented operation.
+
+        Observers run inline on the calling thread and must be cheap; their
+        exceptions are logged and ignored.
+        """
+        if observer not in self._observers:
+            self._observers = self._observers + [observer]
+
+    def remove_observer(self, observer: Callable[[OperationEvent], None]) -> None:
+        """
+        Stop notifying an observer.
+        """
+        self._observers = [o for o in self._observers if o is not observer]
+
+    # ========== READING ==========
+
+    def snapshot(self, namespace: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Current counters and latency summary per namespace and method.
+
+        Args:
+            namespace (Optional[str]): Only this "db.collection".
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, Any]]]: {namespace: {method: {calls, errors,
+                docs, mean_ms, max_ms, p50_ms, p95_ms, p99_ms, buckets}}}. Percentiles
+                are bucket upper bounds; buckets are cumulative counts keyed by
+                upper bound ("+Inf" last), as in Prometheus histograms.
+        """
+        with self._lock:
+            items = [
+                (key, (s.calls, s.errors, s.docs, s.total_ms, s.max_ms, list(s.buckets)))
+                for key, s in self._ops.items()
+                if namespace is None or key[0] == namespace
+            ]
+
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (ns, method), (calls, errors, docs, total_ms, max_ms, buckets) in items:
+            cumulative, running = {}, 0
+            for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), buckets):
+                running += count
+                cumulative[str(bound)] = running
+            result.setdefault(ns, {})[method] = {
+                "calls": calls,
+                "errors": errors,
+                "docs": docs,
+                "mean_ms": total_ms / calls if calls else 0.0,
+                "max_ms": max_ms,
+                "p50_ms": self._percentile(buckets, calls, 0.50, max_ms),
+                "p95_ms": self._percentile(buckets, calls, 0.95, max_ms),
+                "p99_ms": self._percentile(buckets, calls, 0.99, max_ms),
+                "sum_ms": total_ms,
+                "buckets": cumulative,
+            }
+        return result
+
+    def slow_queries(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Recent slow-query entries, oldest first.
+        """
+        with self._lock:
+            return [dict(e) for e in self._slow if namespace is None or e["namespace"] == namespace]
+
+    def reset(self) -> None:
+        """
+        Clear all counters and the slow-query log.
+        """
+        with self._lock:
+            self._ops.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+    @staticmethod
+    def _percentile(buckets: List[int], calls: int, q: float, max_ms: float) -> float:
+        if not calls:
+            return 0.0
+        target, running = q * calls, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+            running += count
+            if running >= target:
+                return min(bound, max_ms)
+        return max_ms
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+operation_stats = OperationStats(
+    enabled=os.getenv("MONGO_INSTRUMENTATION", "true").lower() in ("true", "1", "t"),
+    slow_ms=_env_float("MONGO_SLOW_QUERY_MS", DEFAULT_SLOW_MS),
+    explain_ms=_env_float("MONGO_EXPLAIN_SLOW_MS", DEFAULT_EXPLAIN_MS),
+)
+
+
+def instrumented(
+        filter_arg: Optional[str] = "filter",
+        docs: Optional[Callable[[Any], Optional[int]]] = count_docs,
+        stats: OperationStats = operation_stats
+) -> Callable:
+    """
+    Decorator for wrapper methods: record latency, document count and slow calls.
+
+    Works on both regular and coroutine methods of MongoDB/AsyncMongoDB (anything
+    with a `collection` attribute). Apply it outermost so the recorded latency
+    includes retries.
+
+    Args:
+        filter_arg (Optional[str]): Parameter holding the query filter (or
+            pipeline) for the slow-query log; "_id" wraps the value as {"_id": value}.
+        docs (Optional[Callable[[Any], Optional[int]]]): Derives the document count
+            from the result; None records no count.
+        stats (OperationStats): Where to record.
+
+    Returns:
+        Callable: Decorator.
+    """
+
+    def decorator(func):
+        method = func.__name__
+        params = list(inspect.signature(func).parameters)[1:]  # drop self
+        filter_index = params.index(filter_arg) if filter_arg in params else None
+        sort_index = params.index("sort") if "sort" in params else None
+
+        def arg(args, kwargs, name, index):
+            if name in kwargs:
+                return kwargs[name]
+            if index is not None and index < len(args):
+                return args[index]
+            return None
+
+        def finish(self, args, kwargs, started, result, error):
+            query = arg(args, kwargs, filter_arg, filter_index) if filter_arg else None
+            if filter_arg == "_id" and query is not None:
+                query = {"_id": query}
+            event = OperationEvent(
+                namespace=self.collection.full_name,
+                method=method,
+                duration_ms=(time.perf_counter() - started) * 1000.0,
+                docs=docs(result) if docs is not None and error is None else None,
+                error=error,
+                filter=query,
+                sort=arg(args, kwargs, "sort", sort_index),
+            )
+            entry = stats.record(event)
+            if stats.should_explain(event, entry) and kwargs.get("session") is None:
+                return entry, event.filter
+            return None, None
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                if not stats.enabled:
+                    return await func(self, *args, **kwargs)
+                started = time.perf_counter()
+                result = error = None
+                try:
+                    result = await func(self, *args, **kwargs)
+                    return result
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    entry, query = finish(self, args, kwargs, started, result, error)
+                    if entry is not None:
+                        collection = self.collection
+                        stats.explain_in_task(entry, lambda: collection.find(query).explain())
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not stats.enabled:
+                return func(self, *args, **kwargs)
+            started = time.perf_counter()
+            result = error = None
+            try:
+                result = func(self, *args, **kwargs)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                entry, query = finish(self, args, kwargs, started, result, error)
+                if entry is not None:
+                    collection = self.collection
+                    stats.explain_in_background(entry, lambda: collection.find(query).explain())
+
+        return wrapper
+
+    return decorator
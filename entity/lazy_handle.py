@@ -0,0 +1,63 @@
+"""
+Lazy, fork-safe database handles.
+
+Building a MongoDB handle connects (and pings) the server, so doing it at
+import time makes every import of `entity` block on the network, and a client
+created in a pre-fork server's master process would be inherited by its
+workers, which is not fork-safe. LazyHandle defers construction to first
+attribute access and forgets the handle in a forked child, so each process
+connects on its own first use.
+
+Example:
+    >>> users = LazyHandle(lambda: MongoDB("mydb", "users"))
+    >>> users.loaded
+    False
+    >>> users.get({"email": "a@example.com"})   # connects here
+"""
+import os
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyHandle:
+    """
+    Proxy that builds its handle on first use, once per process.
+    """
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        """
+        Args:
+            factory (Callable[[], Any]): Builds the real handle.
+        """
+        self._factory = factory
+        self._handle: Optional[Any] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def loaded(self) -> bool:
+        """True once the real handle has been built in this process."""
+        return self._handle is not None
+
+    def resolve(self) -> Any:
+        """Return the real handle, building it on first call."""
+        handle = self._handle
+        if handle is None:
+            with self._lock:
+                if self._handle is None:
+                    self._handle = self._factory()
+                handle = self._handle
+        return handle
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined on the proxy itself
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        return f"LazyHandle({self._handle!r})" if self.loaded else "LazyHandle(<not loaded>)"
+
+    def _after_fork(self) -> None:
+        # The parent's client (and any lock it held) must not be used here;
+        # drop the reference without closing it, the parent still owns it
+        self._handle = None
+        self._lock = threading.Lock()
@@ -12,20 +12,30 @@ Install:
     pip install pymongo passlib
     uv add pymongo passlib
 """
+import asyncio
+import atexit
+import base64
+import inspect
+import json
 import logging
 import os
 import random
 import string
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from functools import wraps
-from typing import Any, Dict, List, Optional, Union, Tuple, Generator
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Union, Tuple, Generator
 from uuid import uuid4
 
+import bson
 from bson import ObjectId
+from bson.codec_options import CodecOptions
 from bson.errors import InvalidId
+from bson.raw_bson import RawBSONDocument
 from passlib.hash import pbkdf2_sha256
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.client_session import ClientSession
 from pymongo.collection import Collection
 from pymongo.database import Database
@@ -35,6 +45,11 @@ from pymongo.errors import (
     ServerSelectionTimeoutError
 )
 
+from entity.doc_cache import DocumentCache, invalidates_cache
+from entity.index_advisor import index_advisor
+from entity.instrumentation import instrumented, operation_stats
+from entity.write_buffer import WriteBuffer, close_all_write_buffers, DEFAULT_MAX_BATCH, DEFAULT_MAX_LATENCY_MS
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,37 +58,559 @@ DEFAULT_CONNECTION_STRING = os.getenv("LOCAL_MONGO_CONNECTION_STRING")
 DEFAULT_TIMEOUT_MS = 5000
 DEFAULT_MAX_POOL_SIZE = 100
 DEFAULT_MIN_POOL_SIZE = 10
+DEFAULT_BATCH_SIZE = 500
 
 
-def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
+class ClientRegistry:
     """
-    Decorator to retry operations on transient failures.
+    Process-wide registry of pooled clients, one per connection string and option set.
+
+    Every MongoDB handle created with the same connection settings shares a single
+    client (and therefore a single connection pool). Handles acquire a reference on
+    construction and release it on close(); the client is closed when the last
+    reference goes away, or when the registry is drained at shutdown.
+
+    Example:
+        >>> registry = ClientRegistry(MongoClient)
+        >>> client, created = registry.acquire("mongodb://localhost:27017", maxPoolSize=50)
+        >>> registry.release(client)
+    """
+
+    def __init__(self, factory: Callable[..., Any]) -> None:
+        """
+        Initialize an empty registry.
+
+        Args:
+            factory (Callable[..., Any]): Client constructor, called as
+                factory(connection_str, **options) the first time a key is seen.
+        """
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple, Any] = {}
+        self._refcounts: Dict[Tuple, int] = {}
+        self._keys: Dict[int, Tuple] = {}
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        """
+        Forget the parent's clients in a forked child (they are not fork-safe);
+        the child creates its own on first acquire(). Nothing is closed: the
+        parent still owns those connections.
+        """
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._refcounts = {}
+        self._keys = {}
+
+    @staticmethod
+    def _make_key(connection_str: Optional[str], options: Dict[str, Any]) -> Tuple:
+        """
+        Build a hashable registry key from a connection string and client options.
+        """
+        return connection_str, tuple(sorted((k, repr(v)) for k, v in options.items()))
+
+    def acquire(self, connection_str: Optional[str], **options) -> Tuple[Any, bool]:
+        """
+        Get the shared client for these settings, creating it on first use.
+
+        Args:
+            connection_str (Optional[str]): MongoDB connection string.
+            **options: Client options (pool sizes, timeouts, ...).
+
+        Returns:
+            Tuple[Any, bool]: (The shared client, True if it was created by this call)
+        """
+        key = self._make_key(connection_str, options)
+        with self._lock:
+            client = self._clients.get(key)
+            created = client is None
+            if created:
+                client = self._factory(connection_str, **options)
+                self._clients[key] = client
+                self._refcounts[key] = 0
+                self._keys[id(client)] = key
+            self._refcounts[key] += 1
+            return client, created
+
+    def release(self, client: Any) -> Optional[Any]:
+        """
+        Drop one reference to a shared client.
+
+        Args:
+            client (Any): Client previously returned by acquire().
+
+        Returns:
+            Optional[Any]: The client if this was its last reference (the caller is
+                responsible for closing it), None otherwise.
+        """
+        with self._lock:
+            key = self._keys.get(id(client))
+            if key is None:
+                return None
+            self._refcounts[key] -= 1
+            if self._refcounts[key] > 0:
+                return None
+            del self._refcounts[key]
+            del self._keys[id(client)]
+            return self._clients.pop(key)
+
+    def drain(self) -> List[Any]:
+        """
+        Remove every client from the registry regardless of outstanding references.
+
+        Returns:
+            List[Any]: The removed clients, to be closed by the caller.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._refcounts.clear()
+            self._keys.clear()
+            return clients
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Describe the registered clients and their reference counts.
+
+        Returns:
+            List[Dict[str, Any]]: One entry per shared client.
+        """
+        with self._lock:
+            return [
+                {"connection_str": key[0], "options": dict(key[1]), "refs": self._refcounts[key]}
+                for key in self._clients
+            ]
+
+
+_client_registry = ClientRegistry(MongoClient)
+
+
+def close_all_clients() -> None:
+    """
+    Close every shared MongoClient in this process.
+
+    Pending buffered writes are flushed first. Registered with atexit; call it
+    explicitly from application shutdown hooks.
+    """
+    close_all_write_buffers()
+    for client in _client_registry.drain():
+        try:
+            client.close()
+        except Exception as e:
+            logger.error(f"Error closing shared client: {e}")
+
+
+atexit.register(close_all_clients)
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket that caps retries to a fraction of successful calls.
+
+    Each successful call deposits `ratio` tokens (up to `max_tokens`) and each
+    retry withdraws one, so during an outage retries dry up instead of
+    multiplying the load on a struggling cluster.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 50.0) -> None:
+        """
+        Args:
+            ratio (float): Tokens earned per successful call.
+            max_tokens (float): Bucket capacity (also the initial balance).
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """
+        Credit the bucket for a successful call.
+        """
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Try to pay for one retry.
+
+        Returns:
+            bool: True if the retry may proceed, False if the budget is exhausted.
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        """
+        Current token balance.
+        """
+        return self._tokens
+
+
+class RetryPolicy:
+    """
+    Retry transient failures with exponential backoff, full jitter and a shared budget.
+
+    The same policy decorates both regular functions and coroutine functions:
+    coroutines back off with asyncio.sleep, so they never block the event loop.
+    A synchronous call made from the event loop thread is not retried at all,
+    for the same reason.
+
+    Operations declare whether they are safe to repeat. Idempotent ones retry on
+    any ConnectionFailure; non-idempotent ones (e.g. inserts) only retry when the
+    server could not be selected, i.e. the command was never sent.
+
+    Example:
+        >>> policy = RetryPolicy(max_attempts=3, base_delay=0.1)
+        >>> @policy.retry(idempotent=False)
+        ... def insert(doc): ...
+        >>> policy.metrics()
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay: float = 0.1,
+            max_delay: float = 2.0,
+            budget: Optional[RetryBudget] = None
+    ) -> None:
+        """
+        Args:
+            max_attempts (int): Total attempts per call, including the first.
+            base_delay (float): Backoff base in seconds (doubles each retry).
+            max_delay (float): Upper bound for a single backoff in seconds.
+            budget (Optional[RetryBudget]): Shared retry budget. Defaults to the
+                process-wide budget.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else _retry_budget
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    def backoff(self, retry: int) -> float:
+        """
+        Compute the jittered delay before the given retry (0-based).
+
+        Args:
+            retry (int): Retry number.
+
+        Returns:
+            float: Delay in seconds, uniformly drawn from [0, min(max_delay, base * 2**retry)].
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Snapshot of per-operation counters.
+
+        Returns:
+            Dict[str, Dict[str, int]]: {operation: {"calls", "attempts", "retries",
+                "give_ups", "budget_exhausted"}}
+        """
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._metrics.items()}
+
+    def _count(self, name: str, field: str) -> None:
+        with self._lock:
+            counters = self._metrics.get(name)
+            if counters is None:
+                counters = self._metrics[name] = dict.fromkeys(
+                    ("calls", "attempts", "retries", "give_ups", "budget_exhausted"), 0
+                )
+            counters[field] += 1
+
+    @staticmethod
+    def _retryable_errors(idempotent: bool) -> Tuple[type, ...]:
+        return (ConnectionFailure,) if idempotent else (ServerSelectionTimeoutError,)
+
+    def _should_retry(self, name: str, attempt: int, error: Exception, allow: bool = True) -> bool:
+        """
+        Decide whether to retry after a failed attempt, updating the counters.
+        """
+        if not allow:
+            self._count(name, "give_ups")
+            logger.error(f"Not retrying {name} on the event loop thread: {error}")
+            return False
+        if attempt >= self.max_attempts - 1:
+            self._count(name, "give_ups")
+            logger.error(f"Max retries reached for {name}: {error}")
+            return False
+        if not self.budget.withdraw():
+            self._count(name, "give_ups")
+            self._count(name, "budget_exhausted")
+            logger.error(f"Retry budget exhausted, not retrying {name}: {error}")
+            return False
+        self._count(name, "retries")
+        logger.warning(f"Retry {attempt + 1}/{self.max_attempts - 1} for {name}: {error}")
+        return True
+
+    def retry(self, idempotent: bool = True) -> Callable:
+        """
+        Decorator applying this policy to a function or coroutine function.
+
+        Args:
+            idempotent (bool): Whether the operation may safely run more than once.
+
+        Returns:
+            Callable: Decorator.
+        """
+        errors = self._retryable_errors(idempotent)
+
+        def decorator(func):
+            name = func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    self._count(name, "calls")
+                    for attempt in range(self.max_attempts):
+                        self._count(name, "attempts")
+                        try:
+                            result = await func(*args, **kwargs)
+                            self.budget.deposit()
+                            return result
+                        except errors as e:
+                            if not self._should_retry(name, attempt, e):
+                                raise
+                            await asyncio.sleep(self.backoff(attempt))
+                    return None
+
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                self._count(name, "calls")
+                for attempt in range(self.max_attempts):
+                    self._count(name, "attempts")
+                    try:
+                        result = func(*args, **kwargs)
+                        self.budget.deposit()
+                        return result
+                    except errors as e:
+                        if not self._should_retry(name, attempt, e, allow=not _on_event_loop()):
+                            raise
+                        time.sleep(self.backoff(attempt))
+                return None
+
+            return wrapper
+
+        return decorator
+
+
+def _on_event_loop() -> bool:
+    """
+    Whether the current thread is running an asyncio event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def encode_page_cursor(value: Any, _id: Any, sort_key: str, direction: int) -> str:
+    """
+    Encode the last (sort value, _id) of a page into an opaque, URL-safe token.
+
+    The sort key and direction are recorded too, so a token cannot be replayed
+    against a different ordering.
 
     Args:
-        max_retries (int): Maximum number of retry attempts.
-        delay (float): Delay in seconds between retries.
+        value (Any): Sort key value of the last document on the page.
+        _id (Any): _id of the last document on the page.
+        sort_key (str): Field the page was ordered by.
+        direction (int): ASCENDING (1) or DESCENDING (-1).
 
     Returns:
-        Callable: Decorated function with retry logic.
+        str: Cursor token for paginate_keyset().
     """
+    data = {"v": value, "i": _id, "k": sort_key, "d": direction}
+    return base64.urlsafe_b64encode(bson.encode(data)).rstrip(b"=").decode("ascii")
 
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"Max retries reached for {func.__name__}: {e}")
-                        raise
-                    logger.warning(f"Retry {attempt + 1}/{max_retries} for {func.__name__}: {e}")
-                    time.sleep(delay * (attempt + 1))
+
+def decode_page_cursor(token: str) -> Tuple[Any, Any, str, int]:
+    """
+    Decode a token produced by encode_page_cursor().
+
+    Args:
+        token (str): Cursor token.
+
+    Returns:
+        Tuple[Any, Any, str, int]: (sort value, _id, sort key, direction)
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = bson.decode(raw)
+        return data["v"], data["i"], data["k"], data["d"]
+    except Exception as e:
+        raise ValueError(f"Invalid pagination cursor: {token}") from e
+
+
+def keyset_query(
+        filter: Optional[Dict[str, Any]],
+        sort_key: str,
+        direction: int,
+        cursor: Optional[str]
+) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Build the seek filter and sort for one keyset page.
+
+    Documents are ordered by (sort_key, _id) so ties on sort_key are broken
+    deterministically; the next page starts strictly after the cursor position.
+
+    Args:
+        filter (Optional[Dict[str, Any]]): Base query filter.
+        sort_key (str): Field to order by.
+        direction (int): ASCENDING (1) or DESCENDING (-1).
+        cursor (Optional[str]): Token from the previous page, or None for the first page.
+
+    Returns:
+        Tuple[Dict[str, Any], List[Tuple[str, int]]]: (query filter, sort specification)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort_key/direction.
+    """
+    sort = [(sort_key, direction)] if sort_key == "_id" else [(sort_key, direction), ("_id", direction)]
+    if cursor is None:
+        return filter or {}, sort
+
+    value, last_id, cursor_key, cursor_direction = decode_page_cursor(cursor)
+    if (cursor_key, cursor_direction) != (sort_key, direction):
+        raise ValueError(
+            f"Pagination cursor was issued for sort_key={cursor_key!r}, direction={cursor_direction}, "
+            f"not sort_key={sort_key!r}, direction={direction}"
+        )
+    op = "$gt" if direction == ASCENDING else "$lt"
+    if sort_key == "_id":
+        seek = {"_id": {op: last_id}}
+    else:
+        seek = {"$or": [{sort_key: {op: value}}, {sort_key: value, "_id": {op: last_id}}]}
+    return ({"$and": [filter, seek]} if filter else seek), sort
+
+
+def keyset_projection(
+        projection: Optional[Dict[str, Any]],
+        sort_key: str
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Projection for one keyset page: _id and sort_key are always fetched, since
+    the next cursor is built from them.
+
+    Args:
+        projection (Optional[Dict[str, Any]]): Caller's inclusion or exclusion projection.
+        sort_key (str): Field the page is ordered by.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], bool]: (projection to send, whether the
+            caller asked for _id in the results)
+    """
+    if projection is None:
+        return None, True
+    projection = dict(projection)
+    keep_id = bool(projection.pop("_id", True))
+    if sort_key != "_id":
+        if any(projection.values()):
+            projection[sort_key] = 1
+        else:
+            projection.pop(sort_key, None)
+    return projection or None, keep_id
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    """
+    Read a possibly dotted field path from a document.
+    """
+    for part in path.split("."):
+        if not isinstance(doc, dict):
             return None
+        doc = doc.get(part)
+    return doc
 
-        return wrapper
 
-    return decorator
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def _json_default(value: Any) -> Any:
+    """
+    json.dumps fallback for BSON types.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def render_json(doc: Optional[Mapping[str, Any]], fields: Optional[Iterable[str]] = None) -> bytes:
+    """
+    Render a document straight to JSON bytes.
+
+    Works on RawBSONDocument (from get/filter with raw=True) as well as plain
+    dicts, without mutating the source. '_id' is emitted as 'id' (ObjectId as
+    string) and `fields` acts as an allow-list, all in a single pass.
+
+    Args:
+        doc (Optional[Mapping[str, Any]]): Document to render.
+        fields (Optional[Iterable[str]]): Output fields to keep, in order. 'id'
+            refers to the document's '_id'. None keeps every field.
+
+    Returns:
+        bytes: UTF-8 encoded JSON (b"null" for None).
+
+    Example:
+        >>> doc = db.get({"email": email}, raw=True)
+        >>> Response(render_json(doc, ("id", "email", "full_name")), media_type="application/json")
+    """
+    if doc is None:
+        return b"null"
+
+    out = {}
+    if fields is None:
+        for key, value in doc.items():
+            if key == "_id":
+                key, value = "id", str(value)
+            out[key] = value
+    else:
+        for key in fields:
+            source = "_id" if key == "id" and "id" not in doc else key
+            if source in doc:
+                value = doc[source]
+                out[key] = str(value) if source == "_id" else value
+
+    return json.dumps(out, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+_retry_budget = RetryBudget()
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def retry_on_failure(max_retries: int = 3, delay: float = 1.0, idempotent: bool = True):
+    """
+    Decorator to retry operations on transient failures.
+
+    Kept for backwards compatibility; builds a RetryPolicy sharing the
+    process-wide retry budget.
+
+    Args:
+        max_retries (int): Maximum number of attempts.
+        delay (float): Backoff base delay in seconds.
+        idempotent (bool): Whether the operation may safely run more than once.
+
+    Returns:
+        Callable: Decorated function with retry logic.
+    """
+    return RetryPolicy(max_attempts=max_retries, base_delay=delay).retry(idempotent=idempotent)
 
 
 class MongoDB:
@@ -81,12 +618,16 @@ class MongoDB:
     Production-ready MongoDB utility class with advanced features.
 
     Features:
-        - Connection pooling and timeout management
-        - Automatic retry logic for transient failures
+        - Connection pooling and timeout management (one shared client per
+          connection string, see ClientRegistry)
+        - Automatic retry with jittered backoff and a retry budget (see RetryPolicy)
         - Transaction support
+        - Optional read-through document cache (see DocumentCache)
         - Index management
-        - Bulk operations
+        - Bulk operations, optional write coalescing (see WriteBuffer)
         - Query optimization helpers
+        - Per-operation latency histograms and slow-query log (see OperationStats)
+        - Index advice from observed query shapes (see IndexAdvisor)
         - Comprehensive error handling
         - Context manager support
 
@@ -103,11 +644,18 @@ class MongoDB:
             max_pool_size: int = DEFAULT_MAX_POOL_SIZE,
             min_pool_size: int = DEFAULT_MIN_POOL_SIZE,
             timeout_ms: int = DEFAULT_TIMEOUT_MS,
+            shared_client: bool = True,
+            cache: Optional[DocumentCache] = None,
+            client: Optional[MongoClient] = None,
             **kwargs
     ) -> None:
         """
         Initialize MongoDB client with connection pooling and timeout settings.
 
+        Handles with identical connection settings share one pooled client, so
+        creating another handle is a registry lookup; the server is only pinged
+        when the shared client is first created.
+
         Args:
             db_name (str): Name of the database.
             collection_name (str): Name of the collection.
@@ -115,38 +663,63 @@ class MongoDB:
             max_pool_size (int): Maximum connection pool size for performance.
             min_pool_size (int): Minimum connection pool size.
             timeout_ms (int): Connection timeout in milliseconds.
+            shared_client (bool): Use the process-wide shared client. If False, a
+                private client is created and closed with this handle.
+            cache (Optional[DocumentCache]): Read-through cache for get() and
+                get_by_id(); writes through this handle invalidate it.
+            client (Optional[MongoClient]): Use this already-configured client
+                (e.g. an in-process stand-in such as mongomock) instead of
+                connecting; it is never pinged or closed by this handle.
             **kwargs: Additional MongoClient parameters.
 
         Raises:
             ConnectionFailure: If unable to connect to MongoDB.
             ServerSelectionTimeoutError: If server selection times out.
         """
+        self._session: Optional[ClientSession] = None
+        self._shared_client = shared_client
+        self._external_client = client is not None
+        self.cache = cache
+        self.write_buffer: Optional[WriteBuffer] = None
+        self._closed = False
+
+        client_options = dict(
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            serverSelectionTimeoutMS=timeout_ms,
+            connectTimeoutMS=timeout_ms,
+            socketTimeoutMS=timeout_ms,
+            retryWrites=True,
+            retryReads=True,
+            **kwargs
+        )
         try:
-            self.client: MongoClient = MongoClient(
-                connection_str,
-                maxPoolSize=max_pool_size,
-                minPoolSize=min_pool_size,
-                serverSelectionTimeoutMS=timeout_ms,
-                connectTimeoutMS=timeout_ms,
-                socketTimeoutMS=timeout_ms,
-                retryWrites=True,
-                retryReads=True,
-                **kwargs
-            )
+            if client is not None:
+                self.client, created = client, False
+            elif shared_client:
+                self.client, created = _client_registry.acquire(connection_str, **client_options)
+            else:
+                self.client, created = MongoClient(connection_str, **client_options), True
+        except Exception as e:
+            logger.error(f"Unexpected error during MongoDB initialization: {e}")
+            raise
 
-            # Test connection
-            self.client.admin.command('ping')
-            logger.info(f"Successfully connected to MongoDB: {db_name}.{collection_name}")
+        try:
+            if created:
+                # Test connection once per client, not once per handle
+                self.client.admin.command('ping')
+                logger.info(f"Successfully connected to MongoDB: {db_name}.{collection_name}")
 
             self.db: Database = self.client[db_name]
             self.collection: Collection = self.db[collection_name]
-            self._session: Optional[ClientSession] = None
 
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
+            self.close()
             raise
         except Exception as e:
             logger.error(f"Unexpected error during MongoDB initialization: {e}")
+            self.close()
             raise
 
     def __enter__(self) -> 'MongoDB':
@@ -183,6 +756,25 @@ class MongoDB:
             logger.error(f"Health check failed: {e}")
             return False
 
+    def warm_pool(self, connections: Optional[int] = None) -> int:
+        """
+        Open pool connections ahead of traffic by running concurrent pings.
+
+        Args:
+            connections (Optional[int]): Connections to open; defaults to the
+                client's minPoolSize.
+
+        Returns:
+            int: Number of pings that succeeded.
+        """
+        connections = connections or self.client.options.pool_options.min_pool_size
+        if connections <= 0:
+            return 0
+        # Overlapping pings each check out their own connection
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            results = list(executor.map(lambda _: self.health_check(), range(connections)))
+        return sum(results)
+
     @staticmethod
     def hashit(data: str) -> str:
         """
@@ -313,7 +905,9 @@ class MongoDB:
         logger.info(f"Switched to collection: {collection_name}")
         return self.collection
 
-    @retry_on_failure(max_retries=3)
+    @instrumented(filter_arg=None)
+    @DEFAULT_RETRY_POLICY.retry(idempotent=False)
+    @invalidates_cache
     def insert(
             self,
             data: Dict[str, Any],
@@ -323,6 +917,10 @@ class MongoDB:
         """
         Insert a single document with retry logic.
 
+        With a write buffer enabled (and no session or extra arguments), the
+        insert is coalesced with concurrent writes and this call blocks until
+        its batch is acknowledged.
+
         Args:
             data (Dict[str, Any]): Document to insert.
             session (Optional[ClientSession]): Transaction session.
@@ -335,8 +933,11 @@ class MongoDB:
             OperationFailure: If insert operation fails.
         """
         try:
+            if self.write_buffer is not None and session is None and not kwargs:
+                return self.write_buffer.insert(data).result()
+
             result = self.collection.insert_one(data, session=session, **kwargs)
-            logger.debug(f"Inserted document with ID: {result.inserted_id}")
+            logger.debug("Inserted document with ID: %s", result.inserted_id)
             return str(result.inserted_id)
         except DuplicateKeyError as e:
             logger.error(f"Duplicate key error on insert: {e}")
@@ -345,6 +946,7 @@ class MongoDB:
             logger.error(f"Error inserting document: {e}")
             raise
 
+    @invalidates_cache
     def insert_unique(
             self,
             filter: Dict[str, Any],
@@ -376,7 +978,7 @@ class MongoDB:
             )
 
             if result.upserted_id:
-                logger.debug(f"Inserted unique document with ID: {result.upserted_id}")
+                logger.debug("Inserted unique document with ID: %s", result.upserted_id)
                 return True
             else:
                 logger.debug("Document already exists, skipping insert")
@@ -385,7 +987,9 @@ class MongoDB:
             logger.error(f"Error in insert_unique: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    @instrumented(filter_arg=None)
+    @DEFAULT_RETRY_POLICY.retry(idempotent=False)
+    @invalidates_cache
     def insert_many(
             self,
             data: List[Dict[str, Any]],
@@ -419,12 +1023,14 @@ class MongoDB:
                 session=session,
                 **kwargs
             )
-            logger.info(f"Inserted {len(result.inserted_ids)} documents")
+            logger.info("Inserted %s documents", len(result.inserted_ids))
             return [str(_id) for _id in result.inserted_ids]
         except Exception as e:
             logger.error(f"Error inserting multiple documents: {e}")
             raise
 
+    @instrumented(filter_arg=None)
+    @invalidates_cache
     def bulk_write(
             self,
             operations: List[Any],
@@ -441,7 +1047,7 @@ class MongoDB:
             session (Optional[ClientSession]): Transaction session.
 
         Returns:
-            Dict[str, int]: Result statistics (inserted, modified, deleted counts).
+            Dict[str, int]: Result statistics (inserted, matched, modified, deleted, upserted counts).
 
         Example:
             >>> from pymongo import InsertOne, UpdateOne
@@ -455,17 +1061,19 @@ class MongoDB:
             result = self.collection.bulk_write(operations, ordered=ordered, session=session)
             stats = {
                 "inserted": result.inserted_count,
+                "matched": result.matched_count,
                 "modified": result.modified_count,
                 "deleted": result.deleted_count,
                 "upserted": result.upserted_count
             }
-            logger.info(f"Bulk write completed: {stats}")
+            logger.info("Bulk write completed: %s", stats)
             return stats
         except Exception as e:
             logger.error(f"Error in bulk write: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
     def filter(
             self,
             filter: Optional[Dict[str, Any]] = None,
@@ -475,6 +1083,7 @@ class MongoDB:
             limit: int = 0,
             skip: int = 0,
             session: Optional[ClientSession] = None,
+            raw: bool = False,
             **kwargs
     ) -> List[Dict[str, Any]]:
         """
@@ -488,6 +1097,7 @@ class MongoDB:
             limit (int): Maximum number of documents to return (0 = no limit).
             skip (int): Number of documents to skip.
             session (Optional[ClientSession]): Transaction session.
+            raw (bool): Return undecoded RawBSONDocuments for render_json().
             **kwargs: Additional find parameters.
 
         Returns:
@@ -502,36 +1112,92 @@ class MongoDB:
             ... )
         """
         try:
-            if projection is None:
-                projection = None if show_id else {"_id": 0}
-
-            cursor = self.collection.find(
-                filter or {},
-                projection,
+            result = list(self.iter_filter(
+                filter=filter,
+                show_id=show_id,
+                projection=projection,
+                sort=sort,
+                limit=limit,
+                skip=skip,
                 session=session,
+                raw=raw,
                 **kwargs
-            )
+            ))
+            logger.debug("Filter returned %s documents", len(result))
+            return result
+        except Exception as e:
+            logger.error(f"Error filtering documents: {e}")
+            raise
 
-            if sort:
-                cursor = cursor.sort(sort)
-            if skip > 0:
-                cursor = cursor.skip(skip)
-            if limit > 0:
-                cursor = cursor.limit(limit)
+    def iter_filter(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            show_id: bool = False,
+            projection: Optional[Dict[str, Any]] = None,
+            sort: Optional[List[Tuple[str, int]]] = None,
+            limit: int = 0,
+            skip: int = 0,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            session: Optional[ClientSession] = None,
+            raw: bool = False,
+            **kwargs
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Stream documents matching a filter, one server batch at a time.
 
-            result = []
-            for item in cursor:
-                if show_id and "_id" in item:
-                    item = self._replace_id_key(item)
-                elif not show_id and "_id" in item:
-                    item.pop("_id", None)
-                result.append(item)
+        Unlike filter(), nothing is accumulated: memory is bounded by batch_size
+        and the first document is available as soon as the first batch arrives.
+        The '_id' -> 'id' rewrite is applied to each document as it is yielded.
 
-            logger.debug(f"Filter returned {len(result)} documents")
-            return result
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            show_id (bool): Whether to include '_id' (as 'id') in results.
+            projection (Optional[Dict[str, Any]]): Fields to include/exclude.
+            sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            limit (int): Maximum number of documents to return (0 = no limit).
+            skip (int): Number of documents to skip.
+            batch_size (int): Documents fetched per server round trip.
+            session (Optional[ClientSession]): Transaction session.
+            raw (bool): Yield undecoded RawBSONDocuments for render_json().
+            **kwargs: Additional find parameters.
+
+        Yields:
+            Dict[str, Any]: Matching documents.
+
+        Example:
+            >>> for doc in db.iter_filter({"vehicle_id": vid}, batch_size=1000):
+            ...     process(doc)
+        """
+        if projection is None:
+            projection = None if show_id else {"_id": 0}
+
+        collection = self._raw_collection() if raw else self.collection
+        cursor = collection.find(
+            filter or {},
+            projection,
+            session=session,
+            batch_size=batch_size,
+            **kwargs
+        )
+
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip > 0:
+            cursor = cursor.skip(skip)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        try:
+            if raw:
+                yield from cursor
+                return
+            for item in cursor:
+                yield self._shape_document(item, show_id)
         except Exception as e:
-            logger.error(f"Error filtering documents: {e}")
+            logger.error(f"Error iterating documents: {e}")
             raise
+        finally:
+            cursor.close()
 
     def paginate(
             self,
@@ -539,16 +1205,24 @@ class MongoDB:
             page: int = 1,
             page_size: int = 10,
             sort: Optional[List[Tuple[str, int]]] = None,
+            total: Optional[str] = "exact",
             **kwargs
     ) -> Dict[str, Any]:
         """
         Paginate query results for large datasets.
 
+        Offset pagination: page N skips (N-1)*page_size documents on the server,
+        so cost grows with depth. For deep or unbounded scrolling use
+        paginate_keyset() instead.
+
         Args:
             filter (Optional[Dict[str, Any]]): Query filter.
             page (int): Page number (1-indexed).
             page_size (int): Number of documents per page.
             sort (Optional[List[Tuple[str, int]]]): Sort specification.
+            total (Optional[str]): How to compute the total: "exact"
+                (count_documents), "estimated" (collection metadata, ignores the
+                filter) or None (skip counting; total and total_pages are None).
             **kwargs: Additional parameters for filter method.
 
         Returns:
@@ -557,13 +1231,13 @@ class MongoDB:
                     "data": List[Dict],
                     "page": int,
                     "page_size": int,
-                    "total": int,
-                    "total_pages": int
+                    "total": Optional[int],
+                    "total_pages": Optional[int]
                 }
         """
         try:
-            total = self.count(filter)
-            total_pages = (total + page_size - 1) // page_size
+            total_count = self._page_total(filter, total)
+            total_pages = None if total_count is None else (total_count + page_size - 1) // page_size
             skip = (page - 1) * page_size
 
             data = self.filter(
@@ -579,20 +1253,135 @@ class MongoDB:
                 "data": data,
                 "page": page,
                 "page_size": page_size,
-                "total": total,
+                "total": total_count,
                 "total_pages": total_pages
             }
         except Exception as e:
             logger.error(f"Error in pagination: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    def paginate_keyset(
+            self,
+            filter: Optional[Dict[str, Any]] = None,
+            page_size: int = 10,
+            sort_key: str = "_id",
+            direction: int = DESCENDING,
+            cursor: Optional[str] = None,
+            projection: Optional[Dict[str, Any]] = None,
+            total: Optional[str] = None,
+            session: Optional[ClientSession] = None
+    ) -> Dict[str, Any]:
+        """
+        Paginate with a cursor token that seeks on (sort_key, _id).
+
+        Each page is a bounded index range scan regardless of depth, so page
+        10,000 costs the same as page 1. Back it with an index on
+        [(sort_key, direction), ("_id", direction)] (see keyset_index_spec()),
+        prefixed by any equality fields of the filter.
+
+        Args:
+            filter (Optional[Dict[str, Any]]): Query filter.
+            page_size (int): Number of documents per page.
+            sort_key (str): Field to order by.
+            direction (int): ASCENDING (1) or DESCENDING (-1).
+            cursor (Optional[str]): next_cursor from the previous page; None for the first page.
+            projection (Optional[Dict[str, Any]]): Fields to include or exclude (sort_key is always included).
+            total (Optional[str]): None (default, no count), "exact" or "estimated".
+            session (Optional[ClientSession]): Transaction session.
+
+        Returns:
+            Dict[str, Any]: Page with metadata.
+                {
+                    "data": List[Dict],
+                    "page_size": int,
+                    "next_cursor": Optional[str],
+                    "total": Optional[int]
+                }
+
+        Raises:
+            ValueError: If the cursor token is malformed or was issued for a
+                different sort_key/direction.
+
+        Example:
+            >>> page = db.paginate_keyset(sort_key="created_at", page_size=50)
+            >>> page = db.paginate_keyset(sort_key="created_at", page_size=50, cursor=page["next_cursor"])
+        """
+        try:
+            query, sort = keyset_query(filter, sort_key, direction, cursor)
+            projection, keep_id = keyset_projection(projection, sort_key)
+
+            docs = list(
+                self.collection.find(query, projection, session=session)
+                .sort(sort)
+                .limit(page_size + 1)
+            )
+
+            next_cursor = None
+            if len(docs) > page_size:
+                docs = docs[:page_size]
+                last = docs[-1]
+                next_cursor = encode_page_cursor(_get_path(last, sort_key), last["_id"], sort_key, direction)
+
+            return {
+                "data": [self._shape_document(doc, keep_id) for doc in docs],
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+                "total": self._page_total(filter, total)
+            }
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in keyset pagination: {e}")
+            raise
+
+    def _page_total(self, filter: Optional[Dict[str, Any]], total: Optional[str]) -> Optional[int]:
+        """
+        Resolve the total for a pagination response.
+        """
+        if total is None:
+            return None
+        if total == "estimated":
+            return self.collection.estimated_document_count()
+        if total == "exact":
+            return self.count(filter)
+        raise ValueError(f"Invalid total mode: {total}")
+
+    @staticmethod
+    def keyset_index_spec(
+            sort_key: str,
+            direction: int = DESCENDING,
+            prefix: Optional[List[Tuple[str, int]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Index specification backing paginate_keyset() for ensure_indexes().
+
+        Args:
+            sort_key (str): Field used as sort_key.
+            direction (int): ASCENDING (1) or DESCENDING (-1).
+            prefix (Optional[List[Tuple[str, int]]]): Equality filter fields to lead the index.
+
+        Returns:
+            Dict[str, Any]: {"keys": [...]} spec.
+
+        Example:
+            >>> db.ensure_indexes([db.keyset_index_spec("created_at", prefix=[("owner_id", 1)])])
+        """
+        keys = list(prefix or [])
+        keys.append((sort_key, direction))
+        if sort_key != "_id":
+            keys.append(("_id", direction))
+        return {"keys": keys}
+
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
     def get(
             self,
             filter: Optional[Dict[str, Any]] = None,
             show_id: bool = True,
             projection: Optional[Dict[str, Any]] = None,
             session: Optional[ClientSession] = None,
+            raw: bool = False,
+            use_cache: bool = True,
             **kwargs
     ) -> Optional[Dict[str, Any]]:
         """
@@ -603,6 +1392,10 @@ class MongoDB:
             show_id (bool): Whether to include '_id' in result.
             projection (Optional[Dict[str, Any]]): Fields to include/exclude.
             session (Optional[ClientSession]): Transaction session.
+            raw (bool): Return the undecoded RawBSONDocument (or None), for
+                rendering with render_json(). '_id' is left as is.
+            use_cache (bool): Read through the handle's cache, if any. Calls with a
+                session, raw=True or extra find_one arguments always bypass it.
             **kwargs: Additional find_one parameters.
 
         Returns:
@@ -615,6 +1408,18 @@ class MongoDB:
             if projection is None:
                 projection = None if show_id else {"_id": 0}
 
+            if raw:
+                return self._raw_collection().find_one(filter or {}, projection, session=session, **kwargs)
+
+            cache_key = None
+            if not kwargs:
+                cache_key = self._cache_key(use_cache, session, "get", filter, projection, show_id)
+                if cache_key is not None:
+                    doc = self.cache.get(self.collection.full_name, cache_key)
+                    if doc is not None:
+                        return doc
+                    generation = self.cache.generation(self.collection.full_name)
+
             doc = self.collection.find_one(
                 filter or {},
                 projection,
@@ -627,16 +1432,20 @@ class MongoDB:
             elif doc and not show_id:
                 doc.pop("_id", None)
 
+            if cache_key is not None:
+                self.cache.set(self.collection.full_name, cache_key, doc, if_generation=generation)
             return doc if doc else {}
         except Exception as e:
             logger.error(f"Error in get: {e}")
             raise
 
+    @instrumented(filter_arg="_id")
     def get_by_id(
             self,
             _id: Union[str, ObjectId],
             show_id: bool = True,
-            session: Optional[ClientSession] = None
+            session: Optional[ClientSession] = None,
+            use_cache: bool = True
     ) -> Optional[Dict[str, Any]]:
         """
         Get a document by its ObjectId.
@@ -645,6 +1454,7 @@ class MongoDB:
             _id (Union[str, ObjectId]): Document ID.
             show_id (bool): Whether to include '_id' in result.
             session (Optional[ClientSession]): Transaction session.
+            use_cache (bool): Read through the handle's cache, if any.
 
         Returns:
             Optional[Dict[str, Any]]: The document, or None if not found.
@@ -656,6 +1466,13 @@ class MongoDB:
             if isinstance(_id, str):
                 _id = ObjectId(_id)
 
+            cache_key = self._cache_key(use_cache, session, "get_by_id", _id, show_id)
+            if cache_key is not None:
+                doc = self.cache.get(self.collection.full_name, cache_key)
+                if doc is not None:
+                    return doc
+                generation = self.cache.generation(self.collection.full_name)
+
             doc = self.collection.find_one({"_id": _id}, session=session)
 
             if doc and show_id:
@@ -663,6 +1480,8 @@ class MongoDB:
             elif doc and not show_id:
                 doc.pop("_id", None)
 
+            if cache_key is not None:
+                self.cache.set(self.collection.full_name, cache_key, doc, if_generation=generation)
             return doc
         except InvalidId as e:
             logger.error(f"Invalid ObjectId: {_id}")
@@ -671,7 +1490,8 @@ class MongoDB:
             logger.error(f"Error in get_by_id: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    @instrumented(docs=None)
+    @DEFAULT_RETRY_POLICY.retry()
     def count(
             self,
             filter: Optional[Dict[str, Any]] = None,
@@ -722,7 +1542,9 @@ class MongoDB:
             logger.error(f"Error checking existence: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    @invalidates_cache
     def update(
             self,
             filter: Dict[str, Any],
@@ -763,12 +1585,14 @@ class MongoDB:
                 session=session,
                 **kwargs
             )
-            logger.info(f"Updated {result.modified_count} documents")
+            logger.info("Updated %s documents", result.modified_count)
             return result.modified_count
         except Exception as e:
             logger.error(f"Error updating documents: {e}")
             raise
 
+    @instrumented()
+    @invalidates_cache
     def update_one(
             self,
             filter: Dict[str, Any],
@@ -780,6 +1604,11 @@ class MongoDB:
         """
         Update a single document matching the filter.
 
+        With a write buffer enabled (and no session or extra arguments), the
+        update is coalesced with concurrent writes; it then returns True if a
+        document matched the filter, since bulk results carry no per-operation
+        modified count.
+
         Args:
             filter (Dict[str, Any]): Query filter.
             update_data (Dict[str, Any]): Data to update.
@@ -792,6 +1621,9 @@ class MongoDB:
         """
         try:
             filter = self._normalize_object_id(filter)
+            if self.write_buffer is not None and session is None and not kwargs:
+                return self.write_buffer.update_one(filter, update_data, upsert=upsert).result()
+
             result = self.collection.update_one(
                 filter,
                 {"$set": update_data},
@@ -821,19 +1653,25 @@ class MongoDB:
         Returns:
             Tuple[Optional[Dict[str, Any]], bool]: (The document, True if created, False if updated)
         """
+        result = None
         try:
-            result = self.collection.update_one(
-                filter,
-                {"$set": data},
-                upsert=True,
-                session=session
-            )
+            try:
+                result = self.collection.update_one(
+                    filter,
+                    {"$set": data},
+                    upsert=True,
+                    session=session
+                )
+            finally:
+                # Only a write that changed something makes cached reads stale
+                if result is None or result.upserted_id is not None or result.modified_count:
+                    self._invalidate_cache()
 
             if result.upserted_id is not None:
                 # Document was created
                 doc = self.collection.find_one({"_id": result.upserted_id}, session=session)
                 doc = self._replace_id_key(doc)
-                logger.debug(f"Created document with ID: {result.upserted_id}")
+                logger.debug("Created document with ID: %s", result.upserted_id)
                 return doc, True
             else:
                 # Document was updated
@@ -854,6 +1692,9 @@ class MongoDB:
         """
         Fetch a document matching the filter, or create it if it doesn't exist.
 
+        If a unique index on the filter fields makes a concurrent create fail
+        with DuplicateKeyError, the document that won is returned as fetched.
+
         Args:
             filter (Dict[str, Any]): Query filter.
             data (Optional[Dict[str, Any]]): Additional data to insert if not found.
@@ -875,16 +1716,29 @@ class MongoDB:
             if data:
                 new_doc.update(data)
 
-            inserted_id = self.collection.insert_one(new_doc, session=session).inserted_id
+            try:
+                inserted_id = self.collection.insert_one(new_doc, session=session).inserted_id
+            except DuplicateKeyError:
+                # A concurrent caller created it between find_one and insert_one
+                doc = self.collection.find_one(filter, session=session)
+                if not doc:
+                    raise
+                logger.debug("Document created concurrently")
+                return self._replace_id_key(doc), False
+            finally:
+                # Only the create path writes; a plain fetch leaves the cache alone
+                self._invalidate_cache()
             new_doc["_id"] = str(inserted_id)
             doc = self._replace_id_key(new_doc)
-            logger.debug(f"Created document with ID: {inserted_id}")
+            logger.debug("Created document with ID: %s", inserted_id)
             return doc, True
         except Exception as e:
             logger.error(f"Error in get_or_create: {e}")
             raise
 
-    @retry_on_failure(max_retries=3)
+    @instrumented()
+    @DEFAULT_RETRY_POLICY.retry()
+    @invalidates_cache
     def delete(
             self,
             filter: Dict[str, Any],
@@ -912,12 +1766,14 @@ class MongoDB:
         try:
             filter = self._normalize_object_id(filter)
             result = self.collection.delete_many(filter, session=session, **kwargs)
-            logger.info(f"Deleted {result.deleted_count} documents")
+            logger.info("Deleted %s documents", result.deleted_count)
             return result.deleted_count
         except Exception as e:
             logger.error(f"Error deleting documents: {e}")
             raise
 
+    @instrumented()
+    @invalidates_cache
     def delete_one(
             self,
             filter: Dict[str, Any],
@@ -943,6 +1799,7 @@ class MongoDB:
             logger.error(f"Error in delete_one: {e}")
             raise
 
+    @invalidates_cache
     def drop_db(self, db_name: Optional[str] = None, confirm: bool = False) -> None:
         """
         Drop a database with confirmation requirement.
@@ -965,6 +1822,7 @@ class MongoDB:
             logger.error(f"Error dropping database: {e}")
             raise
 
+    @invalidates_cache
     def drop_collection(
             self,
             collection_name: Optional[str] = None,
@@ -1019,6 +1877,39 @@ class MongoDB:
             logger.error(f"Error getting keys: {e}")
             raise
 
+    def _cache_key(self, use_cache: bool, session: Optional[ClientSession], method: str, *parts: Any) -> Optional[bytes]:
+        """
+        Cache key for a read, or None when the cache must be bypassed.
+        """
+        if self.cache is None or not use_cache or session is not None:
+            return None
+        return self.cache.make_key(method, *parts)
+
+    def _invalidate_cache(self) -> None:
+        """
+        Drop cached documents of the current collection after a write.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self.collection.full_name)
+
+    def _raw_collection(self) -> Collection:
+        """
+        The current collection configured to return RawBSONDocument.
+        """
+        raw = getattr(self, "_raw_coll", None)
+        if raw is None or raw.full_name != self.collection.full_name:
+            raw = self._raw_coll = self.collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+        return raw
+
+    def _shape_document(self, doc: dict, show_id: bool) -> dict:
+        """
+        Apply the show_id convention to a single document.
+        """
+        if show_id:
+            return self._replace_id_key(doc)
+        doc.pop("_id", None)
+        return doc
+
     def _replace_id_key(self, doc: dict) -> dict:
         """
         Replace '_id' key with 'id' in a document.
@@ -1133,15 +2024,31 @@ class MongoDB:
         """
         created_indexes = []
         for idx_spec in indexes:
-            keys = idx_spec.pop("keys")
+            options = dict(idx_spec)
+            keys = options.pop("keys")
             try:
-                name = self.create_index(keys, **idx_spec)
+                name = self.create_index(keys, **options)
                 created_indexes.append(name)
             except Exception as e:
                 logger.warning(f"Could not create index on {keys}: {e}")
 
         return created_indexes
 
+    def index_report(self) -> Dict[str, Any]:
+        """
+        Compare the query shapes observed on this collection with its indexes.
+        See entity.index_advisor.IndexAdvisor.
+
+        Returns:
+            Dict[str, Any]: {namespace, missing, partial, unused, dropped_shapes}.
+
+        Example:
+            >>> report = db.index_report()
+            >>> index_advisor.apply(db, report)                 # dry run
+            >>> index_advisor.apply(db, report, dry_run=False)  # create them
+        """
+        return index_advisor.recommend(self)
+
     # ========== TRANSACTION SUPPORT ==========
 
     @contextmanager
@@ -1172,6 +2079,9 @@ class MongoDB:
         """
         Context manager for atomic transactions across multiple operations.
 
+        Reads inside the transaction (session passed) bypass the document cache,
+        and the cache is invalidated again once the transaction ends.
+
         Args:
             **kwargs: Additional transaction options.
 
@@ -1184,17 +2094,21 @@ class MongoDB:
             ...     db.update({"name": "Jane"}, {"age": 30}, session=session)
             ...     # Auto-commits on success, auto-aborts on exception
         """
-        with self.start_session() as session:
-            with session.start_transaction(**kwargs):
-                try:
-                    yield session
-                    # Transaction commits automatically if no exception
-                except Exception as e:
-                    logger.error(f"Transaction aborted due to error: {e}")
-                    raise
+        try:
+            with self.start_session() as session:
+                with session.start_transaction(**kwargs):
+                    try:
+                        yield session
+                        # Transaction commits automatically if no exception
+                    except Exception as e:
+                        logger.error(f"Transaction aborted due to error: {e}")
+                        raise
+        finally:
+            self._invalidate_cache()
 
     # ========== AGGREGATION METHODS ==========
 
+    @instrumented(filter_arg="pipeline")
     def aggregate(
             self,
             pipeline: List[Dict[str, Any]],
@@ -1221,14 +2135,41 @@ class MongoDB:
             >>> results = db.aggregate(pipeline)
         """
         try:
-            cursor = self.collection.aggregate(pipeline, session=session, **kwargs)
-            results = list(cursor)
-            logger.debug(f"Aggregation returned {len(results)} results")
+            results = list(self.iter_aggregate(pipeline, session=session, **kwargs))
+            logger.debug("Aggregation returned %s results", len(results))
             return results
         except Exception as e:
             logger.error(f"Error in aggregation: {e}")
             raise
 
+    def iter_aggregate(
+            self,
+            pipeline: List[Dict[str, Any]],
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            session: Optional[ClientSession] = None,
+            **kwargs
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Stream aggregation results, one server batch at a time.
+
+        Args:
+            pipeline (List[Dict[str, Any]]): Aggregation pipeline stages.
+            batch_size (int): Documents fetched per server round trip.
+            session (Optional[ClientSession]): Transaction session.
+            **kwargs: Additional aggregate parameters.
+
+        Yields:
+            Dict[str, Any]: Aggregation results.
+        """
+        cursor = self.collection.aggregate(pipeline, session=session, batchSize=batch_size, **kwargs)
+        try:
+            yield from cursor
+        except Exception as e:
+            logger.error(f"Error iterating aggregation: {e}")
+            raise
+        finally:
+            cursor.close()
+
     def distinct(
             self,
             field: str,
@@ -1302,8 +2243,9 @@ class MongoDB:
             field: str,
             values: List[Any],
             show_id: bool = False,
+            stream: bool = False,
             **kwargs
-    ) -> List[Dict[str, Any]]:
+    ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
         Find documents where field value is in a list of values.
 
@@ -1311,15 +2253,16 @@ class MongoDB:
             field (str): Field name to check.
             values (List[Any]): List of values to match.
             show_id (bool): Whether to include '_id' in results.
+            stream (bool): Return a lazy iterator (see iter_filter) instead of a list.
             **kwargs: Additional parameters for filter method.
 
         Returns:
-            List[Dict[str, Any]]: Matching documents.
+            Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]: Matching documents.
 
         Example:
             >>> db.find_in("status", ["active", "pending"])
         """
-        return self.filter(
+        return (self.iter_filter if stream else self.filter)(
             filter={field: {"$in": values}},
             show_id=show_id,
             **kwargs
@@ -1331,8 +2274,9 @@ class MongoDB:
             pattern: str,
             case_insensitive: bool = True,
             show_id: bool = False,
+            stream: bool = False,
             **kwargs
-    ) -> List[Dict[str, Any]]:
+    ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
         Find documents where field matches a regex pattern.
 
@@ -1341,10 +2285,11 @@ class MongoDB:
             pattern (str): Regex pattern.
             case_insensitive (bool): Case-insensitive search.
             show_id (bool): Whether to include '_id' in results.
+            stream (bool): Return a lazy iterator (see iter_filter) instead of a list.
             **kwargs: Additional parameters for filter method.
 
         Returns:
-            List[Dict[str, Any]]: Matching documents.
+            Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]: Matching documents.
 
         Example:
             >>> db.find_regex("email", ".*@gmail.com$")
@@ -1353,7 +2298,7 @@ class MongoDB:
         if case_insensitive:
             regex_filter["$options"] = "i"
 
-        return self.filter(
+        return (self.iter_filter if stream else self.filter)(
             filter={field: regex_filter},
             show_id=show_id,
             **kwargs
@@ -1366,8 +2311,9 @@ class MongoDB:
             max_value: Any,
             inclusive: bool = True,
             show_id: bool = False,
+            stream: bool = False,
             **kwargs
-    ) -> List[Dict[str, Any]]:
+    ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
         Find documents where field value is between min and max.
 
@@ -1377,10 +2323,11 @@ class MongoDB:
             max_value (Any): Maximum value.
             inclusive (bool): Include min and max values.
             show_id (bool): Whether to include '_id' in results.
+            stream (bool): Return a lazy iterator (see iter_filter) instead of a list.
             **kwargs: Additional parameters for filter method.
 
         Returns:
-            List[Dict[str, Any]]: Matching documents.
+            Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]: Matching documents.
 
         Example:
             >>> db.find_between("age", 18, 65)
@@ -1390,7 +2337,7 @@ class MongoDB:
         else:
             range_filter = {"$gt": min_value, "$lt": max_value}
 
-        return self.filter(
+        return (self.iter_filter if stream else self.filter)(
             filter={field: range_filter},
             show_id=show_id,
             **kwargs
@@ -1439,8 +2386,9 @@ class MongoDB:
             search_text: str,
             filter: Optional[Dict[str, Any]] = None,
             limit: int = 0,
-            show_id: bool = False
-    ) -> List[Dict[str, Any]]:
+            show_id: bool = False,
+            stream: bool = False
+    ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
         Perform full-text search (requires text index).
 
@@ -1449,9 +2397,11 @@ class MongoDB:
             filter (Optional[Dict[str, Any]]): Additional query filters.
             limit (int): Maximum results to return.
             show_id (bool): Whether to include '_id' in results.
+            stream (bool): Return a lazy iterator (see iter_filter) instead of a list.
 
         Returns:
-            List[Dict[str, Any]]: Matching documents sorted by relevance.
+            Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]: Matching documents
+                sorted by relevance.
 
         Example:
             >>> db.text_search("mongodb database", limit=10)
@@ -1465,7 +2415,7 @@ class MongoDB:
         if not show_id:
             projection["_id"] = 0
 
-        return self.filter(
+        return (self.iter_filter if stream else self.filter)(
             filter=query,
             projection=projection,
             sort=[("score", {"$meta": "textScore"})],
@@ -1475,6 +2425,37 @@ class MongoDB:
 
     # ========== BATCH OPERATIONS ==========
 
+    def enable_write_buffer(
+            self,
+            max_batch: int = DEFAULT_MAX_BATCH,
+            max_latency_ms: float = DEFAULT_MAX_LATENCY_MS
+    ) -> WriteBuffer:
+        """
+        Coalesce insert() and update_one() calls into unordered bulk writes.
+
+        Callers are unchanged: each call still blocks until its own write is
+        acknowledged, but concurrent calls share one round trip. Use the returned
+        buffer's insert()/update_one() directly to get a Future instead.
+
+        Args:
+            max_batch (int): Flush when this many writes are pending.
+            max_latency_ms (float): Flush when the oldest pending write is this old.
+
+        Returns:
+            WriteBuffer: The handle's buffer.
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBuffer(self, max_batch=max_batch, max_latency_ms=max_latency_ms)
+        return self.write_buffer
+
+    def disable_write_buffer(self) -> None:
+        """
+        Flush pending buffered writes and return to direct writes.
+        """
+        buffer, self.write_buffer = self.write_buffer, None
+        if buffer is not None:
+            buffer.close()
+
     def batch_update(
             self,
             updates: List[Tuple[Dict[str, Any], Dict[str, Any]]],
@@ -1537,20 +2518,52 @@ class MongoDB:
     def export_to_dict(
             self,
             filter: Optional[Dict[str, Any]] = None,
-            limit: int = 0
-    ) -> List[Dict[str, Any]]:
+            limit: int = 0,
+            stream: bool = False,
+            batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
         """
         Export collection data to list of dictionaries.
 
         Args:
             filter (Optional[Dict[str, Any]]): Query filter.
             limit (int): Maximum documents to export.
+            stream (bool): Return a lazy iterator instead of a list.
+            batch_size (int): Documents fetched per round trip when streaming.
 
         Returns:
-            List[Dict[str, Any]]: Exported data.
+            Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]: Exported data.
         """
+        if stream:
+            return self.iter_filter(filter=filter, show_id=True, limit=limit, batch_size=batch_size)
         return self.filter(filter=filter, show_id=True, limit=limit)
 
+    def export_to_file(
+            self,
+            path: str,
+            filter: Optional[Dict[str, Any]] = None,
+            fmt: str = "ndjson",
+            gzip: bool = False,
+            **options
+    ) -> int:
+        """
+        Stream matching documents to an NDJSON or CSV file in constant memory.
+        See entity.bulk_export.BulkExporter.
+
+        Args:
+            path (str): Destination file.
+            filter (Optional[Dict[str, Any]]): Query filter.
+            fmt (str): "ndjson" or "csv".
+            gzip (bool): gzip-compress the output.
+            **options: BulkExporter options (fields, batch_size, chunk_bytes).
+
+        Returns:
+            int: Bytes written.
+        """
+        from entity.bulk_export import BulkExporter
+
+        return BulkExporter(self, fmt=fmt, gzip=gzip, **options).to_file(path, filter=filter)
+
     def import_from_dict(
             self,
             data: List[Dict[str, Any]],
@@ -1576,8 +2589,40 @@ class MongoDB:
 
         return self.insert_many(data, session=session)
 
+    def import_from_file(self, path: str, fmt: Optional[str] = None, **options) -> Dict[str, Any]:
+        """
+        Stream an NDJSON or CSV file (optionally .gz) into the collection in
+        bounded, validated, parallel chunks. See entity.bulk_import.BulkImporter.
+
+        Args:
+            path (str): File to import.
+            fmt (Optional[str]): "ndjson" or "csv"; inferred from the extension if None.
+            **options: BulkImporter options (model, chunk_size, workers, max_chunks,
+                checkpoint_path, reject_path, progress).
+
+        Returns:
+            Dict[str, Any]: Import totals (rows, inserted, rejected, chunks, ...).
+        """
+        from entity.bulk_import import BulkImporter
+
+        return BulkImporter(self, **options).run(path, fmt)
+
     # ========== STATISTICS & MONITORING ==========
 
+    def get_operation_stats(self) -> Dict[str, Any]:
+        """
+        Latency and document counters recorded for this collection in this process.
+
+        Returns:
+            Dict[str, Any]: {"operations": {method: {calls, errors, docs, mean_ms,
+                p50_ms, p95_ms, p99_ms, ...}}, "slow_queries": [...]}.
+        """
+        namespace = self.collection.full_name
+        return {
+            "operations": operation_stats.snapshot(namespace).get(namespace, {}),
+            "slow_queries": operation_stats.slow_queries(namespace),
+        }
+
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         Get collection statistics (size, count, indexes, etc.).
@@ -1617,14 +2662,29 @@ class MongoDB:
 
     def close(self) -> None:
         """
-        Close the MongoDB client connection and clean up resources.
+        Release this handle and clean up resources.
+
+        A shared client is only closed once the last handle using it is closed;
+        a private client (shared_client=False) is closed immediately and a
+        client passed in by the caller is left open.
         """
+        if self._closed:
+            return
+        self._closed = True
         try:
+            self.disable_write_buffer()
             if self._session:
                 self._session.end_session()
                 self._session = None
-            self.client.close()
-            logger.info("MongoDB connection closed")
+            if self._external_client:
+                client = None
+            elif self._shared_client:
+                client = _client_registry.release(self.client)
+            else:
+                client = self.client
+            if client is not None:
+                client.close()
+                logger.info("MongoDB connection closed")
         except Exception as e:
             logger.error(f"Error closing connection: {e}")
 
@@ -0,0 +1,388 @@
+"""
+Write-behind buffer that coalesces single writes into bulk_write calls.
+
+Fuel transactions arrive one at a time; sending each as its own insert_one or
+update_one costs a full round trip. A WriteBuffer collects those writes and
+flushes them through MongoDB.bulk_write (unordered) once `max_batch` writes are
+pending or the oldest pending write has waited `max_latency_ms`.
+
+Ordering guarantee: writes are applied in submission order whenever they may
+touch the same document. Inserts and updates filtered on exactly {"_id": value}
+share a batch only while their _ids differ; a batch is cut as soon as a second
+write for an _id already in it arrives. Any other update filter (extra
+conditions, operators, no _id) could match a pending insert, so such an update
+is written in a batch of its own. Batches are executed one after another by a
+single flusher thread.
+
+A buffered update resolves to whether its filter matched a document. Bulk
+results only report the batch's total matched count, so when some but not all
+_id updates in a batch matched, the flusher looks their _ids up afterwards (one
+$in query; a $set cannot change _id) and checks the hits against that count.
+An update in a batch of its own reads its match straight from the count.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Set, Tuple
+
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError, WriteError
+
+if TYPE_CHECKING:
+    from entity.mongo_core import MongoDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_LATENCY_MS = 20.0
+
+_buffers: "weakref.WeakSet[WriteBuffer]" = weakref.WeakSet()
+
+
+class _PendingWrite:
+    __slots__ = ("op", "key", "result", "update", "future")
+
+    def __init__(self, op: Any, key: Any, result: Any, update: Optional[Tuple[Dict[str, Any], bool]] = None) -> None:
+        self.op = op
+        self.key = key
+        self.result = result
+        # (filter, upsert) for updates, whose result is resolved from the bulk result
+        self.update = update
+        self.future: Future = Future()
+
+
+class WriteBuffer:
+    """
+    Coalesce insert/update_one calls on one MongoDB handle into bulk writes.
+
+    Example:
+        >>> buffer = db.enable_write_buffer(max_batch=500, max_latency_ms=20)
+        >>> future = buffer.insert({"vehicle_id": vid, "amount": 500})
+        >>> future.result()          # inserted id, once the batch is written
+        >>> db.insert({...})         # same, but blocks until acknowledged
+        >>> buffer.close()           # flush pending writes and stop
+    """
+
+    def __init__(
+            self,
+            db: "MongoDB",
+            max_batch: int = DEFAULT_MAX_BATCH,
+            max_latency_ms: float = DEFAULT_MAX_LATENCY_MS
+    ) -> None:
+        """
+        Args:
+            db (MongoDB): Handle whose bulk_write executes the batches.
+            max_batch (int): Flush when this many writes are pending.
+            max_latency_ms (float): Flush when the oldest pending write is this old.
+        """
+        self._db = db
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000.0
+        self._cond = threading.Condition()
+        self._pending: List[_PendingWrite] = []
+        self._pending_keys: Set[Any] = set()
+        self._pending_since = 0.0
+        self._sealed: Deque[List[_PendingWrite]] = deque()
+        self._in_flight = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = dict.fromkeys(("writes", "batches", "failed_writes", "failed_batches"), 0)
+        _buffers.add(self)
+
+    # ========== SUBMISSION ==========
+
+    def insert(self, data: Dict[str, Any]) -> Future:
+        """
+        Queue an insert. An _id is assigned client-side if missing.
+
+        Args:
+            data (Dict[str, Any]): Document to insert.
+
+        Returns:
+            Future: Resolves to the inserted id as a string.
+        """
+        _id = data.setdefault("_id", ObjectId())
+        return self._submit(InsertOne(data), _id_key(_id), str(_id))
+
+    def update_one(self, filter: Dict[str, Any], update_data: Dict[str, Any], upsert: bool = False) -> Future:
+        """
+        Queue a $set update of one document.
+
+        Args:
+            filter (Dict[str, Any]): Query filter.
+            update_data (Dict[str, Any]): Fields to set.
+            upsert (bool): Create document if it doesn't exist.
+
+        Returns:
+            Future: Resolves to True if a document matched the filter (or was
+                upserted), False otherwise. Unlike a direct update_one this is
+                "matched", not "modified": bulk results carry no per-operation
+                modified count.
+        """
+        # None: the filter may match any document, so the update is written alone
+        key = _id_key(filter["_id"]) if _is_id_filter(filter) else None
+        return self._submit(UpdateOne(filter, {"$set": update_data}, upsert=upsert), key, None, (filter, upsert))
+
+    def _submit(
+            self,
+            op: Any,
+            key: Any,
+            result: Any,
+            update: Optional[Tuple[Dict[str, Any], bool]] = None
+    ) -> Future:
+        write = _PendingWrite(op, key, result, update)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBuffer is closed")
+            if key is None or key in self._pending_keys:
+                self._seal()
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(write)
+            self._pending_keys.add(key)
+            if key is None or len(self._pending) >= self.max_batch:
+                self._seal()
+            self._ensure_thread()
+            self._cond.notify_all()
+        return write.future
+
+    # ========== FLUSHING ==========
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send every pending write now and wait until all batches are written.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the buffer drained within the timeout.
+        """
+        with self._cond:
+            self._seal()
+            self._ensure_thread()
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._sealed and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending writes and stop the flusher thread. Further writes are rejected.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait for the flush.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush(timeout)
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        _buffers.discard(self)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters for submitted writes and executed batches.
+
+        Returns:
+            Dict[str, int]: writes, batches, failed_writes, failed_batches, pending.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending) + sum(len(batch) for batch in self._sealed)
+        return stats
+
+    def _seal(self) -> None:
+        """
+        Move the pending writes into a batch ready to execute; caller holds the lock.
+        """
+        if self._pending:
+            self._sealed.append(self._pending)
+            self._pending = []
+            self._pending_keys = set()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mongo-write-buffer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._sealed:
+                    if self._pending:
+                        wait = self._pending_since + self.max_latency - time.monotonic()
+                        if wait <= 0 or self._closed:
+                            self._seal()
+                            break
+                        self._cond.wait(wait)
+                    elif self._closed:
+                        return
+                    else:
+                        self._cond.wait()
+                batch = self._sealed.popleft()
+                self._in_flight += 1
+            try:
+                self._execute(batch)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _execute(self, batch: List[_PendingWrite]) -> None:
+        """
+        Write one batch and resolve its futures.
+        """
+        errors: Dict[int, Dict[str, Any]] = {}
+        try:
+            stats = self._db.bulk_write([write.op for write in batch], ordered=False)
+            matched, upserted = stats["matched"], stats["upserted"]
+        except BulkWriteError as e:
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+            concern_errors = e.details.get("writeConcernErrors", [])
+            if not errors or concern_errors:
+                # Writes without their own error were applied but not to the
+                # requested write concern, so none of them succeeded either
+                self._fail(batch, e, errors, concern_errors)
+                return
+            matched, upserted = e.details.get("nMatched", 0), e.details.get("nUpserted", 0)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        try:
+            results = self._update_results(batch, errors, matched, upserted)
+        except Exception as e:
+            logger.error(f"Could not resolve matched updates of a buffered batch: {e}")
+            results = {}
+        with self._cond:
+            self._stats["writes"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["failed_writes"] += len(errors)
+        for index, write in enumerate(batch):
+            err = errors.get(index)
+            if err is not None:
+                write.future.set_exception(_write_error(err))
+            elif index in results:
+                write.future.set_result(results[index])
+            elif write.update is not None:
+                write.future.set_exception(RuntimeError("Buffered update was written but its match is unknown"))
+            else:
+                write.future.set_result(write.result)
+
+    def _update_results(
+            self,
+            batch: List[_PendingWrite],
+            errors: Dict[int, Dict[str, Any]],
+            matched: int,
+            upserted: int
+    ) -> Dict[int, bool]:
+        """
+        Whether each successful update in a batch matched a document.
+
+        Upserts always count as matched. For the others only the batch total is
+        known; when it is neither all nor none of them (so they are all
+        {"_id": value} updates, see _submit), their _ids are looked up in one
+        query, which must account for exactly the matched total.
+
+        Returns:
+            Dict[int, bool]: Batch index -> matched, for every successful update.
+        """
+        updates = [(index, write.update) for index, write in enumerate(batch)
+                   if write.update is not None and index not in errors]
+        results = {index: True for index, (_, upsert) in updates if upsert}
+        plain = [(index, filter) for index, (filter, upsert) in updates if not upsert]
+        # Upserts that matched an existing document are in the matched total too
+        remaining = matched - (len(results) - upserted)
+        if remaining >= len(plain) or remaining <= 0:
+            results.update((index, remaining > 0) for index, _ in plain)
+            return results
+
+        ids = [filter["_id"] for _, filter in plain]
+        found = {_id_key(doc["_id"]) for doc in self._db.collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+        hits = {index: _id_key(filter["_id"]) in found for index, filter in plain}
+        if sum(hits.values()) != remaining:
+            # Another client inserted or deleted one of these documents meanwhile
+            raise ValueError(f"{sum(hits.values())} of the updated _ids exist but {remaining} matched")
+        results.update(hits)
+        return results
+
+    def _fail(
+            self,
+            batch: List[_PendingWrite],
+            error: Exception,
+            errors: Optional[Dict[int, Dict[str, Any]]] = None,
+            concern_errors: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Fail every write in a batch: with its own write error if it has one,
+        else with the write concern error, else with `error`.
+        """
+        logger.error(f"Buffered bulk write of {len(batch)} operations failed: {error}")
+        errors = errors or {}
+        with self._cond:
+            self._stats["writes"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["failed_batches"] += 1
+            self._stats["failed_writes"] += len(batch)
+        for index, write in enumerate(batch):
+            err = errors.get(index)
+            if err is not None:
+                write.future.set_exception(_write_error(err))
+            elif concern_errors:
+                concern = concern_errors[-1]
+                write.future.set_exception(
+                    WriteConcernError(concern.get("errmsg", "write concern failed"), concern.get("code"), concern)
+                )
+            else:
+                write.future.set_exception(error)
+
+
+def _is_id_filter(filter: Dict[str, Any]) -> bool:
+    """
+    Whether the filter is exactly {"_id": value}, with no conditions or operators.
+    """
+    if set(filter) != {"_id"}:
+        return False
+    value = filter["_id"]
+    return not (isinstance(value, dict) and any(str(k).startswith("$") for k in value))
+
+
+def _id_key(_id: Any) -> Any:
+    """
+    Hashable stand-in for an _id (embedded-document _ids are not hashable).
+    """
+    try:
+        hash(_id)
+        return _id
+    except TypeError:
+        return bson.encode({"_id": _id})
+
+
+def _write_error(err: Dict[str, Any]) -> WriteError:
+    """
+    Exception for one writeErrors entry of a bulk write result.
+    """
+    error_cls = DuplicateKeyError if err.get("code") == 11000 else WriteError
+    return error_cls(err.get("errmsg", "write failed"), err.get("code"), err)
+
+
+def close_all_write_buffers(timeout: Optional[float] = None) -> None:
+    """
+    Flush and close every live WriteBuffer in this process (used at shutdown).
+
+    Args:
+        timeout (Optional[float]): Maximum seconds to wait per buffer.
+    """
+    for buffer in list(_buffers):
+        try:
+            buffer.close(timeout)
+        except Exception as e:
+            logger.error(f"Error flushing write buffer: {e}")
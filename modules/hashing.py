@@ -0,0 +1,175 @@
+"""
+Password hashing off the event loop.
+
+pbkdf2_sha256 costs tens of milliseconds of CPU per call. Run inline in an
+async handler it stalls every other request on the worker, so hashing and
+verification run on a bounded thread pool instead (hashlib's pbkdf2 releases
+the GIL, so threads hash in parallel).
+
+At most PASSWORD_HASH_MAX_PENDING calls may be queued or running. Beyond that
+new calls fail fast with HashingOverloaded (503 + Retry-After) rather than
+queueing without bound.
+
+The cost is PASSWORD_HASH_ROUNDS. Stored hashes with a different cost are
+reported by verify_and_update() so login can re-hash them.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from passlib.hash import pbkdf2_sha256
+
+from entity.mongo_core import MongoDB
+from modules.logger import get_logger
+
+load_dotenv()
+logger = get_logger("HASHING")
+
+HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", str(pbkdf2_sha256.default_rounds)))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or HASH_WORKERS * 8
+RETRY_AFTER_SECONDS = 1
+
+_hasher = pbkdf2_sha256.using(rounds=HASH_ROUNDS)
+
+
+class HashingOverloaded(HTTPException):
+    """Raised when the hashing pool is saturated; served as 503 with Retry-After."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry shortly.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+
+class HashPool:
+    """Bounded thread pool running password hash/verify calls."""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = dict.fromkeys(("completed", "rejected", "rehashed"), 0)
+        self._observers: List[Callable[[float], None]] = []
+
+    def add_observer(self, observer: Callable[[float], None]) -> None:
+        """
+        Call `observer(ms)` after every completed call with its time including
+        queueing. Runs in the awaiting coroutine's context and must be cheap.
+        """
+        if observer not in self._observers:
+            self._observers = self._observers + [observer]
+
+    def remove_observer(self, observer: Callable[[float], None]) -> None:
+        self._observers = [o for o in self._observers if o is not observer]
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on the pool, or raise HashingOverloaded if the queue is full."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                logger.warning("Hashing pool saturated (%s pending), shedding request", self._pending)
+                raise HashingOverloaded()
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+            executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # Released when the call finishes, not when the caller stops waiting: a
+        # cancelled request's hash keeps its worker busy until it is done
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            for observer in self._observers:
+                try:
+                    observer((time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    logger.debug("Hashing observer %r failed: %s", observer, e)
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._stats["completed"] += 1
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Pool counters: pending, max_pending, workers, rounds, completed, rejected, rehashed."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "workers": self.workers,
+                "rounds": HASH_ROUNDS,
+                **self._stats,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads (waits for running calls)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+hash_pool = HashPool()
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if a stored hash was made with a different cost than HASH_ROUNDS."""
+    try:
+        return pbkdf2_sha256.from_string(hashed_password).rounds != HASH_ROUNDS
+    except Exception:
+        return False
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured cost, off the event loop."""
+    return await hash_pool.run(_hasher.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    """Verify a password against a stored hash, off the event loop."""
+    if not hashed_password:
+        return False
+    return await hash_pool.run(MongoDB.verify_hash, password, hashed_password)
+
+
+async def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if the stored hash uses an outdated cost, compute a
+    replacement.
+
+    Returns:
+        Tuple[bool, Optional[str]]: (verified, new hash to store or None).
+    """
+    if not await verify_password(password, hashed_password):
+        return False, None
+    if not needs_rehash(hashed_password):
+        return True, None
+    try:
+        new_hash = await hash_password(password)
+    except HashingOverloaded:
+        # The login itself succeeded; re-hash on a later, quieter login
+        return True, None
+    hash_pool.count("rehashed")
+    return True, new_hash
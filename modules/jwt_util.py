@@ -1,4 +1,6 @@
+import hashlib
 import os
+import time
 from datetime import datetime, UTC, timedelta
 
 import jwt
@@ -6,11 +8,40 @@ from dotenv import load_dotenv
 from fastapi import HTTPException, Header, Request
 from entity import user_db
 from modules.logger import get_logger
+from modules.timing import timed
+from modules.ttl_cache import TTLCache
 
 load_dotenv()
 logger = get_logger("SERVER_UTILS")
 SECRET = os.getenv("JWT_SECRET", "superse345cret67")
 
+# Authenticated principals, keyed by (user id, jwt_token_string). Only the
+# non-secret fields auth and GET /me need are kept (never the password hash).
+# Entries are dropped by invalidate_principal() when this worker changes the
+# user; PRINCIPAL_CACHE_TTL_SECONDS bounds how stale they can get when another
+# worker does. 0 disables the cache.
+PRINCIPAL_FIELDS = ("id", "full_name", "email", "is_active", "jwt_token_string", "created_at", "updated_at")
+principal_cache = TTLCache(
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30")),
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")),
+    name="principal",
+)
+
+# Verified token payloads, keyed by the token's SHA-256, so the HMAC check and
+# JSON parse only run on a token's first use. Entries never outlive the
+# token's `exp`. Tokens are immutable, so the only staleness is a rotated
+# JWT_SECRET, which needs a restart anyway. 0 disables the cache.
+token_cache = TTLCache(
+    ttl=float(os.getenv("JWT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000")),
+    name="jwt",
+)
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Drop every cached principal of a user (call after changing or deleting it)."""
+    principal_cache.invalidate_tag(str(user_id))
+
 
 # Utility functions for JWT token creation and validation
 def create_jwt_token(user: dict) -> str:
@@ -26,10 +57,17 @@ def create_jwt_token(user: dict) -> str:
 
 
 def decode_jwt_token(token: str) -> dict:
-    """Decode a JWT token and return the payload."""
+    """Decode a JWT token and return the payload (cached per token until it expires)."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    # The cache TTL runs on the monotonic clock; exp is wall-clock, so check it too
+    if payload is not None and payload.get("exp", float("inf")) > time.time():
+        return dict(payload)
     try:
         payload = jwt.decode(token, SECRET, algorithms=["HS256"])
-        return payload
+        remaining = payload["exp"] - time.time() if "exp" in payload else None
+        token_cache.set(key, payload, ttl=remaining)
+        return dict(payload)
     except jwt.ExpiredSignatureError:
         logger.error("JWT token has expired.")
         raise HTTPException(status_code=401, detail="Token has expired.")
@@ -38,18 +76,31 @@ def decode_jwt_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token.")
 
 
-def get_user_from_token(token: str) -> dict:
+async def get_user_from_token(token: str) -> dict:
     """Extract user info from JWT token and ensure token is still valid (not superseded)."""
-    payload = decode_jwt_token(token)
-    user = user_db.get_by_id(id=payload["id"])
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid token.")
-    elif not user.get("is_active"):
-        raise HTTPException(status_code=401, detail="User account not active.")
-    # Check if the jwt_token_string in the token matches the one in the database
-    if user.get("jwt_token_string") != payload.get("jwt_token_string"):
-        raise HTTPException(status_code=401, detail="Token has been invalidated. Please login again.")
-    return user
+    with timed("jwt"):
+        payload = decode_jwt_token(token)
+    # Principal lookup: cache hit, or get_by_id on a miss
+    with timed("auth"):
+        key = (payload["id"], payload.get("jwt_token_string"))
+        principal = principal_cache.get(key)
+        if principal is not None:
+            logger.info("Authenticated user %s (cached)", payload["id"], extra={"sample_key": "auth"})
+            return dict(principal)
+        generation = principal_cache.generation()
+        user = await user_db.get_by_id(payload["id"])
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token.")
+        elif not user.get("is_active"):
+            raise HTTPException(status_code=401, detail="User account not active.")
+        # Check if the jwt_token_string in the token matches the one in the database
+        if user.get("jwt_token_string") != payload.get("jwt_token_string"):
+            raise HTTPException(status_code=401, detail="Token has been invalidated. Please login again.")
+        principal = {field: user.get(field) for field in PRINCIPAL_FIELDS}
+        # Skipped if the user was invalidated while get_by_id was in flight
+        principal_cache.set(key, principal, tag=str(payload["id"]), if_generation=generation)
+        logger.info("Authenticated user %s", payload["id"], extra={"sample_key": "auth"})
+        return dict(principal)
 
 
 def get_token_from_header(authorization: str = Header(...)) -> str:
@@ -60,10 +111,10 @@ def get_token_from_header(authorization: str = Header(...)) -> str:
 
 
 # FastAPI dependency to require and validate JWT token
-def require_token(authorization: str = Header(None, description="JWT token in 'Authorization' header")) -> dict:
+async def require_token(authorization: str = Header(None, description="JWT token in 'Authorization' header")) -> dict:
     """FastAPI dependency to require and validate JWT token from Authorization header."""
     if not authorization or not authorization.startswith("Bearer "):
         logger.error("Authorization header with Bearer token required")
         raise HTTPException(status_code=401, detail="Authorization header with Bearer token required")
     token = authorization.split(" ", 1)[1]
-    return get_user_from_token(token)
+    return await get_user_from_token(token)
@@ -0,0 +1,138 @@
+"""
+Request draining and startup timing for the application lifespan.
+
+TrackInFlight is a plain ASGI middleware (so streamed bodies count until
+their last chunk is sent) that counts running HTTP requests in `in_flight`.
+At shutdown the lifespan calls in_flight.drain() before closing database
+clients, so no request loses its connection half-way through.
+
+RequestContext gives every HTTP request an id (the caller's X-Request-ID if it
+looks sane, else a new one) and publishes it with the ASGI scope through
+modules.logger.request_context, so log records carry request_id and route.
+"""
+import asyncio
+import re
+import time
+import uuid
+from typing import Dict, Optional
+
+from modules.logger import get_logger, request_context
+
+logger = get_logger("LIFECYCLE")
+
+
+class InFlightRequests:
+    """Counter of running HTTP requests that shutdown can wait on."""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def _idle_event(self) -> asyncio.Event:
+        # Created lazily so it binds to the server's event loop
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            if self.active == 0:
+                self._idle.set()
+        return self._idle
+
+    def started(self) -> None:
+        self.active += 1
+        self._idle_event().clear()
+
+    def finished(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            self._idle_event().set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Wait until no request is running.
+
+        Args:
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            bool: True if drained, False if requests were still running at the timeout.
+        """
+        if self.active == 0:
+            return True
+        logger.info(f"Waiting for {self.active} in-flight request(s)")
+        try:
+            await asyncio.wait_for(self._idle_event().wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.active} request(s) still running after {timeout}s, shutting down anyway")
+            return False
+
+
+in_flight = InFlightRequests()
+
+
+class TrackInFlight:
+    """ASGI middleware registering every HTTP request with an InFlightRequests counter."""
+
+    def __init__(self, app, tracker: InFlightRequests = in_flight) -> None:
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.finished()
+
+
+class RequestContext:
+    """ASGI middleware binding a request id and the route to log records."""
+
+    HEADER = b"x-request-id"
+    VALID_ID = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not self.VALID_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_context.set({"request_id": request_id, "scope": scope})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_context.reset(token)
+
+
+class StartupTimer:
+    """Records named startup phases and the total since the process began importing the app."""
+
+    def __init__(self, started: float) -> None:
+        """
+        Args:
+            started (float): time.perf_counter() taken before the app's imports.
+        """
+        self.started = started
+        self.phases: Dict[str, float] = {}
+        self._mark = started
+
+    def phase(self, name: str) -> None:
+        """Close the current phase under `name` (milliseconds since the previous mark)."""
+        now = time.perf_counter()
+        self.phases[name] = (now - self._mark) * 1000
+        self._mark = now
+
+    def report(self) -> Dict[str, float]:
+        """Phase durations plus "total_ms", in milliseconds."""
+        report = {f"{name}_ms": round(ms, 2) for name, ms in self.phases.items()}
+        report["total_ms"] = round((self._mark - self.started) * 1000, 2)
+        return report
@@ -1,5 +1,43 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
 import colorlog
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Level for every logger from get_logger(); records below it are discarded
+# before their message is formatted
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# With LOG_ASYNC on, request threads only enqueue records; formatting and the
+# write to stderr happen on one background listener thread
+LOG_ASYNC = os.getenv("LOG_ASYNC", "True").lower() in ("true", "1", "t")
+# "color" for human-readable lines, "json" for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "color").lower()
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        key, _, rate = part.partition("=")
+        if key.strip():
+            rates[key.strip()] = float(rate or 1)
+    return rates
+
+
+# Fraction of records kept per sample key: DEBUG records use "debug", others
+# opt in with extra={"sample_key": ...} (e.g. "auth" for successful auth checks)
+LOG_SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", "debug=1.0,auth=0.01"))
+
+# Set per request by modules.lifecycle.RequestContext: {"request_id": ..., "scope": ...}
+request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
 
 
 class CustomColoredFormatter(colorlog.ColoredFormatter):
@@ -12,25 +50,153 @@ class CustomColoredFormatter(colorlog.ColoredFormatter):
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with a fixed set of fields."""
+
+    FIELDS = ("route", "collection", "duration_ms", "request_id")
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the request id and route onto the record while still in the request's thread."""
+
+    def filter(self, record):
+        context = request_context.get()
+        if context is None:
+            record.request_id = record.route = None
+            return True
+        record.request_id = context.get("request_id")
+        scope = context.get("scope") or {}
+        # The matched route template once routing has happened, else the raw path
+        route = scope.get("route")
+        record.route = getattr(route, "path", None) or scope.get("path")
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps an evenly spread fraction of high-volume records per sample key and
+    counts the rest.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+
+    def filter(self, record):
+        key = getattr(record, "sample_key", None) or ("debug" if record.levelno <= logging.DEBUG else None)
+        rate = self.rates.get(key) if key is not None else None
+        if rate is None or rate >= 1:
+            return True
+        with self._lock:
+            seen = self._seen[key] = self._seen.get(key, 0) + 1
+            # Keep record n when floor(n * rate) advances: exactly `rate` of them, evenly spaced
+            keep = int(seen * rate) != int((seen - 1) * rate)
+            if not keep:
+                self._dropped[key] = self._dropped.get(key, 0) + 1
+        return keep
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per sample key: rate, records seen and records dropped."""
+        with self._lock:
+            return {
+                key: {"rate": rate, "seen": self._seen.get(key, 0), "dropped": self._dropped.get(key, 0)}
+                for key, rate in self.rates.items()
+            }
+
+
+sampling_filter = SamplingFilter(LOG_SAMPLE_RATES)
+
+
+def _stream_handler() -> logging.Handler:
+    handler = colorlog.StreamHandler()
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+        return handler
+    formatter = CustomColoredFormatter(
+        "[%(asctime)s] %(log_color)s[%(name)s]%(levelname_pad)s %(message)s%(reset)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        log_colors={
+            "DEBUG": "cyan",
+            "INFO": "green",
+            "WARNING": "yellow",
+            "ERROR": "purple",
+            "CRITICAL": "red",
+        },
+        style="%",
+    )
+    handler.setFormatter(formatter)
+    return handler
+
+
+_handler = None
+_listener = None
+_lock = threading.Lock()
+
+
+def _get_handler() -> logging.Handler:
+    """The handler shared by every get_logger() logger, created on first use."""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            if LOG_ASYNC:
+                log_queue = queue.SimpleQueue()
+                _listener = logging.handlers.QueueListener(log_queue, _stream_handler(), respect_handler_level=True)
+                _listener.start()
+                _handler = logging.handlers.QueueHandler(log_queue)
+                atexit.register(stop_logging)
+            else:
+                _handler = _stream_handler()
+            # Run in the caller's thread: drop sampled-out records before they
+            # are queued and capture the request context while it is current
+            _handler.addFilter(sampling_filter)
+            _handler.addFilter(ContextFilter())
+        return _handler
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread (safe to call twice)."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork(); give the child its own
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        # Fresh queue, so records the parent had not written yet are not written twice
+        _handler.queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
 def get_logger(name):
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = colorlog.StreamHandler()
-        formatter = CustomColoredFormatter(
-            "[%(asctime)s] %(log_color)s[%(name)s]%(levelname_pad)s %(message)s%(reset)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            log_colors={
-                "DEBUG": "cyan",
-                "INFO": "green",
-                "WARNING": "yellow",
-                "ERROR": "purple",
-                "CRITICAL": "red",
-            },
-            style="%",
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.DEBUG)
+        logger.addHandler(_get_handler())
+        logger.setLevel(LOG_LEVEL)
         logger.propagate = False
     return logger
 
@@ -42,4 +208,4 @@ def configure_uvicorn_filter():
         def filter(self, record: logging.LogRecord) -> bool:
             return record.args and len(record.args) >= 3 and record.args[2] not in ["/ping", "/health"]
 
-    logging.getLogger("uvicorn.access").addFilter(HealthCheckFilter())
\ No newline at end of file
+    logging.getLogger("uvicorn.access").addFilter(HealthCheckFilter())
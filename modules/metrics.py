@@ -0,0 +1,323 @@
+"""
+Prometheus-compatible metrics without a client library.
+
+Collected:
+    http_requests_total, http_request_duration_seconds
+        per route template and method, from the RouteMetrics ASGI middleware
+    mongo_command_duration_seconds, mongo_command_failures_total
+        per command name, from a pymongo CommandListener
+    mongo_pool_checkout_wait_seconds, mongo_pool_checkout_failures_total,
+    mongo_pool_connections, mongo_pool_checked_out, mongo_pool_max_size, mongo_pool_cleared_total
+        per server address, from a pymongo ConnectionPoolListener
+    mongo_operation_duration_seconds, mongo_operation_errors_total
+        per namespace and wrapper method, read from entity.instrumentation.operation_stats
+    password_hash_*, cache_*, log_records_dropped_total, http_requests_in_flight
+        read from the hashing pool, the principal/JWT caches, the log sampler and
+        the in-flight counter when /metrics is scraped
+
+Recording is a bisect and a few additions under a lock; all formatting happens
+at scrape time. The pymongo listeners are registered globally, so
+install_mongo_listeners() must run before the first client is created (entity
+handles connect on first use, so importing app.py is early enough).
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import common, monitoring
+
+from entity.instrumentation import LATENCY_BUCKETS_MS, operation_stats
+from modules.hashing import hash_pool
+from modules.jwt_util import principal_cache, token_cache
+from modules.lifecycle import in_flight
+from modules.logger import sampling_filter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Same bounds as operation_stats, in seconds
+LATENCY_BUCKETS = tuple(ms / 1000 for ms in LATENCY_BUCKETS_MS)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in series:
+            lines += histogram_lines(self.name, self.labelnames, labels,
+                                     zip(self.buckets + (float("inf"),), counts), total)
+        return lines
+
+
+def histogram_lines(name: str, labelnames: Tuple[str, ...], labels: Tuple,
+                    buckets: Iterable[Tuple[float, int]], total: float, cumulative: bool = False) -> List[str]:
+    """
+    Exposition lines for one histogram series.
+
+    Args:
+        buckets (Iterable[Tuple[float, int]]): (upper bound, count) pairs, +Inf last.
+        total (float): Sum of observed values.
+        cumulative (bool): Whether the counts are already cumulative.
+    """
+    lines, running = [], 0
+    for bound, count in buckets:
+        running = count if cumulative else running + count
+        le = "+Inf" if bound == float("inf") else repr(float(bound))
+        le_label = f'le="{le}"'
+        lines.append(f"{name}_bucket{_labels(labelnames, labels, le_label)} {running}")
+    lines.append(f"{name}_sum{_labels(labelnames, labels)} {total}")
+    lines.append(f"{name}_count{_labels(labelnames, labels)} {running}")
+    return lines
+
+
+# ========== HTTP ==========
+
+http_requests = Counter("http_requests_total", "HTTP requests by route, method and status.",
+                        ("method", "route", "status"))
+http_duration = Histogram("http_request_duration_seconds", "HTTP request latency until the last body chunk.",
+                          ("method", "route"))
+
+
+class RouteMetrics:
+    """ASGI middleware timing every HTTP request by its matched route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_duration.observe(time.perf_counter() - start, scope["method"], route)
+            http_requests.inc(scope["method"], route, status[0])
+
+
+# ========== MONGO ==========
+
+class MongoMetrics(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """pymongo listener recording command latency and connection pool activity."""
+
+    def __init__(self) -> None:
+        self.command_duration = Histogram("mongo_command_duration_seconds",
+                                          "MongoDB command round-trip time.", ("command",))
+        self.command_failures = Counter("mongo_command_failures_total", "Failed MongoDB commands.", ("command",))
+        self.checkout_wait = Histogram("mongo_pool_checkout_wait_seconds",
+                                       "Time spent waiting to check a connection out of the pool.", ("address",))
+        self.checkout_failures = Counter("mongo_pool_checkout_failures_total",
+                                         "Connection checkouts that failed.", ("address", "reason"))
+        self.connections = Gauge("mongo_pool_connections", "Open pooled connections.", ("address",))
+        self.checked_out = Gauge("mongo_pool_checked_out", "Connections currently checked out.", ("address",))
+        self.max_size = Gauge("mongo_pool_max_size", "Configured maxPoolSize.", ("address",))
+        self.cleared = Counter("mongo_pool_cleared_total", "Times the pool was cleared (e.g. after errors).",
+                               ("address",))
+        self._installed = False
+
+    def install(self) -> None:
+        """Register with pymongo; applies to every client created afterwards."""
+        if not self._installed:
+            monitoring.register(self)
+            self._installed = True
+
+    @staticmethod
+    def _address(address) -> str:
+        return f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+
+    # CommandListener
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self.command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event) -> None:
+        self.command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        self.command_failures.inc(event.command_name)
+
+    # ConnectionPoolListener
+    def pool_created(self, event) -> None:
+        # event.options only lists non-default options
+        self.max_size.set(self._address(event.address), value=event.options.get("maxPoolSize", common.MAX_POOL_SIZE))
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self.cleared.inc(self._address(event.address))
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self.connections.inc(self._address(event.address))
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self.connections.inc(self._address(event.address), amount=-1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        address = self._address(event.address)
+        self.checkout_failures.inc(address, event.reason)
+        if event.duration is not None:
+            self.checkout_wait.observe(event.duration, address)
+
+    def connection_checked_out(self, event) -> None:
+        address = self._address(event.address)
+        self.checked_out.inc(address)
+        if event.duration is not None:
+            self.checkout_wait.observe(event.duration, address)
+
+    def connection_checked_in(self, event) -> None:
+        self.checked_out.inc(self._address(event.address), amount=-1)
+
+    def render(self) -> List[str]:
+        lines = []
+        for metric in (self.command_duration, self.command_failures, self.checkout_wait, self.checkout_failures,
+                       self.connections, self.checked_out, self.max_size, self.cleared):
+            lines += metric.render()
+        return lines
+
+
+mongo_metrics = MongoMetrics()
+
+
+def install_mongo_listeners() -> None:
+    """Start collecting pymongo command and pool metrics (call before clients connect)."""
+    mongo_metrics.install()
+
+
+# ========== EXPOSITION ==========
+
+def _operation_lines() -> List[str]:
+    name, labelnames = "mongo_operation_duration_seconds", ("namespace", "method")
+    lines = [f"# HELP {name} Wrapper-level MongoDB operation latency (entity.instrumentation).",
+             f"# TYPE {name} histogram"]
+    errors = ["# HELP mongo_operation_errors_total Wrapper-level MongoDB operations that raised.",
+              "# TYPE mongo_operation_errors_total counter"]
+    for namespace, methods in operation_stats.snapshot().items():
+        for method, stats in methods.items():
+            buckets = [(float("inf") if bound == "+Inf" else float(bound) / 1000, count)
+                       for bound, count in stats["buckets"].items()]
+            lines += histogram_lines(name, labelnames, (namespace, method), buckets,
+                                     stats["sum_ms"] / 1000, cumulative=True)
+            errors.append(f"mongo_operation_errors_total{_labels(labelnames, (namespace, method))} {stats['errors']}")
+    return lines + errors
+
+
+def _gauge_lines(name: str, help: str, kind: str, samples: Iterable[Tuple[str, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{labels} {value}" for labels, value in samples]
+    return lines
+
+
+def _runtime_lines() -> List[str]:
+    hashing = hash_pool.stats()
+    caches = [cache.stats() for cache in (principal_cache, token_cache)]
+    sampling = sampling_filter.stats()
+    lines = _gauge_lines("http_requests_in_flight", "HTTP requests currently running.", "gauge",
+                         [("", in_flight.active)])
+    lines += _gauge_lines("password_hash_pending", "Password hash/verify calls queued or running.", "gauge",
+                          [("", hashing["pending"])])
+    for key in ("completed", "rejected", "rehashed"):
+        lines += _gauge_lines(f"password_hash_{key}_total", f"Password hashing calls {key}.", "counter",
+                              [("", hashing[key])])
+    for key, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge")):
+        name = f"cache_{key}_total" if kind == "counter" else f"cache_{key}"
+        lines += _gauge_lines(name, f"In-process cache {key}.", kind,
+                              [(_labels(("cache",), (stats["name"],)), stats[key]) for stats in caches])
+    lines += _gauge_lines("log_records_dropped_total", "Log records dropped by sampling.", "counter",
+                          [(_labels(("key",), (key,)), stats["dropped"]) for key, stats in sampling.items()])
+    return lines
+
+
+def render_metrics() -> str:
+    """The full exposition text for /metrics."""
+    lines: List[str] = []
+    lines += http_requests.render()
+    lines += http_duration.render()
+    lines += mongo_metrics.render()
+    lines += _operation_lines()
+    lines += _runtime_lines()
+    return "\n".join(lines) + "\n"
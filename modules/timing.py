@@ -0,0 +1,210 @@
+"""
+Per-request phase timing, reported as a Server-Timing header.
+
+ServerTiming gives each HTTP request a timings dict in a contextvar. Code on
+the request path adds to it:
+
+    jwt       decode_jwt_token in require_token          (modules.jwt_util)
+    auth      principal lookup, cache or database        (modules.jwt_util)
+    db        every instrumented MongoDB wrapper call    (operation_stats observer)
+    hash      password hashing/verification incl. queue  (hash_pool observer)
+    validate  request parsing and pydantic validation    (TimedRoute, excludes jwt/auth)
+    render    response model validation and serialisation (TimedRoute)
+
+and the middleware adds them to the response as
+`Server-Timing: jwt;dur=0.05, auth;dur=1.92, db;dur=1.80;desc="1 call", ..., total;dur=2.71`
+together with `X-Request-ID`. Phases can overlap (auth includes its db call).
+Requests slower than SERVER_TIMING_LOG_MS are also logged with their breakdown,
+so p99 outliers can be traced without a profiler.
+
+The dict is shared by reference, so phases recorded in threadpool workers
+(which run in a copy of the request's context) land in the same request.
+Headers are sent at the start of the response, so time spent streaming a body
+afterwards is not included.
+"""
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from entity.instrumentation import OperationEvent, operation_stats
+from modules.hashing import hash_pool
+from modules.logger import get_logger
+
+logger = get_logger("TIMING")
+
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "True").lower() in ("true", "1", "t")
+SERVER_TIMING_LOG_MS = float(os.getenv("SERVER_TIMING_LOG_MS", "0"))
+
+# phase -> [total ms, calls]; None outside a request
+request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+# TimedRoute's marks for the route being handled
+_route_marks: ContextVar[Optional[Dict[str, float]]] = ContextVar("route_marks", default=None)
+
+
+def add_timing(phase: str, ms: float) -> None:
+    """Add `ms` to a phase of the current request (no-op outside a request)."""
+    timings = request_timings.get()
+    if timings is None:
+        return
+    entry = timings.get(phase)
+    if entry is None:
+        timings[phase] = [ms, 1]
+    else:
+        entry[0] += ms
+        entry[1] += 1
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Time the enclosed block as `phase`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(phase, (time.perf_counter() - start) * 1000)
+
+
+def _phase_ms(phase: str) -> float:
+    timings = request_timings.get()
+    entry = timings.get(phase) if timings is not None else None
+    return entry[0] if entry is not None else 0.0
+
+
+def _on_operation(event: OperationEvent) -> None:
+    add_timing("db", event.duration_ms)
+
+
+def _on_hash(ms: float) -> None:
+    add_timing("hash", ms)
+
+
+def install_timing_hooks() -> None:
+    """Feed MongoDB wrapper calls and password hashing into the request timings."""
+    operation_stats.add_observer(_on_operation)
+    hash_pool.add_observer(_on_hash)
+
+
+def server_timing(timings: Dict[str, List[float]], total_ms: float) -> str:
+    """Format timings as a Server-Timing header value."""
+    parts = []
+    for phase, (ms, calls) in timings.items():
+        part = f"{phase};dur={ms:.2f}"
+        if calls > 1:
+            part += f';desc="{calls} calls"'
+        parts.append(part)
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTiming:
+    """ASGI middleware collecting phase timings and adding Server-Timing and X-Request-ID."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings: Dict[str, List[float]] = {}
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                request_id = scope.get("state", {}).get("request_id")
+                if request_id:
+                    headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if SERVER_TIMING_HEADER:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    headers.append((b"server-timing", server_timing(timings, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            total_ms = (time.perf_counter() - start) * 1000
+            if SERVER_TIMING_LOG_MS and total_ms >= SERVER_TIMING_LOG_MS:
+                logger.warning(
+                    "Slow request %s %s %s took %.1f ms: %s",
+                    scope["method"], scope["path"], status[0], total_ms, server_timing(timings, total_ms),
+                    extra={"duration_ms": round(total_ms, 3)},
+                )
+
+
+def _endpoint_entered() -> None:
+    mark = _route_marks.get()
+    if mark is not None:
+        mark["endpoint"] = time.perf_counter()
+        # Dependencies such as require_token time themselves; keep only their share
+        mark["auth"] = _phase_ms("jwt") + _phase_ms("auth") - mark["auth"]
+
+
+def _endpoint_returned() -> None:
+    mark = _route_marks.get()
+    if mark is not None:
+        mark["returned"] = time.perf_counter()
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an endpoint so TimedRoute knows when it starts and returns."""
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            _endpoint_entered()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _endpoint_returned()
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            _endpoint_entered()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _endpoint_returned()
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that records "validate" (request parsing and pydantic validation,
+    before the endpoint runs, minus jwt/auth dependencies) and "render"
+    (response model validation and serialisation, after it returns).
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        # functools.wraps keeps the signature FastAPI inspects for parameters
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            if request_timings.get() is None:
+                return await handler(request)
+            start = time.perf_counter()
+            mark = {"auth": _phase_ms("jwt") + _phase_ms("auth")}
+            token = _route_marks.set(mark)
+            try:
+                return await handler(request)
+            finally:
+                _route_marks.reset(token)
+                end = time.perf_counter()
+                if "endpoint" in mark:
+                    add_timing("validate", max(0.0, (mark["endpoint"] - start) * 1000 - mark["auth"]))
+                if "returned" in mark:
+                    add_timing("render", (end - mark["returned"]) * 1000)
+
+        return timed_handler
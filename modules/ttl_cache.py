@@ -0,0 +1,143 @@
+"""
+Small thread-safe LRU + TTL cache for in-process lookups (principals, decoded tokens).
+
+Entries can carry a tag so every entry of, say, one user can be dropped at
+once. invalidate_tag() also bumps a generation counter: a caller that read
+generation() before a slow lookup can pass it to set() and the value is
+discarded if anything was invalidated in between, so a lookup racing with an
+invalidation cannot re-insert stale data.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, ttl: float, max_entries: int, name: str = "cache") -> None:
+        """
+        Args:
+            ttl (float): Default time-to-live in seconds. 0 disables the cache.
+            max_entries (int): Least recently used entries are evicted beyond this.
+            name (str): Label used in stats.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Optional[Hashable]]]" = OrderedDict()
+        self._by_tag: Dict[Hashable, Set[Hashable]] = {}
+        self._generation = 0
+        self._stats = dict.fromkeys(("hits", "misses", "evictions", "expirations", "invalidations"), 0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def generation(self) -> int:
+        """Counter bumped by every invalidation; pass it to set(if_generation=...)."""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if absent or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires, value, _ = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(
+            self,
+            key: Hashable,
+            value: Any,
+            ttl: Optional[float] = None,
+            tag: Optional[Hashable] = None,
+            if_generation: Optional[int] = None
+    ) -> bool:
+        """
+        Store a value.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value; stored as-is, so store immutable or copied data.
+            ttl (Optional[float]): Seconds to live; capped at the cache TTL.
+            tag (Optional[Hashable]): Group for invalidate_tag().
+            if_generation (Optional[int]): Only store if no invalidation happened
+                since this generation() value was read.
+
+        Returns:
+            bool: Whether the value was stored.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if not self.enabled or ttl <= 0:
+            return False
+        with self._lock:
+            if if_generation is not None and if_generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tag)
+            if tag is not None:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop one entry."""
+        with self._lock:
+            self._generation += 1
+            if key in self._entries:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """Drop every entry stored with this tag."""
+        with self._lock:
+            self._generation += 1
+            keys = self._by_tag.pop(tag, None)
+            for key in keys or ():
+                if key in self._entries:
+                    self._entries.pop(key)
+                    self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters: hits, misses, evictions, expirations, invalidations, entries, hit_rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["name"] = self.name
+        return stats
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove one entry; caller holds the lock."""
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
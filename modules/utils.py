@@ -1,6 +1,12 @@
 import re
 from datetime import datetime
-from rich import print
+
+
+# rich is slow to import; only load it when something actually prints
+def print(*args, **kwargs):
+    from rich import print as rich_print
+    return rich_print(*args, **kwargs)
+
 
 # Normalize vehicle registration number
 def normalise_registration_number(registration_number: str) -> str:
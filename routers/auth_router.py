@@ -2,11 +2,13 @@ from fastapi import APIRouter, status, Header, HTTPException, Body
 from fastapi.responses import JSONResponse
 
 from models import user_model
+from modules.hashing import hash_password, verify_and_update, verify_password
 from modules.jwt_util import *
 from modules.logger import get_logger
+from modules.timing import TimedRoute
 from modules.utils import *
 
-auth_router = APIRouter()
+auth_router = APIRouter(route_class=TimedRoute)
 logger = get_logger("AUTH_ROUTER")
 
 
@@ -30,13 +32,14 @@ async def register(user: user_model.CreateUserInput):
     """
     try:
         data = user.model_dump(exclude_unset=True)
-        data["password"] = user_db.hashit(user.password)
+        data["password"] = await hash_password(user.password)
         created_user = user_model.CreateUser(**data).model_dump()
-        doc, created = user_db.get_or_create({"email": user.email}, created_user)
-        print(doc)
+        doc, created = await user_db.get_or_create({"email": user.email}, created_user)
         if not created:
             raise HTTPException(status_code=400, detail="Email already registered")
         return JSONResponse({"msg": "success", "user": user_model.ReadUser(**doc).model_dump()})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -63,11 +66,15 @@ async def login(login_data: user_model.LoginUser):
     email = login_data.email
     password = login_data.password
 
-    user = user_db.get(filter={"email": email})
+    user = await user_db.get(filter={"email": email})
     if not user:
         raise HTTPException(status_code=400, detail="User Not Found")
-    if not user_db.verify_hash(password, user.get("password")):
+    verified, new_hash = await verify_and_update(password, user.get("password"))
+    if not verified:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash predates the configured cost; upgrade it while we have the password
+        await user_db.update_one({"_id": user["id"]}, {"password": new_hash})
 
     jwt_token = create_jwt_token(user=user)
     logger.debug("User logged in: %s", email)
@@ -96,11 +103,12 @@ async def change_password(data: user_model.ChangePassword):
         dict: Success message.
     """
 
-    user = user_db.get(filter={"email": data.email, "password": user_db.hashit(data.current_password)})
-    if not user or not user_db.verify_hash(data.password, user["password"]):
+    # Hashes are salted, so look the user up by email and verify the password separately
+    user = await user_db.get(filter={"email": data.email})
+    if not user or not await verify_password(data.current_password, user.get("password")):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    user_db.update_one({"email": data.email}, {"password": user_db.hashit(data.new_password)})
+    await user_db.update_one({"_id": user["id"]}, {"password": await hash_password(data.new_password)})
     logger.debug("Password reset for user: %s", data.email)
     return JSONResponse(
         {"msg": "success"},
@@ -130,9 +138,11 @@ async def regenerate_token(
         dict: New API key and JWT token.
     """
     # Use require_token to validate and get user
-    _user = require_token(authorization=f"Bearer {x_token}")
+    _user = await require_token(authorization=f"Bearer {x_token}")
     # Invalidate the old token (e.g., by updating a jwt_token_string)
-    user_db.update_one({"id": _user["id"]}, {"jwt_token_string": user_db.gen_string(length=5)})
+    _user["jwt_token_string"] = user_db.gen_string(length=5)
+    await user_db.update_one({"_id": _user["id"]}, {"jwt_token_string": _user["jwt_token_string"]})
+    invalidate_principal(_user["id"])
     # Generate new token with updated jwt_token_string
     new_jwt_token = create_jwt_token(_user)
     return JSONResponse(
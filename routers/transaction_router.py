@@ -1,9 +1,59 @@
+from typing import Literal
+
 from fastapi import APIRouter, Depends, status, Query, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse
 from fastapi.responses import StreamingResponse
 from fastapi_limiter.depends import RateLimiter
-
+from starlette.concurrency import run_in_threadpool
+from entity import ensure_transaction_indexes, transaction_db, vehicle_db
+from entity.bulk_export import BulkExporter
+from modules.jwt_util import require_token
 from modules.logger import get_logger
+from modules.timing import TimedRoute
+
+transaction_router = APIRouter(route_class=TimedRoute)
+logger = get_logger("TRANSACTION_ROUTER")
+
+
+# Export a vehicle's full transaction history
+@transaction_router.get(
+    "/{vehicle_id}/export",
+    summary="Export transactions",
+    description="Stream a vehicle's full transaction history as NDJSON or CSV, optionally gzip-compressed.",
+    response_description="Transaction export file",
+    response_class=StreamingResponse,
+)
+async def export_transactions(
+        vehicle_id: str,
+        fmt: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+        gzip: bool = Query(False, description="gzip-compress the output"),
+        user=Depends(require_token),
+):
+    """
+    Stream every transaction of a vehicle owned by the authenticated user.
+
+    Parameters:
+        vehicle_id (str): Vehicle whose transactions to export.
+        fmt (str): "ndjson" or "csv".
+        gzip (bool): gzip-compress the output.
+        user (dict): Injected by dependency.
+
+    Returns:
+        StreamingResponse: The export, produced in constant memory.
+    """
+    try:
+        # get_by_id converts the path string to an ObjectId (get() would match it as a string)
+        vehicle = await run_in_threadpool(vehicle_db.get_by_id, vehicle_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid vehicle id: {e}")
+    if not vehicle or vehicle.get("owner_id") != user["id"]:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
 
-transaction_router = APIRouter()
-logger = get_logger("TRANSACTION_ROUTER")
\ No newline at end of file
+    # Both may hit the server (client creation, listIndexes); keep them off the event loop
+    await ensure_transaction_indexes(vehicle_id)
+    exporter = BulkExporter(await run_in_threadpool(transaction_db, vehicle_id), fmt=fmt, gzip=gzip)
+    return StreamingResponse(
+        exporter.stream(sort=[("created_at", 1)]),
+        media_type=exporter.media_type,
+        headers=exporter.download_headers(f"transactions-{vehicle_id}"),
+    )
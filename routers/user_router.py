@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, status, Query, HTTPException
-from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, Response
 from fastapi.responses import StreamingResponse
 from fastapi_limiter.depends import RateLimiter
 from entity import user_db
+from entity.mongo_core import render_json
 from models import user_model
-from modules.jwt_util import require_token
+from modules.hashing import hash_password
+from modules.jwt_util import invalidate_principal, require_token
 from typing import Annotated, Union
 from modules.logger import get_logger
+from modules.timing import TimedRoute
 
-user_router = APIRouter()
+user_router = APIRouter(route_class=TimedRoute)
 logger = get_logger("USER_ROUTER")
 
+READ_USER_FIELDS = tuple(user_model.ReadUser.model_fields)
+
 # Get current customer info
 @user_router.get(
     "/me",
@@ -31,8 +36,10 @@ async def get_me(user=Depends(require_token)):
         CustomerOut: Customer info.
     """
     try:
-        user_data = user_model.ReadUser(**user)
-        return JSONResponse(user_data.model_dump())
+        # `user` is the principal require_token already loaded (and caches), so there is no
+        # second read to fetch with raw=True; the export endpoints are the raw BSON path.
+        # Serialise the allow-listed fields straight to bytes; skips building ReadUser
+        return Response(render_json(user, READ_USER_FIELDS), media_type="application/json")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"User not found: {e}")
 
@@ -62,9 +69,11 @@ async def update_me(
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     if "password" in update_data:
-        update_data["password"] = user_db.hashit(update_data["password"])
+        update_data["password"] = await hash_password(update_data["password"])
     try:
-        if user_db.update_one(filter={"id": user["id"]}, update=update_data):
+        updated = await user_db.update_one(filter={"_id": user["id"]}, update_data=update_data)
+        invalidate_principal(user["id"])
+        if updated:
             return {"msg": "Updated"}
         else:
             raise HTTPException(status_code=400, detail="User not found")
@@ -93,7 +102,9 @@ async def delete_me(_user=Depends(require_token)):
         dict: Success message.
     """
     try:
-        if user_db.delete_one(filter={"id": _user["id"]}):
+        deleted = await user_db.delete_one(filter={"_id": _user["id"]})
+        invalidate_principal(_user["id"])
+        if deleted:
             return JSONResponse({"msg": "Deleted"}, status_code=status.HTTP_200_OK)
         else:
             raise HTTPException(status_code=400, detail="User not found")
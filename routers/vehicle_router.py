@@ -1,9 +1,46 @@
+from typing import Literal
+
 from fastapi import APIRouter, Depends, status, Query, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse
 from fastapi.responses import StreamingResponse
 from fastapi_limiter.depends import RateLimiter
-
+from entity import vehicle_db
+from entity.bulk_export import BulkExporter
+from modules.jwt_util import require_token
 from modules.logger import get_logger
+from modules.timing import TimedRoute
+
+vehicle_router = APIRouter(route_class=TimedRoute)
+logger = get_logger("VEHICLE_ROUTER")
+
+
+# Export the current user's vehicles
+@vehicle_router.get(
+    "/export",
+    summary="Export vehicles",
+    description="Stream the authenticated user's vehicles as NDJSON or CSV, optionally gzip-compressed.",
+    response_description="Vehicle export file",
+    response_class=StreamingResponse,
+)
+async def export_vehicles(
+        fmt: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+        gzip: bool = Query(False, description="gzip-compress the output"),
+        user=Depends(require_token),
+):
+    """
+    Stream every vehicle owned by the authenticated user.
+
+    Parameters:
+        fmt (str): "ndjson" or "csv".
+        gzip (bool): gzip-compress the output.
+        user (dict): Injected by dependency.
 
-vehicle_router = APIRouter()
-logger = get_logger("VEHICLE_ROUTER")
\ No newline at end of file
+    Returns:
+        StreamingResponse: The export, produced in constant memory.
+    """
+    exporter = BulkExporter(vehicle_db, fmt=fmt, gzip=gzip)
+    return StreamingResponse(
+        exporter.stream(filter={"owner_id": user["id"]}, sort=[("created_at", 1)]),
+        media_type=exporter.media_type,
+        headers=exporter.download_headers("vehicles"),
+    )
@@ -0,0 +1,7 @@
+import logging
+
+# The wrappers log expected failures (retries, rejected writes) at WARNING/ERROR;
+# keep them out of the test output
+logging.getLogger("entity").setLevel(logging.CRITICAL)
+# TestClient logs every request through httpx at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -0,0 +1,251 @@
+"""
+In-memory stand-ins for exercising the MongoDB wrappers without a server.
+
+FakeCollection implements the slice of pymongo's Collection the wrappers call
+(find_one, find with sort/skip/limit, insert_one, update_one, with_options for
+raw BSON) with exact-equality matching, so a string never matches a stored
+ObjectId, just as on a real server. make_handle() wires one into a MongoDB or
+AsyncMongoDB without connecting; FakeClient stands in for MongoClient where the
+client itself is under test (e.g. ClientRegistry). FakeClock replaces a
+module's `time` to step TTLs forward without sleeping.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def matches(doc: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Equality, $in, $gt/$lt, $and and $or, which is all the wrappers send.
+    """
+    for key, cond in (filter or {}).items():
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(op.startswith("$") for op in cond):
+            value = _get(doc, key)
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gt" and not (value is not None and value > arg):
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+        elif _get(doc, key) != cond:
+            return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = dict(doc)
+    if not projection:
+        return doc
+    keep_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        doc = {k: v for k, v in doc.items() if k in fields or k == "_id"}
+    else:
+        for key in fields:
+            doc.pop(key, None)
+    if not keep_id:
+        doc.pop("_id", None)
+    return doc
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]], raw: bool) -> None:
+        self._docs = docs
+        self._raw = raw
+        self._skip = 0
+        self._limit = 0
+        self.closed = False
+
+    def sort(self, spec, direction=None):
+        if isinstance(spec, str):
+            spec = [(spec, direction or 1)]
+        for key, order in reversed(list(spec)):
+            self._docs.sort(key=lambda d: _get(d, key), reverse=order < 0)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def close(self) -> None:
+        self.closed = True
+
+    def _selected(self) -> List[Dict[str, Any]]:
+        docs = self._docs[self._skip:]
+        return docs[:self._limit] if self._limit else docs
+
+    def __iter__(self):
+        for doc in self._selected():
+            yield RawBSONDocument(bson.encode(doc)) if self._raw else doc
+
+    async def to_list(self, length: Optional[int] = None):
+        docs = list(self)
+        return docs[:length] if length else docs
+
+
+class FakeCollection:
+    """
+    A collection held in a list. `queries` records every (method, filter) the
+    wrappers issue, for asserting on the query shapes real code paths send.
+    """
+
+    def __init__(self, full_name: str = "test.items", docs: Iterable[Dict[str, Any]] = (), raw: bool = False,
+                 _store: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.full_name = full_name
+        self.name = full_name.split(".", 1)[-1]
+        self.docs: List[Dict[str, Any]] = _store if _store is not None else [dict(d) for d in docs]
+        self.raw = raw
+        self.queries: List[tuple] = []
+
+    def with_options(self, codec_options=None, **kwargs) -> "FakeCollection":
+        view = FakeCollection(self.full_name, raw=True, _store=self.docs)
+        view.queries = self.queries
+        return view
+
+    def _match(self, filter) -> List[Dict[str, Any]]:
+        return [d for d in self.docs if matches(d, filter)]
+
+    def find_one(self, filter=None, projection=None, session=None, **kwargs):
+        self.queries.append(("find_one", filter))
+        found = self._match(filter)
+        if not found:
+            return None
+        doc = project(found[0], projection)
+        return RawBSONDocument(bson.encode(doc)) if self.raw else doc
+
+    def find(self, filter=None, projection=None, session=None, **kwargs) -> FakeCursor:
+        self.queries.append(("find", filter))
+        return FakeCursor([project(d, projection) for d in self._match(filter)], self.raw)
+
+    def insert_one(self, doc, session=None):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def update_one(self, filter, update, upsert=False, session=None, **kwargs):
+        self.queries.append(("update_one", filter))
+        found = self._match(filter)
+        if found:
+            before = dict(found[0])
+            found[0].update(update.get("$set", {}))
+            return SimpleNamespace(matched_count=1, modified_count=int(before != found[0]), upserted_id=None)
+        if upsert:
+            doc = {**filter, **update.get("$set", {}), "_id": ObjectId()}
+            self.docs.append(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def count_documents(self, filter, **kwargs) -> int:
+        return len(self._match(filter))
+
+
+class AsyncFakeCollection(FakeCollection):
+    """FakeCollection with the coroutine methods of AsyncCollection."""
+
+    def with_options(self, codec_options=None, **kwargs) -> "AsyncFakeCollection":
+        view = AsyncFakeCollection(self.full_name, raw=True, _store=self.docs)
+        view.queries = self.queries
+        return view
+
+    async def find_one(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return FakeCollection.find_one(self, *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return FakeCollection.insert_one(self, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return FakeCollection.update_one(self, *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return FakeCollection.count_documents(self, *args, **kwargs)
+
+
+class FakeClient:
+    """MongoClient stand-in: answers ping, hands out FakeCollections, records close()."""
+
+    def __init__(self, connection_str: Optional[str] = None, **options) -> None:
+        self.connection_str = connection_str
+        self.options = options
+        self.pings = 0
+        self.closed = False
+        self.admin = SimpleNamespace(command=self._command)
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def _command(self, name: str, *args, **kwargs) -> Dict[str, Any]:
+        self.pings += 1
+        return {"ok": 1}
+
+    def __getitem__(self, db_name: str) -> "FakeDatabase":
+        return FakeDatabase(self, db_name)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeDatabase:
+    def __init__(self, client: FakeClient, name: str) -> None:
+        self.client = client
+        self.name = name
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        full_name = f"{self.name}.{name}"
+        return self.client._collections.setdefault(full_name, FakeCollection(full_name))
+
+
+def make_handle(cls, collection, cache=None):
+    """
+    A MongoDB or AsyncMongoDB bound to `collection` without connecting.
+    """
+    handle = cls.__new__(cls)
+    handle.collection = collection
+    handle.cache = cache
+    handle.write_buffer = None
+    handle._session = None
+    handle._closed = False
+    return handle
+
+
+class FakeClock:
+    """
+    Stand-in for the `time` module with a monotonic and a wall clock that only
+    move on advance(); patch it over a module's `time` global.
+    """
+
+    def __init__(self, wall: Optional[float] = None) -> None:
+        self._monotonic = 1000.0
+        self._wall = time.time() if wall is None else wall
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def time(self) -> float:
+        return self._wall
+
+    def advance(self, seconds: float) -> None:
+        self._monotonic += seconds
+        self._wall += seconds
@@ -0,0 +1,59 @@
+"""
+BulkExporter.stream over a sync handle when the consumer goes away.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import threading
+import unittest
+
+from entity.bulk_export import BulkExporter
+
+
+class SlowCursorDB:
+    """Sync handle whose cursor blocks in the worker thread until released."""
+
+    class collection:
+        full_name = "test.transactions"
+
+    def __init__(self):
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+        self.closed = threading.Event()
+
+    def iter_filter(self, **kwargs):
+        try:
+            yield {"_id": 1, "amount": 10}
+            self.fetching.set()
+            self.release.wait(5)
+            yield {"_id": 2, "amount": 20}
+        finally:
+            self.closed.set()
+
+
+class StreamCancelTest(unittest.TestCase):
+    def test_disconnect_during_fetch_closes_cursor(self):
+        db = SlowCursorDB()
+        exporter = BulkExporter(db, chunk_bytes=1)
+
+        async def consume():
+            async for _ in exporter.stream():
+                pass
+
+        async def run():
+            task = asyncio.create_task(consume())
+            await asyncio.to_thread(db.fetching.wait, 5)
+            task.cancel()
+            # The worker is still inside the generator; let it return next()
+            await asyncio.sleep(0.05)
+            db.release.set()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertTrue(db.closed.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+BulkImporter checkpoint/resume: a run that dies after writing a chunk but
+before checkpointing it must not duplicate that chunk when resumed.
+
+Run with:
+    python -m unittest
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from entity.bulk_import import BulkImporter
+from models.transaction_model import CreateTransaction
+
+
+class UniqueIdDB:
+    """insert_many over a dict keyed by _id, failing duplicates like a server would."""
+
+    def __init__(self, crash_on_call=None):
+        self.docs = {}
+        self.calls = 0
+        self.crash_on_call = crash_on_call
+
+    def insert_many(self, docs, ordered=False):
+        self.calls += 1
+        inserted, errors = [], []
+        for index, doc in enumerate(docs):
+            _id = doc.setdefault("_id", ObjectId())
+            if _id in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": f"E11000 duplicate key: {_id}"})
+            else:
+                self.docs[_id] = doc
+                inserted.append(str(_id))
+        if self.calls == self.crash_on_call:
+            # The chunk reached the server, then the process died before checkpointing it
+            raise RuntimeError("killed")
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return inserted
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "transactions.ndjson")
+        self.checkpoint = os.path.join(tmp.name, "transactions.ckpt.json")
+        self.rejects = os.path.join(tmp.name, "transactions.rejects.ndjson")
+        with open(self.path, "w", encoding="utf-8") as fh:
+            for i in range(6):
+                fh.write(json.dumps({
+                    "_id": f"tx-{i}", "vehicle_id": "v1", "amount": 100 + i, "fuel_quantity": 10,
+                    "location": "Pune", "tank_fully_filled": False,
+                }) + "\n")
+
+    def importer(self, db):
+        return BulkImporter(db, model=CreateTransaction, chunk_size=2, workers=1, max_chunks=1,
+                            checkpoint_path=self.checkpoint, reject_path=self.rejects, progress=lambda totals: None)
+
+    def test_resume_after_crash_inserts_each_row_once(self):
+        db = UniqueIdDB(crash_on_call=3)
+        with self.assertRaises(RuntimeError):
+            self.importer(db).run(self.path)
+        with open(self.checkpoint, encoding="utf-8") as fh:
+            self.assertEqual(json.load(fh)["rows"], 4)
+
+        db.crash_on_call = None
+        totals = self.importer(db).run(self.path)
+        self.assertEqual(totals["resumed_from"], 4)
+        self.assertEqual(totals["rows"], 6)
+        self.assertEqual(sorted(db.docs), [f"tx-{i}" for i in range(6)])
+        self.assertEqual(db.docs["tx-5"]["amount"], 105)
+        # The re-written chunk is rejected by the unique _id, not inserted twice
+        self.assertEqual((totals["inserted"], totals["rejected"]), (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
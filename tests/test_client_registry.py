@@ -0,0 +1,106 @@
+"""
+ClientRegistry sharing, reference counting and shutdown, and MongoDB handles
+acquiring/releasing through it.
+
+Run with:
+    python -m unittest
+"""
+import unittest
+from unittest import mock
+
+from entity import mongo_core
+from entity.mongo_core import ClientRegistry, MongoDB
+from tests.fakes import FakeClient
+
+URI = "mongodb://db.example:27017"
+
+
+class ClientRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(FakeClient)
+
+    def test_same_settings_share_one_client(self):
+        first, created_first = self.registry.acquire(URI, maxPoolSize=50)
+        second, created_second = self.registry.acquire(URI, maxPoolSize=50)
+        self.assertIs(first, second)
+        self.assertEqual((created_first, created_second), (True, False))
+        self.assertEqual(self.registry.stats(), [{"connection_str": URI, "options": {"maxPoolSize": "50"}, "refs": 2}])
+
+    def test_different_options_get_separate_clients(self):
+        small, _ = self.registry.acquire(URI, maxPoolSize=5)
+        large, _ = self.registry.acquire(URI, maxPoolSize=50)
+        other, _ = self.registry.acquire("mongodb://other:27017", maxPoolSize=5)
+        self.assertEqual(len({id(small), id(large), id(other)}), 3)
+
+    def test_release_returns_client_on_last_reference(self):
+        client, _ = self.registry.acquire(URI)
+        self.registry.acquire(URI)
+        self.assertIsNone(self.registry.release(client))
+        self.assertIs(self.registry.release(client), client)
+        self.assertEqual(self.registry.stats(), [])
+        # Releasing an unknown or already released client is a no-op
+        self.assertIsNone(self.registry.release(client))
+
+    def test_drain_removes_everything(self):
+        a, _ = self.registry.acquire(URI)
+        b, _ = self.registry.acquire("mongodb://other:27017")
+        self.assertCountEqual(self.registry.drain(), [a, b])
+        self.assertEqual(self.registry.stats(), [])
+        fresh, created = self.registry.acquire(URI)
+        self.assertTrue(created)
+        self.assertIsNot(fresh, a)
+
+    def test_forked_child_forgets_parent_clients(self):
+        parent, _ = self.registry.acquire(URI)
+        self.registry._after_fork()
+        child, created = self.registry.acquire(URI)
+        self.assertTrue(created)
+        self.assertIsNot(child, parent)
+        self.assertFalse(parent.closed)
+
+
+class SharedHandleTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(mongo_core, "_client_registry", ClientRegistry(FakeClient))
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_handles_share_client_and_ping_once(self):
+        users = MongoDB("app", "users", connection_str=URI)
+        vehicles = MongoDB("app", "vehicles", connection_str=URI)
+        self.assertIs(users.client, vehicles.client)
+        self.assertEqual(users.client.pings, 1)
+        self.assertEqual(vehicles.collection.full_name, "app.vehicles")
+
+    def test_client_closed_with_last_handle(self):
+        users = MongoDB("app", "users", connection_str=URI)
+        vehicles = MongoDB("app", "vehicles", connection_str=URI)
+        client = users.client
+        users.close()
+        users.close()  # closing twice must not drop vehicles' reference
+        self.assertFalse(client.closed)
+        vehicles.close()
+        self.assertTrue(client.closed)
+
+    def test_private_and_external_clients(self):
+        with mock.patch.object(mongo_core, "MongoClient", FakeClient):
+            private = MongoDB("app", "users", connection_str=URI, shared_client=False)
+        self.assertEqual(self.registry.stats(), [])
+        private.close()
+        self.assertTrue(private.client.closed)
+
+        external = FakeClient()
+        handle = MongoDB("app", "users", client=external)
+        handle.close()
+        self.assertFalse(external.closed)
+        self.assertEqual(external.pings, 0)
+
+    def test_close_all_clients_drains_registry(self):
+        handle = MongoDB("app", "users", connection_str=URI)
+        mongo_core.close_all_clients()
+        self.assertTrue(handle.client.closed)
+        self.assertEqual(self.registry.stats(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
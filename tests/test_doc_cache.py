@@ -0,0 +1,104 @@
+"""
+DocumentCache behaviour through the MongoDB wrappers, against an in-memory
+stand-in for the collection (no server needed).
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import unittest
+
+from bson import ObjectId
+
+from entity.async_mongo_core import AsyncMongoDB
+from entity.doc_cache import DocumentCache
+from entity.mongo_core import MongoDB
+from tests.fakes import FakeCollection, make_handle
+
+
+class RacingCollection(FakeCollection):
+    """
+    find_one returns the stored document as it was when the read started, but
+    lets a write (`on_read`) complete before returning it.
+    """
+
+    def __init__(self, doc):
+        super().__init__("test.users", [doc])
+        self.reads = 0
+        self.on_read = None
+
+    def _read(self, filter, projection):
+        self.reads += 1
+        snapshot = FakeCollection.find_one(self, filter, projection)
+        if self.on_read is not None:
+            on_read, self.on_read = self.on_read, None
+            on_read()
+        return snapshot
+
+    def find_one(self, filter=None, projection=None, session=None, **kwargs):
+        return self._read(filter, projection)
+
+
+class AsyncRacingCollection(RacingCollection):
+    async def find_one(self, filter=None, projection=None, session=None, **kwargs):
+        snapshot = self._read(filter, projection)
+        await asyncio.sleep(0)
+        return snapshot
+
+
+class StaleReadTest(unittest.TestCase):
+    def setUp(self):
+        self.user_id = ObjectId()
+        self.cache = DocumentCache(ttl=60)
+
+    def write_name(self, collection, handle, name):
+        # What an @invalidates_cache write does once the server acknowledged it
+        def write():
+            collection.docs[0]["name"] = name
+            handle._invalidate_cache()
+        return write
+
+    def test_write_between_find_and_set_is_not_cached(self):
+        collection = RacingCollection({"_id": self.user_id, "name": "old"})
+        handle = make_handle(MongoDB, collection, self.cache)
+        collection.on_read = self.write_name(collection, handle, "new")
+
+        self.assertEqual(handle.get_by_id(self.user_id)["name"], "old")
+        self.assertEqual(handle.get_by_id(self.user_id)["name"], "new")
+        self.assertEqual(collection.reads, 2)
+        self.assertEqual(self.cache.stats()["stale_sets"], 1)
+
+        # Without a racing write the second read is a hit
+        self.assertEqual(handle.get_by_id(self.user_id)["name"], "new")
+        self.assertEqual(collection.reads, 2)
+
+    def test_get_write_between_find_and_set_is_not_cached(self):
+        collection = RacingCollection({"_id": self.user_id, "email": "a@example.com", "name": "old"})
+        handle = make_handle(MongoDB, collection, self.cache)
+        collection.on_read = self.write_name(collection, handle, "new")
+
+        self.assertEqual(handle.get({"email": "a@example.com"})["name"], "old")
+        self.assertEqual(handle.get({"email": "a@example.com"})["name"], "new")
+
+    def test_async_write_between_find_and_set_is_not_cached(self):
+        collection = AsyncRacingCollection({"_id": self.user_id, "name": "old"})
+        handle = make_handle(AsyncMongoDB, collection, self.cache)
+        collection.on_read = self.write_name(collection, handle, "new")
+
+        async def run():
+            first = await handle.get_by_id(self.user_id)
+            second = await handle.get_by_id(self.user_id)
+            return first["name"], second["name"]
+
+        self.assertEqual(asyncio.run(run()), ("old", "new"))
+        self.assertEqual(collection.reads, 2)
+
+    def test_clear_rejects_in_flight_set(self):
+        generation = self.cache.generation("test.users")
+        self.cache.clear()
+        self.cache.set("test.users", b"k", {"name": "old"}, if_generation=generation)
+        self.assertIsNone(self.cache.get("test.users", b"k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+The /vehicle/export and /transaction/{vehicle_id}/export routes end to end,
+against fake handles (no server needed).
+
+Run with:
+    python -m unittest
+"""
+import json
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import app as application
+from entity.mongo_core import MongoDB
+from modules.jwt_util import require_token
+from tests.fakes import FakeCollection, make_handle
+
+OWNER = str(ObjectId())
+
+
+class ExportRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self.vehicle = {"_id": ObjectId(), "owner_id": OWNER, "name": "car", "created_at": 1.0}
+        self.other = {"_id": ObjectId(), "owner_id": str(ObjectId()), "name": "bike", "created_at": 2.0}
+        vehicles = make_handle(MongoDB, FakeCollection("test.vehicles", [self.vehicle, self.other]))
+        transactions = make_handle(MongoDB, FakeCollection("test.transactions", [
+            {"_id": ObjectId(), "amount": 10.0, "created_at": 2.0},
+            {"_id": ObjectId(), "amount": 20.0, "created_at": 1.0},
+        ]))
+
+        async def ensure_indexes(vehicle_id):
+            pass
+
+        for target, value in (
+                ("routers.vehicle_router.vehicle_db", vehicles),
+                ("routers.transaction_router.vehicle_db", vehicles),
+                ("routers.transaction_router.transaction_db", lambda vehicle_id: transactions),
+                ("routers.transaction_router.ensure_transaction_indexes", ensure_indexes),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        async def principal():
+            return {"id": OWNER}
+
+        application.app.dependency_overrides[require_token] = principal
+        self.addCleanup(application.app.dependency_overrides.clear)
+        # Not entered as a context manager: the app lifespan would connect to MongoDB/Redis
+        self.client = TestClient(application.app)
+
+    def ndjson(self, response):
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_transactions_of_own_vehicle(self):
+        response = self.client.get(f"/transaction/{self.vehicle['_id']}/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["amount"] for row in self.ndjson(response)], [20.0, 10.0])
+
+    def test_malformed_vehicle_id(self):
+        with self.assertLogs("entity.mongo_core", "ERROR"):
+            response = self.client.get("/transaction/not-an-id/export")
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_owners_vehicle_is_not_found(self):
+        self.assertEqual(self.client.get(f"/transaction/{self.other['_id']}/export").status_code, 404)
+        self.assertEqual(self.client.get(f"/transaction/{ObjectId()}/export").status_code, 404)
+
+    def test_vehicles_are_scoped_to_owner(self):
+        response = self.client.get("/vehicle/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in self.ndjson(response)], ["car"])
+
+
+if __name__ == "__main__":
+    unittest.main()
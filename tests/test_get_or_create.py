@@ -0,0 +1,91 @@
+"""
+get_or_create / update_or_create: concurrent creates on a unique index, and
+which paths invalidate the document cache.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import unittest
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from entity.async_mongo_core import AsyncMongoDB
+from entity.doc_cache import DocumentCache
+from entity.mongo_core import MongoDB
+from tests.fakes import AsyncFakeCollection, FakeCollection, make_handle
+
+
+def lose_race(collection):
+    """Make the next insert_one fail because another writer inserted the same email first."""
+    def insert_one(doc, session=None):
+        collection.docs.append({"_id": ObjectId(), "email": doc["email"], "full_name": "first"})
+        raise DuplicateKeyError("E11000 duplicate key error collection: test.users index: email_1", 11000)
+    return insert_one
+
+
+class GetOrCreateRaceTest(unittest.TestCase):
+    def test_sync_returns_winner_as_fetched(self):
+        collection = FakeCollection("test.users")
+        collection.insert_one = lose_race(collection)
+        handle = make_handle(MongoDB, collection)
+        doc, created = handle.get_or_create({"email": "a@example.com"}, {"full_name": "second"})
+        self.assertFalse(created)
+        self.assertEqual(doc["full_name"], "first")
+        self.assertIn("id", doc)
+
+    def test_async_returns_winner_as_fetched(self):
+        collection = AsyncFakeCollection("test.users")
+        sync_insert = lose_race(collection)
+
+        async def insert_one(doc, session=None):
+            return sync_insert(doc, session)
+
+        collection.insert_one = insert_one
+        handle = make_handle(AsyncMongoDB, collection)
+        doc, created = asyncio.run(handle.get_or_create({"email": "a@example.com"}, {"full_name": "second"}))
+        self.assertFalse(created)
+        self.assertEqual(doc["full_name"], "first")
+
+
+class CacheInvalidationTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = DocumentCache(ttl=60)
+        self.existing = {"_id": ObjectId(), "email": "a@example.com", "full_name": "A"}
+
+    def generation(self):
+        return self.cache.generation("test.users")
+
+    def test_fetch_keeps_cache(self):
+        handle = make_handle(MongoDB, FakeCollection("test.users", [self.existing]), self.cache)
+        before = self.generation()
+        _, created = handle.get_or_create({"email": "a@example.com"}, {"full_name": "B"})
+        self.assertFalse(created)
+        self.assertEqual(self.generation(), before)
+
+    def test_create_invalidates(self):
+        handle = make_handle(MongoDB, FakeCollection("test.users"), self.cache)
+        before = self.generation()
+        _, created = handle.get_or_create({"email": "b@example.com"}, {"full_name": "B"})
+        self.assertTrue(created)
+        self.assertGreater(self.generation(), before)
+
+    def test_async_fetch_keeps_cache(self):
+        handle = make_handle(AsyncMongoDB, AsyncFakeCollection("test.users", [self.existing]), self.cache)
+        before = self.generation()
+        _, created = asyncio.run(handle.get_or_create({"email": "a@example.com"}))
+        self.assertFalse(created)
+        self.assertEqual(self.generation(), before)
+
+    def test_update_or_create_without_change_keeps_cache(self):
+        handle = make_handle(MongoDB, FakeCollection("test.users", [self.existing]), self.cache)
+        before = self.generation()
+        handle.update_or_create({"email": "a@example.com"}, {"full_name": "A"})
+        self.assertEqual(self.generation(), before)
+        handle.update_or_create({"email": "a@example.com"}, {"full_name": "B"})
+        self.assertGreater(self.generation(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+HashPool load shedding (503 + Retry-After), pending-slot accounting when the
+caller is cancelled, and password verification.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import app as application
+from entity.mongo_core import MongoDB
+from modules import hashing
+from modules.hashing import HashingOverloaded, HashPool
+
+
+def blocker():
+    """A pool function that holds its worker until `release` is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def func():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    return func, started, release
+
+
+class LoadSheddingTest(unittest.TestCase):
+    def test_calls_beyond_max_pending_are_rejected(self):
+        pool = HashPool(workers=1, max_pending=2)
+        self.addCleanup(pool.shutdown)
+        func, started, release = blocker()
+        self.addCleanup(release.set)
+
+        async def scenario():
+            running = [asyncio.create_task(pool.run(func)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(HashingOverloaded) as ctx:
+                await pool.run(func)
+            release.set()
+            return ctx.exception, await asyncio.gather(*running)
+
+        with self.assertLogs("HASHING", "WARNING"):
+            error, results = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 503)
+        self.assertEqual(error.headers["Retry-After"], str(hashing.RETRY_AFTER_SECONDS))
+        self.assertEqual(results, ["done", "done"])
+        stats = pool.stats()
+        self.assertEqual((stats["pending"], stats["completed"], stats["rejected"]), (0, 2, 1))
+
+    def test_route_serves_503_with_retry_after(self):
+        with mock.patch.object(hashing, "hash_pool", HashPool(workers=1, max_pending=0)), \
+                self.assertLogs("HASHING", "WARNING"):
+            response = TestClient(application.app).post(
+                "/auth/register", json={"full_name": "Busy User", "email": "busy@example.com", "password": "secret"}
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], str(hashing.RETRY_AFTER_SECONDS))
+
+
+class CancellationTest(unittest.TestCase):
+    def test_cancelled_caller_keeps_slot_until_hash_finishes(self):
+        pool = HashPool(workers=1, max_pending=1)
+        self.addCleanup(pool.shutdown)
+        func, started, release = blocker()
+        self.addCleanup(release.set)
+
+        async def scenario():
+            task = asyncio.create_task(pool.run(func))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The worker is still hashing for the cancelled request
+            self.assertEqual(pool.stats()["pending"], 1)
+            with self.assertRaises(HashingOverloaded):
+                await pool.run(func)
+
+        with self.assertLogs("HASHING", "WARNING"):
+            asyncio.run(scenario())
+        release.set()
+        pool.shutdown()
+        self.assertEqual(pool.stats()["pending"], 0)
+        self.assertEqual(pool.stats()["completed"], 1)
+
+
+class VerifyTest(unittest.TestCase):
+    def test_round_trip(self):
+        async def scenario():
+            hashed = await hashing.hash_password("correct horse")
+            return (
+                await hashing.verify_password("correct horse", hashed),
+                await hashing.verify_password("wrong horse", hashed),
+                await hashing.verify_password("correct horse", ""),
+            )
+
+        self.assertEqual(asyncio.run(scenario()), (True, False, False))
+
+    def test_uses_mongodb_verify_hash(self):
+        with mock.patch.object(MongoDB, "verify_hash", return_value=True) as verify:
+            self.assertTrue(asyncio.run(hashing.verify_password("pw", "stored")))
+        verify.assert_called_once_with("pw", "stored")
+
+    def test_malformed_hash_is_not_verified(self):
+        with self.assertLogs("entity.mongo_core", "ERROR"):
+            self.assertFalse(asyncio.run(hashing.verify_password("pw", "not-a-hash")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Keyset pagination: cursor tokens, the seek filter, and walking every page of
+a collection with ties on the sort key.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import unittest
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from entity.async_mongo_core import AsyncMongoDB
+from entity.mongo_core import MongoDB, decode_page_cursor, encode_page_cursor, keyset_query
+from tests.fakes import AsyncFakeCollection, FakeCollection, make_handle
+
+
+def seeded_docs(count=25):
+    # created_at repeats, so pages must break ties on _id
+    return [{"_id": ObjectId(), "created_at": float(i // 3), "name": f"v{i}"} for i in range(count)]
+
+
+class CursorTokenTest(unittest.TestCase):
+    def test_round_trip(self):
+        _id = ObjectId()
+        token = encode_page_cursor(12.5, _id, "created_at", DESCENDING)
+        self.assertEqual(decode_page_cursor(token), (12.5, _id, "created_at", DESCENDING))
+        self.assertNotIn("=", token)
+
+    def test_malformed_token(self):
+        for token in ("not-a-cursor", "", encode_page_cursor(1, 2, "a", 1)[:-4]):
+            with self.assertRaises(ValueError):
+                decode_page_cursor(token)
+
+
+class SeekFilterTest(unittest.TestCase):
+    def test_first_page_has_no_seek(self):
+        query, sort = keyset_query({"owner_id": "o"}, "created_at", DESCENDING, None)
+        self.assertEqual(query, {"owner_id": "o"})
+        self.assertEqual(sort, [("created_at", DESCENDING), ("_id", DESCENDING)])
+
+    def test_seek_after_cursor_position(self):
+        _id = ObjectId()
+        cursor = encode_page_cursor(5.0, _id, "created_at", ASCENDING)
+        query, _ = keyset_query({"owner_id": "o"}, "created_at", ASCENDING, cursor)
+        self.assertEqual(query, {"$and": [
+            {"owner_id": "o"},
+            {"$or": [{"created_at": {"$gt": 5.0}}, {"created_at": 5.0, "_id": {"$gt": _id}}]},
+        ]})
+
+    def test_id_sort_seeks_on_id_only(self):
+        _id = ObjectId()
+        cursor = encode_page_cursor(_id, _id, "_id", DESCENDING)
+        query, sort = keyset_query(None, "_id", DESCENDING, cursor)
+        self.assertEqual(query, {"_id": {"$lt": _id}})
+        self.assertEqual(sort, [("_id", DESCENDING)])
+
+    def test_cursor_from_another_sort_is_rejected(self):
+        cursor = encode_page_cursor(5.0, ObjectId(), "created_at", DESCENDING)
+        with self.assertRaises(ValueError):
+            keyset_query(None, "created_at", ASCENDING, cursor)
+        with self.assertRaises(ValueError):
+            keyset_query(None, "name", DESCENDING, cursor)
+
+
+class PaginateKeysetTest(unittest.TestCase):
+    def setUp(self):
+        self.docs = seeded_docs()
+        self.handle = make_handle(MongoDB, FakeCollection("test.vehicles", self.docs))
+
+    def walk(self, paginate, **kwargs):
+        seen, cursor = [], None
+        while True:
+            page = paginate(page_size=4, sort_key="created_at", cursor=cursor, **kwargs)
+            seen.extend(page["data"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+
+    def test_walks_every_document_once_in_order(self):
+        for direction in (ASCENDING, DESCENDING):
+            seen = self.walk(self.handle.paginate_keyset, direction=direction)
+            expected = sorted(self.docs, key=lambda d: (d["created_at"], d["_id"]), reverse=direction < 0)
+            self.assertEqual([d["id"] for d in seen], [str(d["_id"]) for d in expected])
+
+    def test_projection_without_id(self):
+        seen = self.walk(self.handle.paginate_keyset, projection={"_id": 0, "name": 1})
+        self.assertEqual(len(seen), len(self.docs))
+        self.assertTrue(all(set(doc) == {"name", "created_at"} for doc in seen))
+
+    def test_exclusion_projection(self):
+        page = self.handle.paginate_keyset(page_size=4, sort_key="created_at", projection={"name": 0})
+        self.assertTrue(all(set(doc) == {"id", "created_at"} for doc in page["data"]))
+
+    def test_total(self):
+        page = self.handle.paginate_keyset(page_size=4, sort_key="created_at", total="exact")
+        self.assertEqual(page["total"], len(self.docs))
+
+    def test_async_matches_sync(self):
+        handle = make_handle(AsyncMongoDB, AsyncFakeCollection("test.vehicles", self.docs))
+
+        async def walk():
+            seen, cursor = [], None
+            while True:
+                page = await handle.paginate_keyset(page_size=4, sort_key="created_at", cursor=cursor)
+                seen.extend(page["data"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return seen
+
+        self.assertEqual(asyncio.run(walk()), self.walk(self.handle.paginate_keyset))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+SamplingFilter rates and counters, LOG_SAMPLE_RATES parsing, and the JSON
+record format.
+
+Run with:
+    python -m unittest
+"""
+import json
+import logging
+import unittest
+
+from modules.logger import ContextFilter, JsonFormatter, SamplingFilter, _parse_rates, request_context
+
+
+def record(level=logging.INFO, msg="event %s", args=(1,), **extra):
+    rec = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+class SamplingFilterTest(unittest.TestCase):
+    def test_keeps_exact_evenly_spaced_fraction(self):
+        sampler = SamplingFilter({"auth": 0.25})
+        kept = [i for i in range(1, 101) if sampler.filter(record(sample_key="auth"))]
+        self.assertEqual(kept, list(range(4, 101, 4)))
+        self.assertEqual(sampler.stats()["auth"], {"rate": 0.25, "seen": 100, "dropped": 75})
+
+    def test_debug_records_use_debug_rate(self):
+        sampler = SamplingFilter({"debug": 0.5})
+        kept = sum(sampler.filter(record(logging.DEBUG)) for _ in range(10))
+        self.assertEqual(kept, 5)
+        # Explicit keys win over the debug default
+        self.assertTrue(all(sampler.filter(record(logging.DEBUG, sample_key="other")) for _ in range(10)))
+
+    def test_unsampled_records_pass_untouched(self):
+        sampler = SamplingFilter({"auth": 0.0, "debug": 1.0})
+        self.assertTrue(all(sampler.filter(record(logging.WARNING)) for _ in range(5)))
+        self.assertTrue(all(sampler.filter(record(logging.DEBUG)) for _ in range(5)))
+        self.assertFalse(any(sampler.filter(record(sample_key="auth")) for _ in range(5)))
+        self.assertEqual(sampler.stats()["debug"]["seen"], 0)
+
+    def test_parse_rates(self):
+        self.assertEqual(_parse_rates("debug=0.1, auth=0.01,,cache"), {"debug": 0.1, "auth": 0.01, "cache": 1.0})
+        self.assertEqual(_parse_rates(""), {})
+
+
+class JsonFormatterTest(unittest.TestCase):
+    def test_fields_and_request_context(self):
+        token = request_context.set({"request_id": "req-1", "scope": {"path": "/user/me"}})
+        try:
+            rec = record(collection="users", duration_ms=1.5)
+            ContextFilter().filter(rec)
+        finally:
+            request_context.reset(token)
+        entry = json.loads(JsonFormatter().format(rec))
+        self.assertEqual(entry["message"], "event 1")
+        self.assertEqual(
+            {key: entry[key] for key in JsonFormatter.FIELDS},
+            {"route": "/user/me", "collection": "users", "duration_ms": 1.5, "request_id": "req-1"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
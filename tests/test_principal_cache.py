@@ -0,0 +1,130 @@
+"""
+TTLCache expiry, LRU bound, tag invalidation and the generation guard, and the
+principal cache behind get_user_from_token.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from entity.async_mongo_core import AsyncMongoDB
+from modules import jwt_util
+from modules.ttl_cache import TTLCache
+from tests.fakes import AsyncFakeCollection, FakeClock, make_handle
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("modules.ttl_cache.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = TTLCache(ttl=30, max_entries=3)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=5)
+        self.cache.set("c", 3, ttl=300)  # capped at the cache TTL
+        self.clock.advance(10)
+        self.assertEqual((self.cache.get("a"), self.cache.get("b")), (1, None))
+        self.clock.advance(20)
+        self.assertEqual((self.cache.get("a"), self.cache.get("c")), (None, None))
+        self.assertEqual(self.cache.stats()["expirations"], 3)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        for key in "abc":
+            self.cache.set(key, key)
+        self.cache.get("a")
+        self.cache.set("d", "d")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual([self.cache.get(key) for key in "acd"], ["a", "c", "d"])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_invalidate_tag(self):
+        self.cache.set(("u1", "t1"), 1, tag="u1")
+        self.cache.set(("u1", "t2"), 2, tag="u1")
+        self.cache.set(("u2", "t1"), 3, tag="u2")
+        self.cache.invalidate_tag("u1")
+        self.assertEqual([self.cache.get(k) for k in (("u1", "t1"), ("u1", "t2"), ("u2", "t1"))], [None, None, 3])
+
+    def test_set_after_invalidation_is_discarded(self):
+        generation = self.cache.generation()
+        self.cache.invalidate_tag("u1")
+        self.assertFalse(self.cache.set("a", 1, tag="u1", if_generation=generation))
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_zero_ttl_disables(self):
+        cache = TTLCache(ttl=0, max_entries=10)
+        self.assertFalse(cache.set("a", 1))
+        self.assertIsNone(cache.get("a"))
+
+
+class PrincipalCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.user = {
+            "_id": ObjectId(), "full_name": "Cached User", "email": "cached@example.com", "password": "hash",
+            "is_active": True, "jwt_token_string": "abcde", "created_at": 1.0, "updated_at": 1.0,
+        }
+        self.collection = AsyncFakeCollection("test.users", [self.user])
+        for target, value in (
+                ("modules.jwt_util.user_db", make_handle(AsyncMongoDB, self.collection)),
+                ("modules.jwt_util.principal_cache", TTLCache(ttl=30, max_entries=100)),
+                ("modules.jwt_util.token_cache", TTLCache(ttl=0, max_entries=0)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user_id = str(self.user["_id"])
+        self.token = jwt_util.create_jwt_token({**self.user, "id": self.user_id})
+
+    def authenticate(self):
+        return asyncio.run(jwt_util.get_user_from_token(self.token))
+
+    def lookups(self):
+        return sum(1 for method, _ in self.collection.queries if method == "find_one")
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.authenticate()
+        second = self.authenticate()
+        self.assertEqual(first, second)
+        self.assertEqual(first["id"], self.user_id)
+        self.assertNotIn("password", first)
+        self.assertEqual(self.lookups(), 1)
+
+    def test_invalidate_principal_forces_a_lookup(self):
+        self.authenticate()
+        self.collection.docs[0]["full_name"] = "Renamed User"
+        jwt_util.invalidate_principal(self.user_id)
+        self.assertEqual(self.authenticate()["full_name"], "Renamed User")
+        self.assertEqual(self.lookups(), 2)
+
+    def test_rotated_token_string_is_rejected(self):
+        self.authenticate()
+        self.collection.docs[0]["jwt_token_string"] = "fghij"
+        jwt_util.invalidate_principal(self.user_id)
+        with self.assertRaises(HTTPException) as ctx:
+            self.authenticate()
+        self.assertEqual(ctx.exception.status_code, 401)
+
+    def test_lookup_racing_an_invalidation_is_not_cached(self):
+        handle = jwt_util.user_db
+        get_by_id = handle.get_by_id
+
+        async def racing_get_by_id(_id):
+            jwt_util.invalidate_principal(self.user_id)  # e.g. PATCH /me finished meanwhile
+            return await get_by_id(_id)
+
+        with mock.patch.object(handle, "get_by_id", racing_get_by_id):
+            self.authenticate()
+        self.authenticate()
+        self.assertEqual(self.lookups(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+Query-plan regression test against a local mongod (skipped without one).
+
+Seeds a scratch database, applies the index manifests from entity/__init__.py
+and drives the real routes (register, login, /user/me, change-password,
+regenerate-token, both exports, DELETE /user/me) through TestClient on handles
+that record every find/update/delete they send. Each recorded command is then
+explained with executionStats: it must read through an index (no COLLSCAN, no
+in-memory SORT) and examine at most max(1, returned) documents. Because the
+filters are the ones the handlers actually built, a lookup that sends a string
+where an ObjectId is stored fails the route instead of passing the plan check.
+
+Set LOCAL_MONGO_CONNECTION_STRING to point it at a server other than
+mongodb://localhost:27017.
+
+Run with:
+    python -m unittest tests.test_query_plans
+"""
+import os
+import random
+import unittest
+from unittest import mock
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import MongoClient, monitoring
+
+from entity import TRANSACTION_INDEXES, USER_INDEXES, VEHICLE_INDEXES
+from entity.async_mongo_core import AsyncMongoDB
+from entity.index_manifest import apply_index_manifest
+from entity.instrumentation import summarize_explain
+from entity.mongo_core import MongoDB
+from routers.auth_router import auth_router
+from routers.transaction_router import transaction_router
+from routers.user_router import user_router
+from routers.vehicle_router import vehicle_router
+
+CONNECTION_STR = os.getenv("LOCAL_MONGO_CONNECTION_STRING") or "mongodb://localhost:27017"
+SCRATCH_DB = "fuel-check-plancheck"
+SCRATCH_TRANSACTIONS_DB = f"{SCRATCH_DB}-transactions"
+# Plan stages that read through an index (EXPRESS_* are the 8.0 point-lookup fast paths)
+INDEX_STAGES = ("IXSCAN", "IDHACK", "CLUSTERED_IXSCAN")
+EXPLAINED_COMMANDS = ("find", "update", "delete")
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keeps every find/update/delete command a client starts."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name in EXPLAINED_COMMANDS:
+            self.commands.append((event.database_name, event.command_name, dict(event.command)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def explain_body(command_name, command):
+    """The recorded command without its session/cluster fields, ready to explain."""
+    if command_name == "find":
+        keys = ("find", "filter", "sort", "projection", "skip", "limit")
+    elif command_name == "update":
+        keys = ("update", "updates")
+    else:
+        keys = ("delete", "deletes")
+    return {key: command[key] for key in keys if key in command}
+
+
+def plan_problems(explain):
+    summary = summarize_explain(explain)
+    stages = summary["plan"].split(" <- ")
+    problems = []
+    if summary["collscan"]:
+        problems.append("COLLSCAN")
+    if not any(stage.split("(")[0] in INDEX_STAGES or stage.startswith("EXPRESS") for stage in stages):
+        problems.append("no index scan")
+    if "SORT" in stages:
+        problems.append("in-memory SORT")
+    bound = max(1, summary["n_returned"] or 0)
+    if (summary["docs_examined"] or 0) > bound:
+        problems.append(f"docsExamined {summary['docs_examined']} > {bound}")
+    return summary, problems
+
+
+def seed(collection, docs, total):
+    collection.delete_many({})
+    collection.insert_many([docs(i) for i in range(total)])
+
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        probe = MongoClient(CONNECTION_STR, serverSelectionTimeoutMS=500)
+        try:
+            probe.admin.command("ping")
+        except Exception as e:
+            probe.close()
+            raise unittest.SkipTest(f"no mongod at {CONNECTION_STR}: {e}")
+        cls.server = probe
+        cls.addClassCleanup(probe.close)
+        cls.addClassCleanup(probe.drop_database, SCRATCH_DB)
+        cls.addClassCleanup(probe.drop_database, SCRATCH_TRANSACTIONS_DB)
+
+    def setUp(self):
+        self.recorder = CommandRecorder()
+        options = dict(connection_str=CONNECTION_STR, event_listeners=[self.recorder])
+        self.users = AsyncMongoDB(SCRATCH_DB, "users", **options)
+        self.vehicles = MongoDB(SCRATCH_DB, "vehicles", **options)
+        self.addCleanup(self.vehicles.close)
+        transactions = {}
+
+        def transaction_db(collection_name):
+            if collection_name not in transactions:
+                transactions[collection_name] = MongoDB(SCRATCH_TRANSACTIONS_DB, collection_name, **options)
+                self.addCleanup(transactions[collection_name].close)
+            return transactions[collection_name]
+
+        async def ensure_transaction_indexes(collection_name):
+            apply_index_manifest(transaction_db(collection_name), TRANSACTION_INDEXES)
+
+        for target, value in (
+                ("modules.jwt_util.user_db", self.users),
+                ("routers.auth_router.user_db", self.users),
+                ("routers.user_router.user_db", self.users),
+                ("routers.vehicle_router.vehicle_db", self.vehicles),
+                ("routers.transaction_router.vehicle_db", self.vehicles),
+                ("routers.transaction_router.transaction_db", transaction_db),
+                ("routers.transaction_router.ensure_transaction_indexes", ensure_transaction_indexes),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Same routers and prefixes as app.py, without the lifespan's connections
+        app = FastAPI()
+        app.include_router(auth_router, prefix="/auth")
+        app.include_router(user_router, prefix="/user")
+        app.include_router(vehicle_router, prefix="/vehicle")
+        app.include_router(transaction_router, prefix="/transaction")
+        self.app = app
+
+    def seed_users(self):
+        users = self.server[SCRATCH_DB]["users"]
+        seed(users, lambda i: {
+            "full_name": f"User {i}", "email": f"user{i}@example.com", "password": "x" * 87,
+            "jwt_token_string": "abcde", "is_active": True, "created_at": float(i), "updated_at": float(i),
+        }, 5000)
+        apply_index_manifest(MongoDB(SCRATCH_DB, "users", client=self.server), USER_INDEXES)
+
+    def seed_vehicles(self, owner_id):
+        """Seed vehicles (every 20th owned by `owner_id`) and one of its transaction histories."""
+        db = self.server[SCRATCH_DB]
+        rng = random.Random(42)
+        seed(db["vehicles"], lambda i: {
+            "owner_id": owner_id if i % 20 == 0 else str(ObjectId()), "name": f"Vehicle {i}",
+            "registration_number": f"REG-{i:07d}", "created_at": float(i), "current_mileage": i % 100_000,
+        }, 5000)
+        apply_index_manifest(MongoDB(SCRATCH_DB, "vehicles", client=self.server), VEHICLE_INDEXES)
+        vehicle_id = str(db["vehicles"].find_one({"owner_id": owner_id})["_id"])
+        seed(self.server[SCRATCH_TRANSACTIONS_DB][vehicle_id], lambda i: {
+            "vehicle_id": vehicle_id, "amount": rng.randint(100, 5000), "fuel_quantity": rng.randint(1, 60),
+            "location": "Pump", "tank_fully_filled": bool(i % 2), "created_at": float(i),
+        }, 2000)
+        return vehicle_id
+
+    def drive_routes(self, client):
+        """Call every route that reads or writes users, vehicles or transactions."""
+        email = "plan.check@example.com"
+        response = client.post("/auth/register", json={"full_name": "Plan Check", "email": email, "password": "first"})
+        self.assertEqual(response.status_code, 201, response.text)
+        vehicle_id = self.seed_vehicles(response.json()["user"]["id"])
+
+        response = client.post("/auth/login", json={"email": email, "password": "first"})
+        self.assertEqual(response.status_code, 200, response.text)
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        self.assertEqual(client.get("/user/me", headers=headers).status_code, 200)
+        self.assertEqual(client.patch("/user/me", json={}, headers=headers).status_code, 200)
+
+        response = client.get("/vehicle/export", headers=headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(len(response.text.splitlines()), 250)
+        response = client.get(f"/transaction/{vehicle_id}/export", headers=headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(len(response.text.splitlines()), 2000)
+
+        response = client.post("/auth/change-password",
+                               json={"email": email, "current_password": "first", "new_password": "second"})
+        self.assertEqual(response.status_code, 200, response.text)
+        response = client.post("/auth/regenerate-token", headers={"x-token": headers["Authorization"][7:]})
+        self.assertEqual(response.status_code, 201, response.text)
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        self.assertEqual(client.delete("/user/me", headers=headers).status_code, 200)
+        return vehicle_id
+
+    def test_handler_queries_use_indexes(self):
+        self.seed_users()
+        with TestClient(self.app) as client:
+            try:
+                vehicle_id = self.drive_routes(client)
+            finally:
+                # The async client runs on the TestClient's event loop; close it there
+                client.portal.call(self.users.close)
+
+        seen = set()
+        for db_name, command_name, command in self.recorder.commands:
+            body = explain_body(command_name, command)
+            collection = body[command_name]
+            seen.add((collection, command_name))
+            explain = self.server[db_name].command({"explain": body, "verbosity": "executionStats"})
+            summary, problems = plan_problems(explain)
+            with self.subTest(collection=collection, command=command_name, plan=summary["plan"]):
+                self.assertEqual(problems, [], body)
+
+        # Every handler path above must have been recorded, so none is dropped from the check silently
+        self.assertLessEqual(
+            {("users", "find"), ("users", "update"), ("users", "delete"), ("vehicles", "find"), (vehicle_id, "find")},
+            seen,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
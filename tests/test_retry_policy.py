@@ -0,0 +1,117 @@
+"""
+RetryPolicy: jittered backoff bounds, which errors are retried, the shared
+retry budget, and the no-retry rule on the event loop thread.
+
+Run with:
+    python -m unittest
+"""
+import asyncio
+import random
+import unittest
+from unittest import mock
+
+from pymongo.errors import AutoReconnect, ServerSelectionTimeoutError
+
+from entity.mongo_core import RetryBudget, RetryPolicy
+
+
+def flaky(failures, error=AutoReconnect):
+    """A function failing `failures` times with `error`, then returning "ok"."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("transient")
+        return "ok"
+
+    return func, calls
+
+
+class BackoffTest(unittest.TestCase):
+    def test_full_jitter_within_exponential_cap(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.5)
+        random.seed(7)
+        for retry, cap in ((0, 0.1), (1, 0.2), (2, 0.4), (3, 0.5), (10, 0.5)):
+            delays = [policy.backoff(retry) for _ in range(200)]
+            self.assertTrue(all(0 <= d <= cap for d in delays), retry)
+            # Full jitter: spread over the whole range, not pinned to the cap
+            self.assertLess(min(delays), cap / 4)
+            self.assertGreater(max(delays), cap * 3 / 4)
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.budget = RetryBudget(ratio=0.1, max_tokens=10)
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0, budget=self.budget)
+
+    def test_retries_transient_error_then_succeeds(self):
+        func, calls = flaky(2)
+        self.assertEqual(self.policy.retry()(func)(), "ok")
+        self.assertEqual(len(calls), 3)
+        counters = self.policy.metrics()[func.__qualname__]
+        self.assertEqual((counters["calls"], counters["attempts"], counters["retries"]), (1, 3, 2))
+
+    def test_gives_up_after_max_attempts(self):
+        func, calls = flaky(5)
+        with self.assertRaises(AutoReconnect):
+            self.policy.retry()(func)()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.policy.metrics()[func.__qualname__]["give_ups"], 1)
+
+    def test_non_idempotent_only_retries_unsent_commands(self):
+        # AutoReconnect: the command may have reached the server, so no retry
+        func, calls = flaky(1)
+        with self.assertRaises(AutoReconnect):
+            self.policy.retry(idempotent=False)(func)()
+        self.assertEqual(len(calls), 1)
+        # Server selection failed: nothing was sent, safe to retry
+        func, calls = flaky(1, ServerSelectionTimeoutError)
+        self.assertEqual(self.policy.retry(idempotent=False)(func)(), "ok")
+        self.assertEqual(len(calls), 2)
+
+    def test_budget_caps_retries_and_refills_on_success(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=1)
+        policy = RetryPolicy(max_attempts=5, base_delay=0, budget=budget)
+        func, calls = flaky(10)
+        with self.assertRaises(AutoReconnect):
+            policy.retry()(func)()
+        # One token: one retry, then the budget is exhausted
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(policy.metrics()[func.__qualname__]["budget_exhausted"], 1)
+        self.assertEqual(budget.tokens, 0)
+
+        policy.retry()(lambda: "ok")()
+        policy.retry()(lambda: "ok")()
+        self.assertEqual(budget.tokens, 1)
+        policy.retry()(lambda: "ok")()
+        self.assertEqual(budget.tokens, 1)  # capped at max_tokens
+
+    def test_sync_call_on_event_loop_is_not_retried(self):
+        func, calls = flaky(1)
+        wrapped = self.policy.retry()(func)
+
+        async def on_loop():
+            wrapped()
+
+        with self.assertRaises(AutoReconnect):
+            asyncio.run(on_loop())
+        self.assertEqual(len(calls), 1)
+
+    def test_coroutine_backs_off_with_asyncio_sleep(self):
+        attempts = []
+
+        async def func():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise AutoReconnect("transient")
+            return "ok"
+
+        policy = RetryPolicy(max_attempts=3, base_delay=0.01, budget=self.budget)
+        with mock.patch("entity.mongo_core.time.sleep", side_effect=AssertionError("blocked the loop")):
+            self.assertEqual(asyncio.run(policy.retry()(func)()), "ok")
+        self.assertEqual(len(attempts), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
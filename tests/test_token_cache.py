@@ -0,0 +1,82 @@
+"""
+decode_jwt_token's payload cache: hits skip verification, entries die with the
+token's exp, and a cached payload past its exp is never served.
+
+Run with:
+    python -m unittest
+"""
+import hashlib
+import time
+import unittest
+from unittest import mock
+
+import jwt
+from fastapi import HTTPException
+
+from modules import jwt_util
+from modules.ttl_cache import TTLCache
+from tests.fakes import FakeClock
+
+
+def make_token(exp):
+    return jwt.encode({"id": "u1", "jwt_token_string": "abcde", "exp": exp}, jwt_util.SECRET, algorithm="HS256")
+
+
+class TokenCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(ttl=7 * 24 * 3600, max_entries=2)
+        for target, value in (
+                ("modules.ttl_cache.time", self.clock),
+                ("modules.jwt_util.time", self.clock),
+                ("modules.jwt_util.token_cache", self.cache),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        decode = mock.patch("modules.jwt_util.jwt.decode", side_effect=jwt.decode)
+        self.decode = decode.start()
+        self.addCleanup(decode.stop)
+
+    def test_repeat_decodes_skip_verification(self):
+        token = make_token(int(time.time()) + 3600)
+        first = jwt_util.decode_jwt_token(token)
+        first["id"] = "tampered"  # callers get copies
+        self.assertEqual(jwt_util.decode_jwt_token(token)["id"], "u1")
+        self.assertEqual(self.decode.call_count, 1)
+
+    def test_entry_lives_until_exp(self):
+        token = make_token(int(self.clock.time()) + 60)
+        jwt_util.decode_jwt_token(token)
+        self.clock.advance(30)
+        jwt_util.decode_jwt_token(token)
+        self.assertEqual(self.decode.call_count, 1)
+        self.clock.advance(31)
+        self.assertIsNone(self.cache.get(hashlib.sha256(token.encode()).digest()))
+
+    def test_cached_payload_past_exp_is_not_served(self):
+        # Cached while valid; the wall clock has since passed exp but the
+        # monotonic TTL has not (e.g. the system clock jumped)
+        exp = int(time.time()) - 10
+        token = make_token(exp)
+        self.cache.set(hashlib.sha256(token.encode()).digest(), {"id": "u1", "exp": exp})
+        with self.assertLogs("SERVER_UTILS", "ERROR"), self.assertRaises(HTTPException) as ctx:
+            jwt_util.decode_jwt_token(token)
+        self.assertEqual(ctx.exception.status_code, 401)
+        self.assertEqual(ctx.exception.detail, "Token has expired.")
+
+    def test_invalid_token_is_not_cached(self):
+        with self.assertLogs("SERVER_UTILS", "ERROR"), self.assertRaises(HTTPException) as ctx:
+            jwt_util.decode_jwt_token(make_token(int(time.time()) + 60) + "x")
+        self.assertEqual(ctx.exception.status_code, 401)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_cache_is_bounded(self):
+        for i in range(5):
+            jwt_util.decode_jwt_token(make_token(int(time.time()) + 60 + i))
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.stats()["evictions"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+How WriteBuffer resolves futures from bulk write results, against a fake
+handle (no server needed).
+
+Run with:
+    python -m unittest
+"""
+import unittest
+
+from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError
+
+from entity.write_buffer import WriteBuffer
+from tests.fakes import FakeCollection
+
+
+class FakeDB:
+    """Applies InsertOne/UpdateOne batches to a FakeCollection, like an unordered bulk_write."""
+
+    def __init__(self, ids, error_details=None):
+        self.collection = FakeCollection("test.transactions", [{"_id": _id, "owner": 1} for _id in ids])
+        self.error_details = error_details
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=False):
+        self.batches.append(operations)
+        if self.error_details is not None:
+            raise BulkWriteError(self.error_details)
+        matched = 0
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self.collection.insert_one(dict(op._doc))
+            else:
+                matched += self.collection.update_one(op._filter, op._doc).matched_count
+        return {"inserted": 0, "matched": matched, "modified": matched, "deleted": 0, "upserted": 0}
+
+
+def run_batch(db, *filters):
+    buffer = WriteBuffer(db, max_latency_ms=1000)
+    futures = [buffer.update_one(filter, {"name": "x"}) for filter in filters]
+    buffer.close(timeout=5)
+    return futures
+
+
+class UpdateResultTest(unittest.TestCase):
+    def test_updates_resolve_to_matched(self):
+        known, missing = ObjectId(), ObjectId()
+        futures = run_batch(FakeDB([known]), {"_id": known}, {"_id": missing})
+        self.assertEqual([future.result() for future in futures], [True, False])
+
+    def test_all_matched_needs_no_lookup(self):
+        a, b = ObjectId(), ObjectId()
+        db = FakeDB([a, b])
+        db.collection.find = None
+        futures = run_batch(db, {"_id": a}, {"_id": b})
+        self.assertEqual([future.result() for future in futures], [True, True])
+
+    def test_non_id_filter_is_written_alone(self):
+        known, other = ObjectId(), ObjectId()
+        db = FakeDB([known, other])
+        futures = run_batch(db, {"_id": other}, {"_id": known, "owner": 1}, {"email": "missing@example.com"})
+        self.assertEqual([future.result() for future in futures], [True, True, False])
+        self.assertEqual([len(batch) for batch in db.batches], [1, 1, 1])
+
+    def test_lookup_disagreeing_with_matched_count_is_unknown(self):
+        a, b = ObjectId(), ObjectId()
+        db = FakeDB([a])
+        # b appears between the write and the lookup
+        db.collection.find = lambda filter, projection=None: [{"_id": a}, {"_id": b}]
+        futures = run_batch(db, {"_id": a}, {"_id": b})
+        for future in futures:
+            self.assertIsInstance(future.exception(), RuntimeError)
+
+
+class OrderingTest(unittest.TestCase):
+    def test_update_of_pending_insert_waits_for_it(self):
+        for filter_extra in ({}, {"owner": 1}):
+            db = FakeDB([])
+            buffer = WriteBuffer(db, max_latency_ms=1000)
+            _id = ObjectId()
+            inserted = buffer.insert({"_id": _id, "name": "a", "owner": 1})
+            updated = buffer.update_one({"_id": _id, **filter_extra}, {"name": "b"})
+            buffer.close(timeout=5)
+            self.assertEqual(inserted.result(), str(_id))
+            self.assertTrue(updated.result())
+            self.assertEqual([len(batch) for batch in db.batches], [1, 1])
+
+    def test_writes_to_different_ids_share_a_batch(self):
+        db = FakeDB([])
+        buffer = WriteBuffer(db, max_latency_ms=1000)
+        buffer.insert({"name": "a"})
+        buffer.insert({"name": "b"})
+        buffer.update_one({"_id": ObjectId()}, {"name": "c"})
+        buffer.close(timeout=5)
+        self.assertEqual([len(batch) for batch in db.batches], [3])
+
+
+class WriteConcernTest(unittest.TestCase):
+    def test_write_concern_error_fails_unerrored_writes(self):
+        details = {
+            "writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}],
+            "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}],
+            "nMatched": 1,
+            "nUpserted": 0,
+        }
+        futures = run_batch(FakeDB([], details), {"_id": ObjectId()}, {"_id": ObjectId()})
+        self.assertIsInstance(futures[0].exception(), DuplicateKeyError)
+        self.assertIsInstance(futures[1].exception(), WriteConcernError)
+
+    def test_write_errors_alone_leave_other_writes_successful(self):
+        known = ObjectId()
+        details = {
+            "writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}],
+            "writeConcernErrors": [],
+            "nMatched": 1,
+            "nUpserted": 0,
+        }
+        futures = run_batch(FakeDB([known], details), {"_id": ObjectId()}, {"_id": known})
+        self.assertIsNotNone(futures[0].exception())
+        self.assertTrue(futures[1].result())
+
+
+if __name__ == "__main__":
+    unittest.main()